@@ -4,14 +4,7 @@ Usage: python -m app <path-to-document>
 """
 import sys
 from pathlib import Path
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document
-from app.extractors.invoice_extractor import extract_invoice_fields
-from app.extractors.po_extractor import extract_po_fields
-from app.extractors.paystub_extractor import extract_paystub_fields
-from app.extractors.id_extractor import extract_id_fields
-from app.extractors.flood_form_extractor import extract_flood_form_fields
-from app.db import init_db, insert_document
+from app.db import init_db
 
 
 def main():
@@ -0,0 +1,248 @@
+"""
+Admission control for synchronous classification.
+
+Every upload to ``/api/v1/classify`` is given a cost estimate from its size,
+page count and whether it will need OCR, and runs in one of two lanes: a
+fast lane for cheap documents and a slow lane for long or scanned ones.
+Each lane has its own concurrency limit and a bounded number of requests
+waiting for a slot, so a one-page digital invoice never queues behind
+200-page scans. A request that finds its lane's queue full, or waits
+longer than ``ADMISSION_QUEUE_TIMEOUT``, is rejected with
+``AdmissionRejectedError``, which the API turns into 429 with Retry-After.
+
+Past the load thresholds (a slow-lane backlog or a high load average) the
+controller is *degraded*: documents that would need OCR are classified on
+their native text only and their OCR is queued as a background job.
+"""
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.config import (
+    ADMISSION_OCR_PAGE_COST,
+    ADMISSION_BYTES_PER_PAGE,
+    ADMISSION_FAST_MAX_COST,
+    FAST_LANE_CONCURRENCY,
+    FAST_LANE_QUEUE,
+    SLOW_LANE_CONCURRENCY,
+    SLOW_LANE_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    DEGRADED_MODE,
+    DEGRADE_SLOW_LANE_BACKLOG,
+    DEGRADE_LOAD_PER_CPU,
+)
+from app.exceptions import AdmissionRejectedError
+from app.logger import get_logger
+from app.metrics import ADMISSION_TOTAL
+
+logger = get_logger(__name__)
+
+# Page objects; the lookahead skips the /Pages tree nodes
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PDF_FONT = re.compile(rb"/Font\b")
+_PDF_OBJECT_STREAM = re.compile(rb"/ObjStm\b")
+
+_SCAN_CHUNK_BYTES = 64 * 1024
+# Longer than any marker, so a marker split between chunks is matched whole in the next one
+_SCAN_OVERLAP_BYTES = 64
+
+
+class Cost(NamedTuple):
+    """Estimated processing cost of a document."""
+    size: int
+    pages: int
+    ocr_likely: Optional[bool]  # None: unknown, fonts may be hidden in object streams
+    units: float  # native-text page equivalents
+
+
+def _scan_pdf(path: Path) -> Tuple[int, bool, bool]:
+    """Count page objects and look for fonts and object streams, reading ``path`` in chunks."""
+    pages, fonts, object_streams = 0, False, False
+    carry = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_SCAN_CHUNK_BYTES)
+            buffer = carry + chunk
+            # Matches starting in the overlap are counted with the next chunk
+            end = max(len(buffer) - _SCAN_OVERLAP_BYTES, 0) if chunk else len(buffer)
+            pages += sum(1 for match in _PDF_PAGE.finditer(buffer) if match.start() < end)
+            fonts = fonts or any(match.start() < end for match in _PDF_FONT.finditer(buffer))
+            object_streams = object_streams or any(
+                match.start() < end for match in _PDF_OBJECT_STREAM.finditer(buffer))
+            if not chunk:
+                return pages, fonts, object_streams
+            carry = buffer[end:]
+
+
+def estimate_cost(path) -> Cost:
+    """
+    Estimate what processing ``path`` will cost, without parsing it.
+
+    The raw PDF is scanned in chunks: pages are counted from its page
+    objects (falling back to a size-based guess when they are hidden in
+    compressed object streams), and a PDF without fonts is assumed to be a
+    scan needing OCR. Most PDFs from current tools keep their font
+    dictionaries in object streams too, so when a PDF has object streams and
+    no visible fonts its OCR need is unknown (``ocr_likely`` None) and it is
+    costed as native text. Images are always one OCR page.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    if path.suffix.lower() == '.pdf':
+        pages, fonts, object_streams = _scan_pdf(path)
+        pages = pages or size // ADMISSION_BYTES_PER_PAGE + 1
+        ocr_likely = None if object_streams and not fonts else not fonts
+    else:
+        pages, ocr_likely = 1, True
+    units = pages * (ADMISSION_OCR_PAGE_COST if ocr_likely else 1)
+    return Cost(size, pages, ocr_likely, units)
+
+
+class Lane:
+    """A concurrency limit with a bounded queue of requests waiting for a slot."""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = threading.Semaphore(concurrency)
+        self._lock = threading.Lock()
+        self._mean_seconds: Optional[float] = None
+
+    def retry_after(self) -> int:
+        """Seconds until the work ahead of a new request should have drained."""
+        with self._lock:
+            ahead = self.running + self.waiting
+            mean = self._mean_seconds or 1.0
+        return max(1, math.ceil(mean * ahead / self.concurrency))
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.rejected += 1
+        ADMISSION_TOTAL.inc(lane=self.name, outcome='rejected')
+        retry_after = self.retry_after()
+        logger.warning(f"{self.name} lane {reason}; rejecting (retry after {retry_after}s)")
+        raise AdmissionRejectedError(f"The {self.name} processing lane is {reason}",
+                                     self.name, retry_after)
+
+    def _acquire(self):
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            full = self.waiting >= self.max_queue
+            if not full:
+                self.waiting += 1
+        if full:
+            self._reject('saturated')
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            self._reject('backed up')
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the lane's slots, waiting in its queue if need be."""
+        self._acquire()
+        ADMISSION_TOTAL.inc(lane=self.name, outcome='admitted')
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.running -= 1
+                # Exponentially weighted, so Retry-After follows the current mix
+                self._mean_seconds = elapsed if self._mean_seconds is None else (
+                    0.8 * self._mean_seconds + 0.2 * elapsed)
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+                'mean_seconds': self._mean_seconds,
+            }
+
+
+class AdmissionController:
+    """Routes documents to the fast or slow lane by estimated cost."""
+
+    def __init__(self, fast: Optional[Lane] = None, slow: Optional[Lane] = None,
+                 fast_max_cost: float = ADMISSION_FAST_MAX_COST,
+                 degraded_mode: str = DEGRADED_MODE):
+        self.fast = fast or Lane('fast', FAST_LANE_CONCURRENCY, FAST_LANE_QUEUE)
+        self.slow = slow or Lane('slow', SLOW_LANE_CONCURRENCY, SLOW_LANE_QUEUE)
+        self.fast_max_cost = fast_max_cost
+        self.degraded_mode = degraded_mode
+        self._was_degraded = False
+
+    def degraded(self) -> bool:
+        """True when OCR should be deferred: forced on, or past a load threshold in 'auto' mode."""
+        if self.degraded_mode != 'auto':
+            return self.degraded_mode == 'on'
+        degraded = self.slow.stats()['waiting'] >= DEGRADE_SLOW_LANE_BACKLOG
+        if not degraded and hasattr(os, 'getloadavg'):
+            degraded = os.getloadavg()[0] / (os.cpu_count() or 1) >= DEGRADE_LOAD_PER_CPU
+        if degraded != self._was_degraded:
+            self._was_degraded = degraded
+            if degraded:
+                logger.warning("Entering degraded mode: deferring OCR")
+            else:
+                logger.warning("Leaving degraded mode")
+        return degraded
+
+    def plan(self, cost: Cost) -> Tuple[Cost, bool]:
+        """
+        The cost to admit a document at, and whether its OCR is deferred.
+
+        When degraded, OCR is deferred unless the document is known not to
+        need it; deferring costs a document with native text nothing.
+        """
+        if cost.ocr_likely is not False and self.degraded():
+            return cost._replace(ocr_likely=False, units=cost.pages), True
+        return cost, False
+
+    def lane_for(self, cost: Cost) -> Lane:
+        return self.fast if cost.units <= self.fast_max_cost else self.slow
+
+    @contextmanager
+    def admit(self, cost: Cost):
+        """Run the body in the document's lane; raises AdmissionRejectedError if it is saturated."""
+        lane = self.lane_for(cost)
+        with lane.slot():
+            yield lane
+
+    def stats(self) -> Dict[str, Any]:
+        return {'fast': self.fast.stats(), 'slow': self.slow.stats()}
+
+
+_admission_controller = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the process-wide admission controller."""
+    global _admission_controller
+    with _admission_controller_lock:
+        if _admission_controller is None:
+            _admission_controller = AdmissionController()
+        return _admission_controller
@@ -1,28 +1,108 @@
 """
 REST API for AutoDoc Classifier using Flask.
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
+import functools
+import hashlib
+import hmac
+import json
 import os
+import shutil
+import time
+import uuid
 from pathlib import Path
 
-from app.config import UPLOAD_FOLDER, ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document, get_classification_confidence
-from app.db import init_db, insert_document
-from app.utils import validate_file, get_mime_type, calculate_file_hash
+from app.config import (
+    UPLOAD_FOLDER,
+    MAX_UPLOAD_SIZE,
+    BATCH_MAX_FILES,
+    BATCH_MAX_UPLOAD_SIZE,
+    JOB_MAX_WAIT,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    SEARCH_RESULT_LIMIT,
+    SEARCH_MAX_RESULTS,
+    STATS_DAYS,
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+    PROFILE_MAX_REQUESTS,
+)
+from app.pipeline import analyze_document
+from app.classifier import get_classification_confidence
+from app.db import (
+    init_db,
+    find_document_by_hash,
+    get_document_fields,
+    DOCUMENT_COLUMNS,
+    DOCUMENT_LIST_COLUMNS,
+)
+from app.admission import estimate_cost, get_admission_controller
+from app.idempotency import get_idempotency_store
+from app.intake import IntakeRequest, UploadStream, store_upload
+from app.write_queue import get_write_queue
+from app.utils import validate_file
 from app.logger import setup_logging, get_logger
-from app.exceptions import AutoDocException
+from app.exceptions import (
+    AdmissionRejectedError,
+    AutoDocException,
+    IdempotencyConflictError,
+    ValidationError,
+    WriteQueueFullError,
+)
+from app.metrics import REGISTRY, STAGE_SECONDS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_TOTAL
+from app.performance import PerformanceMonitor, TRACE_STORE, start_trace, to_chrome_trace
+from app.responses import cacheable
 
-setup_logging()
 logger = get_logger(__name__)
 
 app = Flask(__name__)
+app.request_class = IntakeRequest
 app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# Ensure upload folder exists
-Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
+
+def create_app():
+    """
+    Set up logging, the database and the upload folder, start the job
+    workers, and return the app.
+
+    Importing this module has no side effects; servers call this instead,
+    e.g. ``gunicorn 'app.api:create_app()'``. The workers start here rather
+    than on the first submission, so jobs left queued (or leased by a worker
+    that died) by a previous process are picked up after a restart.
+    """
+    from app.jobs import get_job_runner
+
+    setup_logging()
+    init_db()
+    Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    get_job_runner()  # None when JOB_WORKERS is 0
+    return app
+
+
+@app.before_request
+def start_timer():
+    """Record when the request started."""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Observe request latency per endpoint (route, not URL, to bound labels)."""
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        HTTP_REQUESTS_TOTAL.inc(endpoint=endpoint, status=str(response.status_code))
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -36,6 +116,98 @@ def health():
 def classify():
     """
     Classify uploaded document and extract fields.
+
+    Sampled requests are traced; send ``X-Trace: 1`` to force a trace. The
+    trace ID is returned in the ``X-Trace-Id`` header.
+
+    With an ``Idempotency-Key`` header, a retry of the same upload gets the
+    first request's response (marked ``Idempotent-Replayed: true``) instead
+    of processing the file again.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if key is not None:
+        return _idempotent(key, _traced_classify)
+    return _traced_classify()
+
+
+def _traced_classify():
+    with start_trace('classify', sampled=_trace_requested()) as trace:
+        response = make_response(_profiled(_classify))
+    if trace.sampled:
+        response.headers['X-Trace-Id'] = trace.trace_id
+    return response
+
+
+def _idempotent(key, view):
+    """
+    Run ``view`` once per idempotency key, replaying its response to retries.
+
+    Server errors and 429s are not kept, so a later retry runs again.
+    """
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        message = f'Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters'
+        return jsonify({'error': message}), 400
+    try:
+        (status, headers, body), replayed = get_idempotency_store().run(
+            key,
+            _upload_fingerprint(),
+            lambda: _snapshot(view()),
+            keep=lambda snapshot: snapshot[0] < 500 and snapshot[0] != 429,
+        )
+    except IdempotencyConflictError as e:
+        logger.warning(f"Idempotency conflict: {str(e)}")
+        return jsonify({'error': str(e)}), 409 if e.in_progress else 422
+    response = Response(body, status, headers)
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _upload_fingerprint():
+    """What an idempotency key is bound to: the endpoint, its flags and the upload's SHA-256."""
+    file = request.files.get('file')
+    if file is None:
+        file_hash = None
+    elif isinstance(file.stream, UploadStream):
+        file_hash = file.stream.finish()
+    else:
+        file_hash = hashlib.sha256(file.stream.read()).hexdigest()
+        file.stream.seek(0)
+    return f"{request.path}?reprocess={_flag('reprocess')}:{file_hash}"
+
+
+def _snapshot(response):
+    """(status, headers, body) of a response, to rebuild it for a replay."""
+    headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+    return response.status_code, headers, response.get_data()
+
+
+def _trace_requested():
+    """True when the client asked for a trace, otherwise None (sample as usual)."""
+    return True if request.headers.get('X-Trace', '').lower() in ('1', 'true') else None
+
+
+def _profiled(view):
+    """Run a view under the profiler when a debug profiling session is armed."""
+    from app.profiling import PROFILE_SESSION, profile_call
+    mode = PROFILE_SESSION.claim()
+    if mode is None:
+        return view()
+    response, report = profile_call(mode, view)
+    report['endpoint'] = request.endpoint
+    PROFILE_SESSION.add(report)
+    return response
+
+
+def _upload_folder():
+    return Path(app.config['UPLOAD_FOLDER'])
+
+
+def _classify():
+    """
+    The upload is hashed and type-checked while it streams in (see
+    ``app.intake``). A file already stored returns its document without
+    being processed again, unless ``?reprocess=1`` is given.
     """
     try:
         if 'file' not in request.files:
@@ -46,42 +218,75 @@ def classify():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Save uploaded file
         filename = secure_filename(file.filename)
-        filepath = Path(UPLOAD_FOLDER) / filename
-        file.save(filepath)
-        
-        logger.info(f"Processing uploaded file: {filename}")
-        
-        # Validate file
-        validate_file(filepath)
-        
-        # Extract text
-        text = extract_text_from_file(str(filepath))
-        
-        # Classify document
-        doc_type = classify_document(text)
-        confidence = get_classification_confidence(text, doc_type)
+        with PerformanceMonitor(f"Intake of {filename}", stage='intake'):
+            file_hash = file.stream.finish()
+            existing = None if _flag('reprocess') else find_document_by_hash(file_hash)
+            if existing is None:
+                # Content-addressed name: same-named uploads no longer overwrite each other
+                destination = _upload_folder() / f"{file_hash[:16]}-{filename}"
+                filepath, file_hash = store_upload(file, destination)
+                validate_file(filepath)
+
+        if existing is not None:
+            logger.info(f"Upload {filename} matches document {existing['id']}; not reprocessing")
+            return jsonify(_known_document(existing, file_hash, filename)), 200
         
-        # Calculate file hash
-        file_hash = calculate_file_hash(filepath)
+        controller = get_admission_controller()
+        # Under load, documents needing OCR are classified on native text now and OCRed later
+        cost, defer_ocr = controller.plan(estimate_cost(filepath))
+        try:
+            # Cheap documents run in the fast lane, long or scanned ones in the slow lane
+            with controller.admit(cost) as lane:
+                logger.info(f"Processing uploaded file: {filename} ({lane.name} lane, "
+                            f"{cost.pages} pages, OCR likely: {cost.ocr_likely}, "
+                            f"OCR deferred: {defer_ocr})")
+                # Extract text, classify and extract fields (cached per stage)
+                result = analyze_document(str(filepath), file_hash=file_hash, defer_ocr=defer_ocr)
+        except AdmissionRejectedError:
+            # Not stored; the client uploads it again after Retry-After
+            filepath.unlink(missing_ok=True)
+            raise
         
-        # Store in database
-        document_id = insert_document(
+        # Store in database (group-committed by the single writer thread)
+        document_id = get_write_queue().insert_document(
             file_path=str(filepath),
-            document_type=doc_type,
-            text=text
+            document_type=result['document_type'],
+            text=result['text'],
+            fields=result['fields'],
+            telemetry=result['telemetry'],
+            file_hash=file_hash,
+            ocr_status='pending' if result['ocr_pending'] else None
         )
+        ocr_job_id = None
+        if result['ocr_pending']:
+            from app.jobs import submit_ocr_job
+            ocr_job_id = submit_ocr_job(document_id, str(filepath), filename)
         
         return jsonify({
             'success': True,
             'document_id': document_id,
-            'document_type': doc_type,
-            'confidence': confidence,
-            'file_hash': file_hash,
-            'text_length': len(text)
+            'document_type': result['document_type'],
+            'confidence': result['confidence'],
+            'fields': result['fields'],
+            'file_hash': result['file_hash'],
+            'text_length': len(result['text']),
+            'cache_hits': result['cache_hits'],
+            'duplicate': False,
+            # Classified without OCR; type and fields are updated when the OCR job finishes
+            'degraded': result['ocr_pending'],
+            'ocr_status': 'pending' if result['ocr_pending'] else None,
+            'ocr_job_id': ocr_job_id
         }), 200
         
+    except HTTPException:
+        # Rejected while streaming (413, 415): handled by the error handlers
+        raise
+    except WriteQueueFullError as e:
+        logger.warning(f"Write queue full: {str(e)}")
+        return jsonify({'error': 'Server busy, retry later'}), 503, {'Retry-After': '1'}
+    except AdmissionRejectedError as e:
+        return jsonify({'error': str(e), 'lane': e.lane}), 429, {'Retry-After': str(e.retry_after)}
     except AutoDocException as e:
         logger.error(f"AutoDoc error: {str(e)}")
         return jsonify({'error': str(e)}), 400
@@ -89,12 +294,236 @@ def classify():
         logger.error(f"Unexpected error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+
+def _known_document(document, file_hash, filename):
+    """
+    Classify response for a document stored from an identical upload.
+
+    A document whose deferred OCR failed, or was left pending without a job,
+    gets a new OCR job. If its stored file is gone the OCR cannot run again,
+    and the caller has to upload it with ``?reprocess=1``.
+    """
+    ocr_job_id = None
+    if document['ocr_status'] in ('pending', 'failed') and Path(document['file_path']).exists():
+        from app.jobs import resume_ocr_job
+        ocr_job_id = resume_ocr_job(document['id'], document['file_path'], filename)
+        document['ocr_status'] = 'pending'
+    text = document['raw_text']
+    return {
+        'success': True,
+        'document_id': document['id'],
+        'document_type': document['document_type'],
+        # Text archived by retention is no longer at hand to score
+        'confidence': (get_classification_confidence(text, document['document_type'])
+                       if text else None),
+        'fields': get_document_fields(document['id']),
+        'file_hash': file_hash,
+        'text_length': len(text) if text else None,
+        'cache_hits': {},
+        'duplicate': True,
+        'degraded': document['ocr_status'] == 'pending',
+        'ocr_status': document['ocr_status'],
+        'ocr_job_id': ocr_job_id
+    }
+
+
+@app.route('/api/v1/classify/batch', methods=['POST'])
+def classify_batch():
+    """
+    Classify many documents in one request.
+
+    Accepts any number of file parts (e.g. repeated ``files``), each a
+    document or a zip/tar archive of documents, up to ``BATCH_MAX_FILES``
+    documents in all. Files are processed concurrently on the batch worker
+    pool. Results carry each file's position in the batch; with
+    ``?stream=1`` (or ``Accept: application/x-ndjson``) they are streamed as
+    NDJSON lines in completion order, followed by a summary line.
+    """
+    from app.batch import is_archive, unpack_archive, batch_filename
+
+    request.max_content_length = BATCH_MAX_UPLOAD_SIZE
+    # Archives are accepted, and an unsupported file fails on its own rather than the batch
+    request.max_file_size = BATCH_MAX_UPLOAD_SIZE
+    request.allowed_extensions = None
+    uploads = [upload for _, upload in request.files.items(multi=True) if upload.filename]
+    if not uploads:
+        return jsonify({'error': 'No files provided'}), 400
+
+    batch_dir = _upload_folder() / f"batch-{uuid.uuid4().hex}"
+    batch_dir.mkdir(parents=True)
+    items = []
+    try:
+        with PerformanceMonitor(f"Intake of batch {batch_dir.name}", stage='intake'):
+            for upload in uploads:
+                if is_archive(upload.filename):
+                    archive_name = f"archive-{uuid.uuid4().hex}"
+                    archive_path, _ = store_upload(upload, batch_dir / archive_name)
+                    items.extend(unpack_archive(archive_path, batch_dir, start_index=len(items)))
+                    archive_path.unlink()
+                else:
+                    if len(items) >= BATCH_MAX_FILES:
+                        raise ValidationError(f"Too many files; the limit is {BATCH_MAX_FILES}")
+                    name = batch_filename(len(items), upload.filename)
+                    filepath, _ = store_upload(upload, batch_dir / name)
+                    items.append((upload.filename, filepath))
+    except AutoDocException as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        logger.error(f"Batch intake error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Processing batch of {len(items)} files in {batch_dir.name}")
+    tracer = start_trace('classify_batch', sampled=_trace_requested(), files=len(items))
+    headers = {'X-Trace-Id': tracer.trace.trace_id} if tracer.trace.sampled else {}
+    results = _batch_results(items, tracer)
+
+    if _flag('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+        lines = (json.dumps(result) + '\n' for result in results)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                        headers=headers)
+
+    results = list(results)
+    summary = results.pop()
+    results.sort(key=lambda r: r['index'])
+    return jsonify(dict(summary, success=True, results=results)), 200, headers
+
+
+def _batch_results(items, tracer):
+    """Analyze and store the batch's files; yield one result per file, then a summary."""
+    from app.batch import analyze_batch
+
+    succeeded = failed = 0
+    with tracer:
+        valid = []
+        for index, (name, filepath) in enumerate(items):
+            try:
+                validate_file(filepath)
+                valid.append(index)
+            except (AutoDocException, OSError) as e:
+                failed += 1
+                yield {'index': index, 'filename': name, 'success': False, 'error': str(e)}
+
+        for position, result, error in analyze_batch([str(items[index][1]) for index in valid]):
+            index = valid[position]
+            name, filepath = items[index]
+            if error is None:
+                try:
+                    result['document_id'] = get_write_queue().insert_document(
+                        file_path=str(filepath),
+                        document_type=result['document_type'],
+                        text=result['text'],
+                        fields=result['fields'],
+                        telemetry=result['telemetry'],
+                        file_hash=result['file_hash']
+                    )
+                except Exception as e:
+                    error = e
+            if error is not None:
+                failed += 1
+                logger.error(f"Batch file {name} failed: {str(error)}")
+                message = str(error) if isinstance(error, AutoDocException) else 'Processing failed'
+                yield {'index': index, 'filename': name, 'success': False, 'error': message}
+                continue
+            succeeded += 1
+            yield {
+                'index': index,
+                'filename': name,
+                'success': True,
+                'document_id': result['document_id'],
+                'document_type': result['document_type'],
+                'confidence': result['confidence'],
+                'fields': result['fields'],
+                'file_hash': result['file_hash'],
+                'text_length': len(result['text']),
+                'cache_hits': result['cache_hits']
+            }
+
+    yield {'done': True, 'count': len(items), 'succeeded': succeeded, 'failed': failed}
+
+
+@app.route('/api/v1/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue an uploaded document for background classification.
+
+    Returns 202 with the job ID at once; poll ``GET /api/v1/jobs/<id>`` (or
+    long-poll with ``?wait=<seconds>``) for the result.
+    """
+    from app.jobs import submit_job
+
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'No file provided'}), 400
+    file = request.files['file']
+
+    # Jobs keep their file until a worker gets to it: the name must be unique
+    filepath = _upload_folder() / f"job-{uuid.uuid4().hex[:12]}-{secure_filename(file.filename)}"
+    try:
+        with PerformanceMonitor(f"Intake of {file.filename}", stage='intake'):
+            store_upload(file, filepath)
+            validate_file(filepath)
+        job_id = submit_job(str(filepath), file.filename)
+    except AutoDocException as e:
+        filepath.unlink(missing_ok=True)
+        logger.error(f"Job intake error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        filepath.unlink(missing_ok=True)
+        logger.error(f"Unexpected error queueing job: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+    status_url = f"/api/v1/jobs/{job_id}"
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': status_url
+    }), 202, {'Location': status_url}
+
+
+@app.route('/api/v1/jobs', methods=['GET'])
+def job_queue():
+    """Number of jobs in each status."""
+    from app.db import job_counts
+    return jsonify({'success': True, 'jobs': job_counts()}), 200
+
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a job, and its result once done; ``?wait=<seconds>`` long-polls."""
+    from app.jobs import wait_for_job, TERMINAL_STATUSES
+
+    wait = min(max(request.args.get('wait', 0, type=float), 0), JOB_MAX_WAIT)
+    job = wait_for_job(job_id, wait)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    headers = {} if job['status'] in TERMINAL_STATUSES else {'Retry-After': '1'}
+    return jsonify({
+        'success': True,
+        'job': {key: job[key] for key in (
+            'id', 'kind', 'status', 'filename', 'document_id', 'attempts', 'max_attempts',
+            'result', 'error', 'created_at', 'updated_at'
+        )}
+    }), 200, headers
+
 @app.route('/api/v1/documents', methods=['GET'])
+@cacheable
 def list_documents():
-    """List all processed documents."""
+    """
+    List all processed documents.
+
+    ``fields`` selects the columns returned, e.g. ``?fields=id,document_type``
+    (default: id, file_path and document_type).
+    """
+    try:
+        columns, _ = _projection(DOCUMENT_LIST_COLUMNS, allow_fields=False)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         from app.db import get_all_documents
-        documents = get_all_documents()
+        documents = get_all_documents(columns)
         return jsonify({
             'success': True,
             'count': len(documents),
@@ -104,16 +533,101 @@ def list_documents():
         logger.error(f"Error listing documents: {str(e)}")
         return jsonify({'error': 'Failed to retrieve documents'}), 500
 
+
+def _projection(default, allow_fields=True):
+    """
+    Parse the ``fields`` query parameter into (columns, include extracted fields).
+
+    ``fields`` is a comma-separated list of document columns, plus ``fields``
+    for the extracted fields where ``allow_fields`` is set.
+    """
+    requested = request.args.get('fields')
+    if requested is None:
+        return list(default), allow_fields
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    allowed = DOCUMENT_COLUMNS + (('fields',) if allow_fields else ())
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise ValidationError(f"Unknown fields: {unknown or 'none'}. Allowed: {list(allowed)}")
+    columns = [name for name in dict.fromkeys(names) if name != 'fields']
+    return columns, 'fields' in names
+
+
+@app.route('/api/v1/documents/query', methods=['GET'])
+@cacheable
+def query_documents():
+    """
+    Find documents by extracted field values.
+
+    ``type`` is required. Any other ``<field>=<value>`` parameter is an exact
+    match; ``<field>__from`` and ``<field>__to`` give an inclusive date or
+    amount range, e.g.
+    ``?type=invoice&vendor_name=Acme&invoice_date__from=2024-01-01``.
+    """
+    document_type = request.args.get('type')
+    if not document_type:
+        return jsonify({'error': 'Missing document type'}), 400
+
+    equals = {}
+    between = {}
+    for key, value in request.args.items():
+        if key in ('type', 'limit'):
+            continue
+        if key.endswith('__from') or key.endswith('__to'):
+            field, bound = key.rsplit('__', 1)
+            low, high = between.get(field, (None, None))
+            between[field] = (value, high) if bound == 'from' else (low, value)
+        else:
+            equals[key] = value
+
+    limit = request.args.get('limit', SEARCH_MAX_RESULTS, type=int)
+
+    try:
+        from app.db import find_documents_by_fields
+        documents = find_documents_by_fields(
+            document_type,
+            equals=equals,
+            between=between,
+            limit=max(1, min(limit, SEARCH_MAX_RESULTS)),
+        )
+        return jsonify({
+            'success': True,
+            'count': len(documents),
+            'documents': documents
+        }), 200
+    except AutoDocException as e:
+        logger.error(f"Query error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error querying documents: {str(e)}")
+        return jsonify({'error': 'Failed to query documents'}), 500
+
 @app.route('/api/v1/documents/<int:doc_id>', methods=['GET'])
+@cacheable
 def get_document(doc_id):
-    """Get a specific document by ID."""
+    """
+    Get a specific document by ID.
+
+    ``fields`` selects what is returned, e.g. ``?fields=id,document_type,fields``
+    skips the raw text (default: every column plus the extracted fields).
+    """
     try:
-        from app.db import get_document_by_id
-        document = get_document_by_id(doc_id)
+        columns, include_fields = _projection(DOCUMENT_COLUMNS)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        from app.db import get_document_by_id, get_document_fields
+        # The ID is always selected to tell a missing document from an empty projection
+        document = get_document_by_id(doc_id, columns if 'id' in columns else ['id'] + columns)
         
         if not document:
             return jsonify({'error': 'Document not found'}), 404
         
+        if 'id' not in columns:
+            del document['id']
+        if include_fields:
+            document['fields'] = get_document_fields(doc_id)
+        
         return jsonify({
             'success': True,
             'document': document
@@ -122,11 +636,235 @@ def get_document(doc_id):
         logger.error(f"Error retrieving document: {str(e)}")
         return jsonify({'error': 'Failed to retrieve document'}), 500
 
+
+@app.route('/api/v1/export', methods=['GET'])
+def export():
+    """
+    Stream an export of documents as a chunked response.
+
+    Query parameters: ``format`` (csv, jsonl or parquet), ``type``, ``since``
+    and ``until`` (inclusive dates), ``include_fields`` and ``include_text``.
+    """
+    from app.export import EXPORT_FORMATS, iter_export
+
+    fmt = request.args.get('format', 'csv')
+    try:
+        stream = iter_export(
+            fmt,
+            document_type=request.args.get('type'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            include_fields=_flag('include_fields'),
+            include_text=_flag('include_text'),
+        )
+    except AutoDocException as e:
+        logger.error(f"Export error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+    return Response(
+        stream_with_context(stream),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=documents.{fmt}'},
+    )
+
+
+def _flag(name):
+    """Read a boolean query parameter."""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+@app.route('/api/v1/stats', methods=['GET'])
+def stats():
+    """Document counts per type and per day."""
+    try:
+        from app.db import get_stats
+        days = request.args.get('days', STATS_DAYS, type=int)
+        return jsonify({
+            'success': True,
+            'stats': get_stats(days=max(days, 1))
+        }), 200
+    except Exception as e:
+        logger.error(f"Error computing stats: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve statistics'}), 500
+
+
+@app.route('/api/v1/metrics', methods=['GET'])
+def latency_summary():
+    """Count, mean and p50/p95/p99 latency per stage and per endpoint."""
+    return jsonify({
+        'success': True,
+        'stages': STAGE_SECONDS.summary(),
+        'endpoints': HTTP_REQUEST_SECONDS.summary()
+    }), 200
+
+
+@app.route('/api/v1/traces', methods=['GET'])
+def list_traces():
+    """Summaries of recently completed traces, newest first."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'success': True,
+        'traces': [trace.summary() for trace in TRACE_STORE.recent(max(limit, 1))]
+    }), 200
+
+
+@app.route('/api/v1/traces/export', methods=['GET'])
+def export_traces():
+    """All stored traces as Chrome trace-event JSON (open in ui.perfetto.dev)."""
+    return jsonify(to_chrome_trace(TRACE_STORE.recent())), 200
+
+
+@app.route('/api/v1/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """One trace as Chrome trace-event JSON."""
+    trace = TRACE_STORE.get(trace_id)
+    if trace is None:
+        return jsonify({'error': 'Trace not found'}), 404
+    return jsonify(to_chrome_trace([trace])), 200
+
+
+def debug_endpoint(view):
+    """
+    Guard a debug view: it exists only when PROFILING_ENABLED is set and
+    requires the PROFILING_TOKEN in the X-Debug-Token header.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not (PROFILING_ENABLED and PROFILING_TOKEN):
+            return jsonify({'error': 'Not found'}), 404
+        token = request.headers.get('X-Debug-Token', '')
+        if not hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode()):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/api/v1/debug/profile', methods=['POST'])
+@debug_endpoint
+def arm_profiler():
+    """
+    Profile the next ``requests`` classify requests.
+
+    JSON body: ``{"mode": "sample" | "cprofile" | "memory", "requests": N}``.
+    """
+    from app.profiling import PROFILE_SESSION
+    body = request.get_json(silent=True) or {}
+    try:
+        requests_to_profile = min(int(body.get('requests', 1)), PROFILE_MAX_REQUESTS)
+        PROFILE_SESSION.arm(body.get('mode', 'sample'), requests_to_profile)
+    except (AutoDocException, ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    logger.warning(f"Profiling armed: {PROFILE_SESSION.status()}")
+    return jsonify({'success': True, 'session': PROFILE_SESSION.status()}), 200
+
+
+@app.route('/api/v1/debug/profile', methods=['GET'])
+@debug_endpoint
+def profile_reports():
+    """Reports of profiled requests, oldest first (``?format=text`` for plain text)."""
+    from app.profiling import PROFILE_SESSION, format_report
+    reports = PROFILE_SESSION.recent()
+    if request.args.get('format') == 'text':
+        return Response(''.join(format_report(report) for report in reports), mimetype='text/plain')
+    return jsonify({
+        'success': True,
+        'session': PROFILE_SESSION.status(),
+        'reports': reports
+    }), 200
+
+
+@app.route('/api/v1/debug/profile/file', methods=['POST'])
+@debug_endpoint
+def profile_uploaded_file():
+    """
+    Profile extraction of a file already in the upload folder, bypassing the cache.
+
+    JSON body: ``{"filename": "...", "mode": "sample" | "cprofile" | "memory"}``.
+    """
+    from app.profiling import profile_file, format_report
+    body = request.get_json(silent=True) or {}
+    filename = secure_filename(body.get('filename', ''))
+    filepath = _upload_folder() / filename
+    if not filename or not filepath.is_file():
+        return jsonify({'error': 'File not found in upload folder'}), 404
+    try:
+        result, report = profile_file(str(filepath), body.get('mode', 'sample'))
+    except AutoDocException as e:
+        return jsonify({'error': str(e)}), 400
+    if request.args.get('format') == 'text':
+        return Response(format_report(report), mimetype='text/plain')
+    return jsonify({'success': True, 'result': result, 'report': report}), 200
+
+
+@app.route('/api/v1/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit rates of the per-stage pipeline caches."""
+    from app.pipeline import get_cache_stats
+    return jsonify({
+        'success': True,
+        'stages': get_cache_stats()
+    }), 200
+
+
+@app.route('/api/v1/admission', methods=['GET'])
+def admission_stats():
+    """Load and rejections of the fast and slow classify lanes, and whether OCR is deferred."""
+    controller = get_admission_controller()
+    return jsonify({
+        'success': True,
+        'lanes': controller.stats(),
+        'degraded': controller.degraded()
+    }), 200
+
+
+@app.route('/api/v1/search', methods=['GET'])
+def search():
+    """
+    Full-text search over extracted text.
+
+    Query parameters: ``q`` (FTS5 query, required), ``type`` (document type
+    filter), ``limit`` and ``offset``.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+
+    limit = request.args.get('limit', SEARCH_RESULT_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+
+    try:
+        from app.db import search_documents
+        results = search_documents(
+            query,
+            document_type=request.args.get('type'),
+            limit=limit,
+            offset=max(offset, 0),
+        )
+        return jsonify({
+            'success': True,
+            'query': query,
+            'count': len(results),
+            'results': results
+        }), 200
+    except AutoDocException as e:
+        logger.error(f"Search error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}")
+        return jsonify({'error': 'Failed to search documents'}), 500
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """Handle file too large error."""
     return jsonify({'error': 'File too large'}), 413
 
+
+@app.errorhandler(415)
+def unsupported_media_type(error):
+    """Handle an upload rejected by type while it streamed in."""
+    return jsonify({'error': error.description}), 415
+
 if __name__ == '__main__':
-    init_db()
+    create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -5,21 +5,24 @@ import streamlit as st
 import os
 from pathlib import Path
 import tempfile
-import pandas as pd
 from datetime import datetime
 
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document, get_classification_confidence
-from app.db import init_db, insert_document, get_all_documents
-from app.utils import validate_file, calculate_file_hash
+from app.pipeline import analyze_document
+from app.db import (
+    init_db,
+    insert_document,
+    insert_fields,
+    insert_telemetry,
+    get_all_documents,
+    get_stats,
+)
+from app.export import iter_export
+from app.utils import validate_file
 from app.logger import setup_logging, get_logger
 from app.exceptions import AutoDocException
 from app.config import ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE
 
-# Setup
-setup_logging()
 logger = get_logger(__name__)
-init_db()
 
 # Page config
 st.set_page_config(
@@ -29,6 +32,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource
+def init():
+    """Set up logging and the database once per server process, not on every script rerun."""
+    setup_logging()
+    init_db()
+
+
+init()
+
 # Custom CSS
 st.markdown("""
     <style>
@@ -140,17 +153,17 @@ with tab1:
                     st.text("Extracting text...")
                     progress_bar.progress(33)
                     
-                    text = extract_text_from_file(tmp_path)
+                    result = analyze_document(tmp_path)
+                    text = result['text']
                     
                     # Classify
                     st.text("Classifying document...")
                     progress_bar.progress(66)
                     
-                    doc_type = classify_document(text)
-                    confidence = get_classification_confidence(text, doc_type)
-                    
-                    # Calculate hash
-                    file_hash = calculate_file_hash(tmp_path)
+                    doc_type = result['document_type']
+                    confidence = result['confidence']
+                    fields = result['fields']
+                    file_hash = result['file_hash']
                     
                     # Save to database
                     st.text("Saving to database...")
@@ -159,8 +172,11 @@ with tab1:
                     document_id = insert_document(
                         file_path=uploaded_file.name,
                         document_type=doc_type,
-                        text=text
+                        text=text,
+                        file_hash=file_hash
                     )
+                    insert_fields(document_id, doc_type, fields)
+                    insert_telemetry(document_id, result['telemetry'])
                     
                     progress_bar.empty()
                     
@@ -191,6 +207,11 @@ with tab1:
                     st.markdown(f'<div class="doc-type {conf_class}">Document Type: {doc_type.upper().replace("_", " ")}</div>', 
                                unsafe_allow_html=True)
                     
+                    if fields:
+                        with st.expander("🔑 Extracted Fields", expanded=True):
+                            for name, value in fields.items():
+                                st.write(f"**{name.replace('_', ' ').title()}:** {value}")
+                    
                     # Show extracted text if enabled
                     if show_raw_text:
                         with st.expander("📄 Extracted Text Preview"):
@@ -221,6 +242,7 @@ with tab2:
             st.write(f"**Total Documents:** {len(documents)}")
             
             # Convert to DataFrame
+            import pandas as pd
             df = pd.DataFrame(documents)
             
             # Display as table
@@ -235,11 +257,15 @@ with tab2:
                 }
             )
             
-            # Download button
-            csv = df.to_csv(index=False)
+            # Download button: stream the export to a temporary file rather
+            # than building the whole CSV string in memory
+            export_file = tempfile.TemporaryFile()
+            for chunk in iter_export('csv', include_fields=True):
+                export_file.write(chunk)
+            export_file.seek(0)
             st.download_button(
                 label="📥 Download CSV",
-                data=csv,
+                data=export_file,
                 file_name=f"documents_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
@@ -253,33 +279,38 @@ with tab3:
     st.header("📈 Statistics")
     
     try:
-        documents = get_all_documents()
+        stats = get_stats()
+        total = stats['total']
+        type_counts = stats['by_type']
         
-        if documents:
-            df = pd.DataFrame(documents)
-            
+        if total:
+            import pandas as pd
+
             # Document type distribution
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Document Type Distribution")
-                type_counts = df['document_type'].value_counts()
-                st.bar_chart(type_counts)
+                st.bar_chart(pd.Series(type_counts, name="count"))
             
             with col2:
                 st.subheader("Statistics Summary")
-                st.metric("Total Documents", len(documents))
-                st.metric("Unique Types", df['document_type'].nunique())
+                st.metric("Total Documents", total)
+                st.metric("Unique Types", len(type_counts))
                 
-                # Most common type
-                if not type_counts.empty:
-                    most_common = type_counts.index[0]
+                # Most common type (counts are ordered most common first)
+                if type_counts:
+                    most_common = next(iter(type_counts))
                     st.metric("Most Common Type", most_common.replace("_", " ").title())
             
+            if stats['by_day']:
+                st.subheader("Documents per Day")
+                st.bar_chart(pd.Series(stats['by_day'], name="count").sort_index())
+            
             # Detailed breakdown
             st.subheader("Type Breakdown")
             for doc_type, count in type_counts.items():
-                percentage = (count / len(documents)) * 100
+                percentage = (count / total) * 100
                 st.write(f"**{doc_type.replace('_', ' ').title()}:** {count} documents ({percentage:.1f}%)")
                 st.progress(percentage / 100)
         else:
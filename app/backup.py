@@ -0,0 +1,222 @@
+"""
+Online backups and text retention for the document database.
+
+Backups use SQLite's online backup API and copy a few pages per step, releasing
+the database between steps so writers are never blocked for the length of the
+copy. Retention moves the ``raw_text`` of old documents into compressed archive
+files and returns the freed pages to the filesystem with incremental vacuum.
+"""
+import gzip
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app import db
+from app.config import (
+    DATABASE_BACKUP_DIR,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP,
+    BACKUP_KEEP,
+    ARCHIVE_DIR,
+    TEXT_RETENTION_DAYS,
+    ARCHIVE_BATCH_SIZE,
+)
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+BACKUP_PREFIX = 'documents-'
+
+
+def _timestamped_name(prefix: str, suffix: str) -> str:
+    """
+    A file name unique even for two runs in the same second.
+
+    ``<prefix>YYYYmmdd-HHMMSS-ffffff-<8 hex><suffix>``: the fixed-width
+    timestamp sorts chronologically and the random part keeps concurrent
+    runs (e.g. the CLI and a scheduler) from replacing each other's file.
+    """
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return f"{prefix}{timestamp}-{uuid.uuid4().hex[:8]}{suffix}"
+
+
+def _backup_age_key(path: Path):
+    # Older names have no microseconds or suffix: documents-YYYYmmdd-HHMMSS.db
+    date, time_of_day, *rest = path.name[len(BACKUP_PREFIX):-len('.db')].split('-')
+    return date, time_of_day, rest
+
+
+def backup_database(
+    backup_dir=DATABASE_BACKUP_DIR,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+    keep: int = BACKUP_KEEP,
+) -> Dict[str, Any]:
+    """
+    Copy the live database to ``backup_dir`` without pausing writers.
+
+    The copy is written under a temporary name and renamed when complete, so
+    a backup file is never observed half-written. Only the ``keep`` most
+    recent backups are retained. Returns the backup path, its size in bytes,
+    the number of pages copied and the elapsed time.
+    """
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    target = backup_dir / _timestamped_name(BACKUP_PREFIX, '.db')
+    partial = target.with_suffix('.db.partial')
+    logger.info(f"Starting online backup to {target}")
+
+    pages = {'total': 0}
+
+    def progress(status, remaining, total):
+        pages['total'] = total
+
+    start = time.perf_counter()
+    source = db.get_connection()
+    destination = sqlite3.connect(partial)
+    try:
+        source.backup(destination, pages=pages_per_step, progress=progress, sleep=step_sleep)
+    finally:
+        destination.close()
+        source.close()
+    os.replace(partial, target)
+    elapsed = time.perf_counter() - start
+
+    size = target.stat().st_size
+    logger.info(f"Backup complete: {size} bytes, {pages['total']} pages in {elapsed:.2f}s")
+
+    removed = _prune_backups(backup_dir, keep)
+    return {
+        'path': str(target),
+        'bytes': size,
+        'pages': pages['total'],
+        'seconds': elapsed,
+        'pruned': removed,
+    }
+
+
+def _prune_backups(backup_dir: Path, keep: int) -> int:
+    backups = sorted(backup_dir.glob(f"{BACKUP_PREFIX}*.db"), key=_backup_age_key)
+    stale = backups[:-keep] if keep > 0 else []
+    for path in stale:
+        path.unlink()
+        logger.info(f"Removed old backup {path}")
+    return len(stale)
+
+
+def archive_old_text(
+    older_than_days: int = TEXT_RETENTION_DAYS,
+    archive_dir=ARCHIVE_DIR,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Move ``raw_text`` of documents older than ``older_than_days`` to cold storage.
+
+    Text is written to a gzip-compressed JSONL file (one ``{"id", "raw_text"}``
+    object per line) and the row keeps the archive path in ``text_archive``.
+    Each batch is flushed to disk before its rows are cleared, and rows are
+    cleared in short transactions so concurrent writers only wait for one
+    batch. Archived text is no longer part of the full-text search index.
+    Finally freed pages are released with incremental vacuum.
+    """
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archive_path = archive_dir / _timestamped_name('text-', '.jsonl.gz')
+    logger.info(f"Archiving text older than {older_than_days} days to {archive_path}")
+
+    start = time.perf_counter()
+    conn = db.get_connection()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    archived = 0
+    text_bytes = 0
+    last_id = 0
+
+    with gzip.open(archive_path, 'wb') as archive:
+        while True:
+            rows = conn.execute(
+                """
+                SELECT id, raw_text FROM documents
+                WHERE id > ? AND raw_text IS NOT NULL
+                  AND created_at < datetime('now', ?)
+                ORDER BY id LIMIT ?
+                """,
+                (last_id, f"-{older_than_days} days", batch_size),
+            ).fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                record = {'id': row['id'], 'raw_text': row['raw_text']}
+                archive.write((json.dumps(record) + '\n').encode('utf-8'))
+                text_bytes += len(row['raw_text'].encode('utf-8'))
+            # The text must be on disk before it is removed from the database
+            archive.flush()
+            os.fsync(archive.fileobj.fileno())
+
+            ids = [row['id'] for row in rows]
+            conn.executemany(
+                "UPDATE documents SET raw_text = NULL, text_archive = ? WHERE id = ?",
+                [(str(archive_path), document_id) for document_id in ids],
+            )
+            conn.commit()
+            archived += len(ids)
+            last_id = ids[-1]
+
+    if not archived:
+        archive_path.unlink()
+
+    freed_pages = _incremental_vacuum(conn)
+    conn.close()
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        f"Archived {archived} documents ({text_bytes} bytes of text), "
+        f"reclaimed {freed_pages * page_size} bytes in {elapsed:.2f}s"
+    )
+    return {
+        'archive': str(archive_path) if archived else None,
+        'documents': archived,
+        'text_bytes': text_bytes,
+        'archive_bytes': archive_path.stat().st_size if archived else 0,
+        'reclaimed_bytes': freed_pages * page_size,
+        'seconds': elapsed,
+    }
+
+
+def _incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """Release free pages to the filesystem and return how many were freed."""
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        logger.warning(
+            "auto_vacuum is not INCREMENTAL for this database; free pages will be "
+            "reused but not returned to the filesystem"
+        )
+        return 0
+
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # execute() would step the pragma once, freeing a single page;
+    # executescript() runs it to completion
+    conn.commit()
+    conn.executescript("PRAGMA incremental_vacuum;")
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
+
+
+def load_archived_text(document_id: int) -> Optional[str]:
+    """Read a document's archived ``raw_text`` back from cold storage."""
+    document = db.get_document_by_id(document_id)
+    if not document or not document.get('text_archive'):
+        return None
+
+    with gzip.open(document['text_archive'], 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            record = json.loads(line)
+            if record['id'] == document_id:
+                return record['raw_text']
+    return None
@@ -0,0 +1,213 @@
+"""
+Batch document analysis on a shared worker pool.
+
+A batch (a loan packet of tens of files, uploaded as separate files or as a
+zip or tar archive) is analyzed concurrently: each file is one task on a
+process-wide pool, and results are yielded as they finish, so a caller can
+stream them. With the default process pool one batch uses every core;
+``BATCH_EXECUTOR=thread`` keeps the work in-process (useful where worker
+processes cannot be started), at the cost of sharing the GIL.
+"""
+import atexit
+import multiprocessing
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from werkzeug.utils import secure_filename
+
+from app.config import (
+    MAX_UPLOAD_SIZE,
+    BATCH_MAX_FILES,
+    BATCH_MAX_UPLOAD_SIZE,
+    BATCH_WORKERS,
+    BATCH_EXECUTOR,
+)
+from app.exceptions import ValidationError
+from app.logger import get_logger
+from app.metrics import STAGE_SECONDS, STAGE_TOTAL
+from app.performance import current_span, in_current_context, record_span
+
+logger = get_logger(__name__)
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# Histogram stage -> (telemetry timing, pipeline cache stage)
+_TELEMETRY_STAGES = {
+    'extraction': ('extraction_ms', 'text'),
+    'classification': ('classification_ms', 'classification'),
+    'field_extraction': ('field_extraction_ms', 'fields'),
+}
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def unpack_archive(archive_path, dest_dir, start_index: int = 0) -> List[Tuple[str, Path]]:
+    """
+    Extract the regular files of a zip or tar archive into ``dest_dir``.
+
+    Member paths are never used on disk (only a sanitized base name, prefixed
+    with its position in the batch), so an archive cannot write outside
+    ``dest_dir``. Raises ``ValidationError`` when the archive is unreadable
+    or holds more than ``BATCH_MAX_FILES`` files or ``BATCH_MAX_UPLOAD_SIZE``
+    bytes. Returns ``(member name, extracted path)`` pairs in archive order.
+    """
+    archive_path = Path(archive_path)
+    dest_dir = Path(dest_dir)
+    try:
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                members = [(info.filename, info.file_size, info)
+                           for info in archive.infolist() if not info.is_dir()]
+                _check_archive_limits(archive_path, members, start_index)
+                return [
+                    (name, _copy_member(archive.open(info), dest_dir, start_index + n, name))
+                    for n, (name, _, info) in enumerate(members)
+                ]
+        with tarfile.open(archive_path) as archive:
+            members = [(info.name, info.size, info) for info in archive if info.isfile()]
+            _check_archive_limits(archive_path, members, start_index)
+            return [
+                (name, _copy_member(archive.extractfile(info), dest_dir, start_index + n, name))
+                for n, (name, _, info) in enumerate(members)
+            ]
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise ValidationError(f"Cannot read archive {archive_path.name}: {e}")
+
+
+def _check_archive_limits(archive_path: Path, members, start_index: int):
+    if start_index + len(members) > BATCH_MAX_FILES:
+        raise ValidationError(
+            f"Archive {archive_path.name} brings the batch to {start_index + len(members)} files; "
+            f"the limit is {BATCH_MAX_FILES}"
+        )
+    total = sum(size for _, size, _ in members)
+    if total > BATCH_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            f"Archive {archive_path.name} unpacks to {total} bytes; "
+            f"the limit is {BATCH_MAX_UPLOAD_SIZE}"
+        )
+
+
+def _copy_member(source, dest_dir: Path, index: int, name: str) -> Path:
+    """Copy one member, stopping early once it exceeds the per-file limit."""
+    path = dest_dir / batch_filename(index, name)
+    with source, open(path, 'wb') as out:
+        # Declared sizes can lie; copy at most one byte past the limit so
+        # validate_file rejects an oversized member without unpacking all of it
+        shutil.copyfileobj(_Limited(source, MAX_UPLOAD_SIZE + 1), out)
+    return path
+
+
+class _Limited:
+    """Read at most ``remaining`` bytes from a file object."""
+
+    def __init__(self, source, remaining: int):
+        self.source = source
+        self.remaining = remaining
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.source.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def batch_filename(index: int, name: str) -> str:
+    """Unique on-disk name for a batch member: files in a packet often share a name."""
+    return f"{index:03d}-{secure_filename(Path(name).name) or 'file'}"
+
+
+def _analyze(path: str) -> Dict[str, Any]:
+    # Imported here so a worker process only loads the pipeline when it runs a task
+    from app.pipeline import analyze_document
+    return analyze_document(path)
+
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+def get_batch_pool() -> Executor:
+    """Get the process-wide batch pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if BATCH_EXECUTOR == 'thread':
+                _pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+            else:
+                # forkserver: forking a server process that runs request and
+                # writer threads could copy a lock held by one of them
+                methods = multiprocessing.get_all_start_methods()
+                method = 'forkserver' if 'forkserver' in methods else 'spawn'
+                context = multiprocessing.get_context(method)
+                _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=context)
+            atexit.register(_pool.shutdown)
+            logger.info(f"Started batch pool: {BATCH_WORKERS} {BATCH_EXECUTOR} workers")
+        return _pool
+
+
+def _reset_pool(broken: Executor):
+    """Drop a pool whose worker died so the next batch starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def analyze_batch(
+    paths: Sequence[str],
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[BaseException]]]:
+    """
+    Analyze ``paths`` concurrently; yield ``(index, result, error)`` as each finishes.
+
+    Exactly one of ``result`` and ``error`` is set. Stage latencies measured
+    in worker processes are recorded in this process's histograms, and each
+    file is recorded as a span of the active trace.
+    """
+    pool = get_batch_pool()
+    in_process = isinstance(pool, ThreadPoolExecutor)
+    parent = current_span()
+    submitted_at = time.perf_counter()
+    # A context can only be entered by one thread at a time: copy it per task
+    futures = {
+        pool.submit(in_current_context(_analyze) if in_process else _analyze, str(path)): index
+        for index, path in enumerate(paths)
+    }
+
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"Batch worker died while processing {paths[index]}")
+            _reset_pool(pool)
+            yield index, None, e
+            continue
+        except Exception as e:
+            yield index, None, e
+            continue
+        if not in_process:
+            _observe_stages(result['telemetry'])
+            record_span(parent, 'batch.file', submitted_at, time.perf_counter(),
+                        file=Path(paths[index]).name)
+        yield index, result, None
+
+
+def _observe_stages(telemetry: Dict[str, Any]):
+    for stage, (key, cache_stage) in _TELEMETRY_STAGES.items():
+        # A cache hit did not run the stage; the worker did not observe it either
+        if telemetry.get(key) is not None and not telemetry['cache_hits'].get(cache_stage):
+            STAGE_SECONDS.observe(telemetry[key] / 1000, stage=stage)
+            STAGE_TOTAL.inc(stage=stage, outcome='success')
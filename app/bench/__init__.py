@@ -0,0 +1,44 @@
+"""
+Benchmarks for AutoDoc Classifier.
+
+``python -m app.bench`` runs the end-to-end pipeline benchmark over a
+synthetic corpus (see ``app.bench.corpus``). Each module in this package is
+also runnable on its own, e.g. ``python -m app.bench.search --docs 1000000``.
+"""
+import math
+from typing import Dict, Iterable
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile (0-100) of ``values`` using nearest-rank."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: Iterable[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) as milliseconds percentiles."""
+    values = list(latencies)
+    if not values:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0,
+                'max_ms': 0.0}
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': max(values) * 1000,
+    }
+
+
+def format_summary(name: str, summary: Dict[str, float]) -> str:
+    """Format a latency summary as a single report line."""
+    return (
+        f"{name:<28} n={summary['count']:<7} "
+        f"mean={summary['mean_ms']:.2f}ms p50={summary['p50_ms']:.2f}ms "
+        f"p95={summary['p95_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms "
+        f"max={summary['max_ms']:.2f}ms"
+    )
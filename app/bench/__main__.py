@@ -0,0 +1,222 @@
+"""
+End-to-end pipeline throughput benchmark.
+
+Generates (or reuses) a synthetic corpus, then runs the full pipeline (text
+extraction, OCR where needed, classification, field extraction and the
+database write) over it once per worker count. Reports documents per second
+and per-stage latency percentiles, and compares throughput with a stored
+JSON baseline, exiting non-zero when it regresses past ``--threshold``.
+
+The pipeline cache is disabled so every document is processed in full.
+
+Usage:
+    python -m app.bench --docs 140 --workers 1,2,4
+    python -m app.bench --save-baseline
+    python -m app.bench --baseline .bench/baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.bench import summarize, format_summary
+from app.bench.corpus import KINDS, generate_corpus
+
+STAGES = ('extraction_ms', 'ocr_ms', 'classification_ms', 'field_extraction_ms', 'db_write_ms',
+          'total_ms')
+
+DEFAULT_BASELINE = Path('.bench') / 'baseline.json'
+
+
+def _init_worker(db_path: str):
+    """Point a worker at the benchmark database and turn the pipeline cache off."""
+    from app import db, pipeline
+    db.DB_PATH = db_path
+    pipeline.PIPELINE_CACHE_ENABLED = False
+    # Failures are counted in the report; per-document log lines would drown it
+    logging.disable(logging.CRITICAL)
+
+
+def process_document(path: str, expected_type: str) -> Dict[str, Any]:
+    """Run one document through the pipeline and store it; returns its timings."""
+    from app import db
+    from app.pipeline import analyze_document
+
+    start = time.perf_counter()
+    result = analyze_document(path)
+    write_start = time.perf_counter()
+    document_id = db.insert_document(path, result['document_type'], result['text'],
+                                     result['file_hash'])
+    db.insert_fields(document_id, result['document_type'], result['fields'])
+    db.insert_telemetry(document_id, result['telemetry'])
+    end = time.perf_counter()
+
+    telemetry = result['telemetry']
+    timings = {stage: telemetry.get(stage) or 0.0 for stage in STAGES}
+    timings['db_write_ms'] = (end - write_start) * 1000
+    timings['total_ms'] = (end - start) * 1000
+    return {
+        'timings': timings,
+        'correct': result['document_type'] == expected_type,
+        'ocr_used': bool(telemetry.get('ocr_used')),
+    }
+
+
+def run(documents: List[Dict[str, str]], workers: int, executor: str,
+        workdir: Path) -> Dict[str, Any]:
+    """Process every document with ``workers`` workers; return throughput and stage stats."""
+    db_path = str(workdir / f"bench-{executor}-{workers}.db")
+    from app import db
+    db.DB_PATH = db_path
+    db.init_db()
+
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_class(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        # Start the workers before timing so process start-up is not measured
+        list(pool.map(_noop, range(workers)))
+        start = time.perf_counter()
+        futures = [pool.submit(process_document, doc['path'], doc['document_type'])
+                   for doc in documents]
+        results = []
+        errors = 0
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"error: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'workers': workers,
+        'documents': len(results),
+        'errors': errors,
+        'seconds': elapsed,
+        'docs_per_sec': len(results) / elapsed if elapsed else 0.0,
+        'accuracy': sum(r['correct'] for r in results) / len(results) if results else 0.0,
+        'ocr_documents': sum(r['ocr_used'] for r in results),
+        'stages': {
+            stage: summarize([r['timings'][stage] / 1000 for r in results])
+            for stage in STAGES
+        },
+    }
+
+
+def _noop(_):
+    return None
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Return a message for every worker count whose throughput fell below the baseline."""
+    regressions = []
+    for workers, result in results.items():
+        previous = baseline.get('results', {}).get(workers)
+        if not previous:
+            continue
+        floor = previous['docs_per_sec'] * (1 - threshold)
+        change = result['docs_per_sec'] / previous['docs_per_sec'] - 1
+        line = (f"workers={workers}: {result['docs_per_sec']:.2f} docs/s vs baseline "
+                f"{previous['docs_per_sec']:.2f} ({change:+.1%})")
+        print(line)
+        if result['docs_per_sec'] < floor:
+            regressions.append(line)
+    return regressions
+
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'tesseract': shutil.which('tesseract') is not None,
+    }
+
+
+def report(result: Dict[str, Any]):
+    print(f"\nworkers={result['workers']}: {result['documents']} documents in "
+          f"{result['seconds']:.2f}s = {result['docs_per_sec']:.2f} docs/s "
+          f"(errors={result['errors']}, ocr={result['ocr_documents']}, "
+          f"accuracy={result['accuracy']:.0%})")
+    for stage, summary in result['stages'].items():
+        print(format_summary(f"  {stage[:-3]}", summary))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end pipeline throughput")
+    parser.add_argument("--docs", type=int, default=140, help="Documents in the corpus")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    parser.add_argument("--kinds", default=','.join(KINDS),
+                        help=f"Comma-separated renditions to include (default: {','.join(KINDS)})")
+    parser.add_argument("--corpus", default=".bench/corpus",
+                        help="Corpus directory (reused when it matches)")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process",
+                        help="Worker type (default: process)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Fail when docs/sec drops by more than this fraction (default: 0.10)")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), metavar="PATH",
+                        help=f"Write the results as the new baseline (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--output", help="Write the full results JSON to this path")
+    args = parser.parse_args(argv)
+
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    worker_counts = [int(count) for count in args.workers.split(',') if count]
+
+    info = machine_info()
+    if not info['tesseract'] and set(kinds) & {'scanned', 'image'}:
+        print("warning: tesseract is not installed; scanned documents will yield no text",
+              file=sys.stderr)
+
+    start = time.perf_counter()
+    documents = generate_corpus(args.corpus, args.docs, args.seed, kinds)
+    print(f"Corpus: {len(documents)} documents ({', '.join(kinds)}) in {args.corpus} "
+          f"[{time.perf_counter() - start:.1f}s]")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in worker_counts:
+            result = run(documents, workers, args.executor, Path(workdir))
+            results[str(workers)] = result
+            report(result)
+
+    output = {
+        'corpus': {'docs': args.docs, 'seed': args.seed, 'kinds': kinds},
+        'executor': args.executor,
+        'machine': info,
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(output, indent=2))
+
+    status = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get('corpus') != output['corpus']:
+            print("warning: baseline was recorded on a different corpus", file=sys.stderr)
+        print(f"\nComparison with {args.baseline} (threshold {args.threshold:.0%}):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nFAIL: throughput regressed for {len(regressions)} worker counts",
+                  file=sys.stderr)
+            status = 1
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(output, indent=2))
+        print(f"\nBaseline saved to {path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
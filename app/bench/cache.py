@@ -0,0 +1,80 @@
+"""
+LRUCache micro-benchmark.
+
+Compares ``app.cache.LRUCache`` with the previous list-based implementation,
+whose ``access_order.remove(key)`` made every get and set O(n).
+
+Usage: python -m app.bench.cache [--entries 100000] [--ops 200000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from app.cache import LRUCache
+
+
+class ListLRUCache:
+    """The previous implementation, kept as the benchmark baseline."""
+
+    def __init__(self, max_size=100):
+        self.cache = {}
+        self.max_size = max_size
+        self.access_order = []
+
+    def get(self, key):
+        if key in self.cache:
+            self.access_order.remove(key)
+            self.access_order.append(key)
+            return self.cache[key]
+        return None
+
+    def set(self, key, value):
+        if key in self.cache:
+            self.access_order.remove(key)
+        elif len(self.cache) >= self.max_size:
+            lru_key = self.access_order.pop(0)
+            del self.cache[lru_key]
+        self.cache[key] = value
+        self.access_order.append(key)
+
+
+def measure(cache, entries, ops, seed):
+    """Fill ``cache`` to capacity, then time a 90/10 get/set mix; returns µs/op."""
+    for key in range(entries):
+        cache.set(key, key)
+
+    rng = random.Random(seed)
+    keys = [rng.randrange(entries * 2) for _ in range(ops)]
+    start = time.perf_counter()
+    for n, key in enumerate(keys):
+        if n % 10:
+            cache.get(key)
+        else:
+            cache.set(key, key)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LRUCache get/set")
+    parser.add_argument("--entries", type=int, default=100_000, help="Cache capacity")
+    parser.add_argument("--ops", type=int, default=200_000, help="Operations (new cache)")
+    parser.add_argument("--baseline-ops", type=int, default=2_000,
+                        help="Operations for the O(n) baseline")
+    args = parser.parse_args(argv)
+
+    new = measure(LRUCache(max_size=args.entries), args.entries, args.ops, 0)
+    sized = measure(LRUCache(max_size=args.entries, max_bytes=1 << 30, ttl=3600),
+                    args.entries, args.ops, 0)
+    old = measure(ListLRUCache(max_size=args.entries), args.entries, args.baseline_ops, 0)
+
+    print(f"entries={args.entries}")
+    print(f"{'LRUCache':<32} {new:10.2f} µs/op")
+    print(f"{'LRUCache (max_bytes + ttl)':<32} {sized:10.2f} µs/op")
+    print(f"{'list-based (previous)':<32} {old:10.2f} µs/op")
+    print(f"speedup: {old / new:.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Synthetic document corpus for benchmarks.
+
+Generates invoices, purchase orders, pay stubs, W-2s, driver licenses,
+passports and flood forms in three renditions:
+
+- ``digital``: PDFs with embedded text (the pdfplumber path)
+- ``scanned``: PDFs wrapping a slightly rotated, noisy page image (the OCR
+  fallback path)
+- ``image``: PNG or JPEG page images (the image OCR path)
+
+Content is driven by a seeded RNG, so the same ``seed`` and ``count`` give the
+same corpus. A ``manifest.json`` records every file with its expected type;
+``generate_corpus`` reuses a directory whose manifest matches.
+
+Usage: python -m app.bench.corpus --docs 200 --out .bench/corpus
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+DOCUMENT_TYPES = (
+    'invoice', 'purchase_order', 'pay_stub', 'w2',
+    'driver_license', 'passport', 'flood_form',
+)
+KINDS = ('digital', 'scanned', 'image')
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # PDF points (US Letter)
+FONT_SIZE, LEADING, MARGIN = 10, 14, 54
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+SCAN_DPI = 150
+
+FIRST_NAMES = ('James', 'Maria', 'Robert', 'Linda', 'Wei', 'Aisha', 'Carlos', 'Olga', 'Sanjay',
+               'Emma')
+LAST_NAMES = ('Smith', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Patel', 'Johnson', 'Silva', 'Kim',
+              'Weber')
+COMPANIES = ('Acme Corp', 'Globex Inc', 'Initech LLC', 'Umbrella Supply', 'Stark Industries',
+             'Wayne Logistics', 'Hooli Services', 'Vandelay Imports', 'Soylent Foods',
+             'Tyrell Systems')
+ITEMS = ('Paper A4 box', 'Toner cartridge', 'USB-C cable', 'Office chair', 'Standing desk',
+         'Monitor 27in', 'Keyboard', 'Network switch', 'Label printer', 'Shipping boxes')
+COUNTIES = ('ORANGE COUNTY', 'KING COUNTY', 'COOK COUNTY', 'HARRIS COUNTY', 'DADE COUNTY')
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _date(rng, sep='/'):
+    return f"{rng.randint(2019, 2024)}{sep}{rng.randint(1, 12):02d}{sep}{rng.randint(1, 28):02d}"
+
+
+def _line_items(rng, count):
+    lines, total = [], 0.0
+    for n in range(count):
+        quantity = rng.randint(1, 20)
+        price = rng.randint(100, 50000) / 100
+        total += quantity * price
+        lines.append(f"{n + 1:>3}  {rng.choice(ITEMS):<20} {quantity:>4} x {price:>9.2f} "
+                     f"= {quantity * price:>10.2f}")
+    return lines, total
+
+
+def invoice_lines(rng) -> List[str]:
+    items, total = _line_items(rng, rng.randint(3, 60))
+    return [
+        'INVOICE',
+        f"Invoice Number: INV-{rng.randint(10000, 99999)}",
+        f"Invoice Date: {_date(rng)}",
+        f"From: {rng.choice(COMPANIES)}",
+        f"Bill To: {_name(rng)}",
+        '',
+        *items,
+        '',
+        f"Total Amount: ${total:,.2f}",
+    ]
+
+
+def purchase_order_lines(rng) -> List[str]:
+    items, total = _line_items(rng, rng.randint(3, 60))
+    return [
+        'PURCHASE ORDER',
+        f"PO Number: PO-{rng.randint(10000, 99999)}",
+        f"PO Date: {_date(rng)}",
+        f"Buyer: {rng.choice(COMPANIES)}",
+        'Quantity and unit price as listed below',
+        '',
+        *items,
+        '',
+        f"Total Amount: ${total:,.2f}",
+    ]
+
+
+def pay_stub_lines(rng) -> List[str]:
+    gross = rng.randint(150000, 900000) / 100
+    net = gross * rng.uniform(0.65, 0.8)
+    return [
+        'PAY STUB',
+        f"EMPLOYER NAME/ADDRESS: {rng.choice(COMPANIES)}, 100 Main St",
+        f"EMPLOYEE NAME/ADDRESS: {_name(rng)}, {rng.randint(1, 999)} Oak Ave",
+        f"Payroll ID: {rng.randint(100000, 999999)}",
+        f"Cycle: {_date(rng, '-')} - {_date(rng, '-')}",
+        f"Pay Rate: ${rng.randint(40, 200)},000/yr",
+        f"Pay Date: {_date(rng, '-')}",
+        'EARNINGS',
+        'GROSS PAY',
+        f"{gross:,.2f}",
+        'DEDUCTIONS',
+        f"Federal tax {gross * 0.12:,.2f}",
+        'NET PAY',
+        f"{net:,.2f}",
+    ]
+
+
+def w2_lines(rng) -> List[str]:
+    return [
+        'Form W-2 Wage and Tax Statement',
+        f"a Employee's social security number "
+        f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        f"b Employer identification number (EIN) "
+        f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+        f"c Employer's name {rng.choice(COMPANIES)}",
+        f"e Employee's name {_name(rng)}",
+        f"1 Wages, tips, other compensation {rng.randint(20000, 250000):,}.00",
+        f"2 Federal income tax withheld {rng.randint(2000, 50000):,}.00",
+    ]
+
+
+def driver_license_lines(rng) -> List[str]:
+    return [
+        'DRIVER LICENSE',
+        f"DL {rng.choice('ABCDEFGH')}{rng.randint(1000000, 9999999)}",
+        f"SAMPLE {rng.choice(FIRST_NAMES)}",
+        f"DOB {rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1950, 2005)}",
+        f"EXP {rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2025, 2032)}",
+        'CLASS C',
+    ]
+
+
+def passport_lines(rng) -> List[str]:
+    return [
+        'PASSPORT',
+        'UNITED STATES OF AMERICA',
+        f"Passport No. {rng.randint(100000000, 999999999)}",
+        f"Surname: {rng.choice(LAST_NAMES).upper()}",
+        f"Given names: {rng.choice(FIRST_NAMES).upper()}",
+        f"Date of birth: {rng.randint(1, 28):02d} JAN {rng.randint(1950, 2005)}",
+    ]
+
+
+def flood_form_lines(rng) -> List[str]:
+    return [
+        'STANDARD FLOOD HAZARD DETERMINATION FORM',
+        'FEDERAL EMERGENCY MANAGEMENT AGENCY',
+        'Lender: The Federal Savings Bank',
+        f"Borrower: {_name(rng).upper()}",
+        f"Address Determination Address: {rng.randint(1, 9999)} Elm St",
+        rng.choice(COUNTIES),
+        f"Flood Zone: {rng.choice(['A', 'AE', 'X', 'VE'])}",
+    ]
+
+
+TEMPLATES = {
+    'invoice': invoice_lines,
+    'purchase_order': purchase_order_lines,
+    'pay_stub': pay_stub_lines,
+    'w2': w2_lines,
+    'driver_license': driver_license_lines,
+    'passport': passport_lines,
+    'flood_form': flood_form_lines,
+}
+
+
+def _pages(lines: Sequence[str]) -> List[List[str]]:
+    return [list(lines[i:i + LINES_PER_PAGE]) for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_text_pdf(path: Path, lines: Sequence[str]) -> None:
+    """Write a minimal PDF whose pages carry ``lines`` as real text."""
+    pages = _pages(lines)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+    ]
+    kids = []
+    for page_lines in pages:
+        ops = [f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        ops.extend(f"({_pdf_escape(line)}) '" for line in page_lines)
+        ops.append('ET')
+        stream = '\n'.join(ops).encode('latin-1', 'replace')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_ref)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b' '.join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += (b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, xref))
+    path.write_bytes(bytes(out))
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has only the small bitmap font
+        return ImageFont.load_default()
+
+
+def render_page(lines: Sequence[str], rng: random.Random, dpi: int = SCAN_DPI) -> Image.Image:
+    """Render lines onto a grayscale page that looks scanned (skewed, noisy)."""
+    scale = dpi / 72
+    width, height = int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    font = _font(int(FONT_SIZE * scale))
+    y = MARGIN * scale
+    for line in lines:
+        draw.text((MARGIN * scale, y), line, fill=rng.randint(0, 60), font=font)
+        y += LEADING * scale
+
+    page = page.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=255)
+    noise = Image.effect_noise((width, height), rng.uniform(8, 20))
+    return Image.blend(page, noise, 0.12)
+
+
+def generate_document(path: Path, document_type: str, kind: str, rng: random.Random) -> Path:
+    """Write one synthetic document and return its path (suffix set by kind)."""
+    lines = TEMPLATES[document_type](rng)
+    if kind == 'digital':
+        path = path.with_suffix('.pdf')
+        write_text_pdf(path, lines)
+    elif kind == 'scanned':
+        path = path.with_suffix('.pdf')
+        pages = [render_page(page_lines, rng) for page_lines in _pages(lines)]
+        pages[0].save(path, 'PDF', resolution=SCAN_DPI, save_all=True, append_images=pages[1:])
+    elif kind == 'image':
+        page = render_page(_pages(lines)[0], rng)
+        if rng.random() < 0.5:
+            path = path.with_suffix('.png')
+            page.save(path, 'PNG')
+        else:
+            path = path.with_suffix('.jpg')
+            page.save(path, 'JPEG', quality=85)
+    else:
+        raise ValueError(f"Unknown document kind {kind!r}. Allowed: {KINDS}")
+    return path
+
+
+def generate_corpus(
+    directory,
+    count: int = 100,
+    seed: int = 42,
+    kinds: Sequence[str] = KINDS,
+    document_types: Sequence[str] = DOCUMENT_TYPES,
+) -> List[Dict[str, str]]:
+    """
+    Generate (or reuse) a corpus of ``count`` documents in ``directory``.
+
+    Types and kinds are assigned round-robin so every mix is represented.
+    Returns the manifest: one ``{"path", "document_type", "kind"}`` per file.
+    """
+    directory = Path(directory)
+    manifest_path = directory / 'manifest.json'
+    params = {'count': count, 'seed': seed, 'kinds': list(kinds),
+              'document_types': list(document_types)}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get('params') == params and all(
+            Path(entry['path']).exists() for entry in manifest['documents']
+        ):
+            return manifest['documents']
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    documents = []
+    for n in range(count):
+        document_type = document_types[n % len(document_types)]
+        kind = kinds[(n // len(document_types)) % len(kinds)]
+        path = generate_document(directory / f"{n:05d}-{document_type}-{kind}",
+                                 document_type, kind, rng)
+        documents.append({'path': str(path), 'document_type': document_type, 'kind': kind})
+
+    manifest_path.write_text(json.dumps({'params': params, 'documents': documents}, indent=2))
+    return documents
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic document corpus")
+    parser.add_argument("--docs", type=int, default=100, help="Number of documents")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--kinds", default=','.join(KINDS), help="Comma-separated renditions")
+    parser.add_argument("--out", default=".bench/corpus", help="Output directory")
+    args = parser.parse_args(argv)
+
+    documents = generate_corpus(args.out, args.docs, args.seed, args.kinds.split(','))
+    print(f"{len(documents)} documents in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Cold-start benchmark: import time of the entry points.
+
+Each entry point is imported in a fresh interpreter under ``-X importtime``
+and its cumulative import time is reported with the slowest modules it
+loads. Heavy dependencies (pdfplumber, PIL, pytesseract, pandas, ...) must
+not be imported at load: they are only needed once a document is actually
+processed, and autoscaled or short-lived batch containers pay for every
+import on every start. The wall time of ``cli.py --help`` and of a first
+``/health`` request is measured too.
+
+Exits non-zero when an entry point imports a heavy dependency, or when a
+median is more than ``--threshold`` above the saved baseline.
+
+Usage:
+    python -m app.bench.imports
+    python -m app.bench.imports --save-baseline .bench/imports-baseline.json
+    python -m app.bench.imports --baseline .bench/imports-baseline.json --threshold 0.5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.bench.micro import load_baseline, regression, save_baseline
+
+ROOT = Path(__file__).resolve().parents[2]
+
+ENTRY_POINTS = ('cli', 'app.api', 'app.jobs', 'app.pipeline', 'app.batch')
+
+HEAVY_MODULES = ('pdfplumber', 'pdfminer', 'PIL', 'pytesseract', 'pandas', 'numpy', 'pyarrow',
+                 'streamlit')
+
+COMMANDS = {
+    'cli --help': ['cli.py', '--help'],
+    'health': ['-c', "from app.api import app; "
+                     "assert app.test_client().get('/health').status_code == 200"],
+}
+
+DEFAULT_BASELINE = Path('.bench') / 'imports-baseline.json'
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, Any]]:
+    """Parse ``-X importtime`` output into {module: {'self_us', 'cumulative_us', 'depth'}}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = {'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                                 'depth': depth}
+    return modules
+
+
+def import_profile(module: str) -> Dict[str, Any]:
+    """Import ``module`` in a fresh interpreter and return its import-time profile."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(completed.stderr)
+    heavy = sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES))
+    slowest = sorted(modules.items(), key=lambda item: item[1]['self_us'], reverse=True)
+    return {
+        'seconds': modules[module]['cumulative_us'] / 1e6,
+        'modules': len(modules),
+        'heavy': heavy,
+        'slowest': [(name, stats['self_us']) for name, stats in slowest[:5]],
+    }
+
+
+def command_seconds(args: Sequence[str]) -> float:
+    """Wall time of running the interpreter with ``args``."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def run(entry_points: Sequence[str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for module in entry_points:
+        import_profile(module)  # warm-up: writes bytecode caches, warms the page cache
+        profiles = [import_profile(module) for _ in range(repeat)]
+        seconds = [profile['seconds'] for profile in profiles]
+        results[f"import {module}"] = dict(profiles[-1], median=statistics.median(seconds),
+                                           min=min(seconds))
+    for name, args in COMMANDS.items():
+        command_seconds(args)
+        seconds = [command_seconds(args) for _ in range(repeat)]
+        results[name] = {'median': statistics.median(seconds), 'min': min(seconds), 'heavy': []}
+    return results
+
+
+def report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+           threshold: float) -> List[str]:
+    """Print the results; return the failures (heavy imports and regressions)."""
+    failures = []
+    print(f"{'benchmark':<22}{'median ms':>11}{'min ms':>9}{'modules':>9}  "
+          f"slowest modules (self ms)")
+    for name, result in results.items():
+        slowest = ', '.join(f"{module} {us / 1000:.1f}" for module, us in result.get('slowest', []))
+        print(f"{name:<22}{result['median'] * 1000:>11.1f}{result['min'] * 1000:>9.1f}"
+              f"{result.get('modules', ''):>9}  {slowest}")
+        if result['heavy']:
+            failures.append(f"{name}: imports {', '.join(result['heavy'])} at load")
+        slower = regression(result, baseline.get(name), threshold)
+        if slower:
+            failures.append(f"{name}: {slower}")
+    return failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time (cold start) benchmark")
+    parser.add_argument("--modules", default=','.join(ENTRY_POINTS),
+                        help="Comma-separated entry points")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per benchmark (median reported)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE),
+                        help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Allowed slowdown of a median over the baseline (0.5 = 50%%)")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="Write the results as a new baseline")
+    args = parser.parse_args(argv)
+
+    results = run([module for module in args.modules.split(',') if module], args.repeat)
+    failures = report(results, load_baseline(args.baseline), args.threshold)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, {name: {'median': result['median'], 'min': result['min']}
+                                           for name, result in results.items()})
+        print(f"Baseline written to {args.save_baseline}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
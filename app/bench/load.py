@@ -0,0 +1,453 @@
+"""
+HTTP load generator for the REST API.
+
+Drives ``/api/v1/classify`` (uploads of synthetic documents) and
+``/api/v1/documents`` with a configurable mix, either closed-loop (each of
+``--concurrency`` clients sends its next request as soon as the previous one
+returns) or open-loop at a fixed ``--rate`` of arrivals per second. In
+open-loop mode latency is measured from each request's scheduled start, so
+time spent waiting for a free client counts: a saturated server cannot hide
+its queueing by slowing the generator down.
+
+By default the API is started in a child process (threaded Werkzeug server,
+temporary database and upload folder) so the whole run stays on one machine
+and the server's RSS and CPU can be read from ``/proc``. Use ``--url`` and
+``--server-pid`` to load an already running server instead.
+
+Pass several concurrency levels or rates to step through them and find the
+saturation point, where throughput stops rising and latency climbs.
+
+Usage:
+    python -m app.bench.load --concurrency 1,2,4,8,16 --duration 20
+    python -m app.bench.load --rate 5,10,20 --concurrency 64 --mix classify=1
+    python -m app.bench.load --url http://127.0.0.1:5000 --server-pid 1234
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.bench import summarize, format_summary
+from app.bench.corpus import generate_corpus
+
+ENDPOINTS = {
+    'classify': ('POST', '/api/v1/classify'),
+    'documents': ('GET', '/api/v1/documents'),
+}
+
+DEFAULT_MIX = 'classify=0.8,documents=0.2'
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse ``name=weight,...`` into normalized endpoint weights."""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}. Allowed: {list(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Endpoint weights must add up to more than zero")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def encode_multipart(field: str, path: Path) -> Tuple[bytes, str]:
+    """Encode one file as a multipart/form-data body; returns (body, content type)."""
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\n'.encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{path.name}"\r\n'.encode(),
+        b'Content-Type: application/octet-stream\r\n\r\n',
+        path.read_bytes(),
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ])
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+class Workload:
+    """Builds requests for the endpoint mix; uploads cycle through the corpus."""
+
+    def __init__(self, base_url: str, mix: Dict[str, float], documents: List[Dict[str, str]],
+                 seed: int = 0, reprocess: bool = True):
+        self.base_url = base_url.rstrip('/')
+        # The corpus is uploaded over and over; without reprocess=1 every
+        # repeat would be answered from the stored document
+        self.reprocess = reprocess
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        # Bodies are encoded up front so the generator does not compete with
+        # the server for disk and CPU while the test runs
+        self.uploads = [encode_multipart('file', Path(doc['path'])) for doc in documents]
+        self._rng = random.Random(seed)
+        self._next_upload = 0
+        self._lock = threading.Lock()
+
+    def next_request(self) -> Tuple[str, urllib.request.Request]:
+        with self._lock:
+            name = self._rng.choices(self.names, self.weights)[0]
+            upload = None
+            if name == 'classify':
+                upload = self.uploads[self._next_upload % len(self.uploads)]
+                self._next_upload += 1
+        method, path = ENDPOINTS[name]
+        if name == 'classify' and self.reprocess:
+            path += '?reprocess=1'
+        request = urllib.request.Request(self.base_url + path, method=method)
+        if upload is not None:
+            request.data, content_type = upload
+            request.add_header('Content-Type', content_type)
+        return name, request
+
+
+def send(request: urllib.request.Request, timeout: float) -> int:
+    """Send a request, read the full response and return its status (0 on connection errors)."""
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+class Recorder:
+    """Collects (endpoint, status, start, latency) samples from all clients."""
+
+    def __init__(self):
+        self.samples: List[Tuple[str, int, float, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, status: int, start: float, latency: float):
+        with self._lock:
+            self.samples.append((name, status, start, latency))
+
+
+class ServerSampler:
+    """Samples a process's RSS and CPU utilisation from ``/proc`` once per interval."""
+
+    def __init__(self, pid: Optional[int], interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='server-sampler', daemon=True)
+
+    def start(self):
+        if self.pid is not None and os.path.exists(f'/proc/{self.pid}/stat'):
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _read(self) -> Optional[Tuple[float, int]]:
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                # Fields after the parenthesised command name; utime and stime are 14 and 15
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm') as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        return cpu_seconds, rss_pages * _PAGE_SIZE // 1024
+
+    def _run(self):
+        previous = self._read()
+        last = time.perf_counter()
+        while previous is not None and not self._stop.wait(self.interval):
+            current = self._read()
+            now = time.perf_counter()
+            if current is None:
+                break
+            self.samples.append({
+                'time': now,
+                # 100% is one core fully busy
+                'cpu_pct': (current[0] - previous[0]) / (now - last) * 100,
+                'rss_kb': current[1],
+            })
+            previous, last = current, now
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        cpu = [sample['cpu_pct'] for sample in self.samples]
+        rss = [sample['rss_kb'] for sample in self.samples]
+        return {
+            'cpu_mean_pct': sum(cpu) / len(cpu),
+            'cpu_max_pct': max(cpu),
+            'rss_start_kb': rss[0],
+            'rss_max_kb': max(rss),
+            'rss_end_kb': rss[-1],
+        }
+
+
+def run_closed(workload: Workload, concurrency: int, duration: float, timeout: float) -> Recorder:
+    """``concurrency`` clients each send requests back to back for ``duration`` seconds."""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            name, request = workload.next_request()
+            start = time.perf_counter()
+            status = send(request, timeout)
+            recorder.add(name, status, start, time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def run_open(workload: Workload, rate: float, concurrency: int, duration: float,
+             timeout: float, poisson: bool = True, seed: int = 0) -> Recorder:
+    """
+    Schedule arrivals at ``rate`` per second for ``duration`` seconds.
+
+    Up to ``concurrency`` requests are in flight; arrivals beyond that wait
+    for a free client, and the wait is part of their latency.
+    """
+    recorder = Recorder()
+    rng = random.Random(seed)
+    schedule = []
+    at = 0.0
+    while at < duration:
+        schedule.append(at)
+        at += rng.expovariate(rate) if poisson else 1.0 / rate
+
+    slots = threading.Semaphore(concurrency)
+    threads = []
+    begin = time.perf_counter()
+
+    def fire(scheduled: float):
+        try:
+            name, request = workload.next_request()
+            status = send(request, timeout)
+            recorder.add(name, status, scheduled, time.perf_counter() - scheduled)
+        finally:
+            slots.release()
+
+    for offset in schedule:
+        delay = begin + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        slots.acquire()
+        thread = threading.Thread(target=fire, args=(begin + offset,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def analyze(recorder: Recorder, duration: float, interval: float = 1.0) -> Dict[str, Any]:
+    """Latency percentiles per endpoint, error rate, status counts and throughput per interval."""
+    samples = recorder.samples
+    if not samples:
+        return {'requests': 0, 'errors': 0, 'error_rate': 0.0, 'throughput': 0.0,
+                'endpoints': {}, 'statuses': {}, 'timeline': []}
+
+    begin = min(start for _, _, start, _ in samples)
+    by_endpoint = defaultdict(list)
+    statuses = Counter()
+    buckets = defaultdict(lambda: {'requests': 0, 'errors': 0})
+    errors = 0
+    for name, status, start, latency in samples:
+        ok = 200 <= status < 400
+        statuses[str(status)] += 1
+        if ok:
+            by_endpoint[name].append(latency)
+        else:
+            errors += 1
+        bucket = buckets[int((start + latency - begin) // interval)]
+        bucket['requests'] += 1
+        bucket['errors'] += not ok
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples),
+        'throughput': (len(samples) - errors) / duration,
+        'endpoints': {name: summarize(latencies)
+                      for name, latencies in sorted(by_endpoint.items())},
+        'statuses': dict(sorted(statuses.items())),
+        'timeline': [
+            {'second': index * interval, 'rps': buckets[index]['requests'] / interval,
+             'errors': buckets[index]['errors']}
+            for index in range(max(buckets) + 1)
+        ],
+    }
+
+
+def _serve(port: int, workdir: str, cache: bool):
+    """Child process entry point: run the API on a temporary database and upload folder."""
+    from werkzeug.serving import make_server
+    from app import api, db, pipeline
+
+    # The corpus is uploaded repeatedly; with the cache on most uploads would skip the pipeline
+    pipeline.PIPELINE_CACHE_ENABLED = cache
+    db.DB_PATH = str(Path(workdir) / 'load.db')
+    api.app.config['UPLOAD_FOLDER'] = Path(workdir) / 'uploads'
+    api.create_app()
+    logging.disable(logging.CRITICAL)
+    make_server('127.0.0.1', port, api.app, threaded=True).serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, cache: bool = False,
+                 timeout: float = 30.0) -> Tuple[multiprocessing.Process, str]:
+    """Start the API in a child process and wait until ``/health`` answers."""
+    port = _free_port()
+    process = multiprocessing.get_context('spawn').Process(
+        target=_serve, args=(port, workdir, cache), daemon=True)
+    process.start()
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"API server exited with code {process.exitcode}")
+        if send(urllib.request.Request(url + '/health'), timeout=1) == 200:
+            return process, url
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"API server did not start within {timeout:.0f}s")
+
+
+def report(step: Dict[str, Any]):
+    load = step['load']
+    server = step['server']
+    print(f"\n{load}: {step['requests']} requests, {step['throughput']:.2f} ok/s, "
+          f"errors {step['errors']} ({step['error_rate']:.1%}) {step['statuses']}")
+    for name, summary in step['endpoints'].items():
+        print(format_summary(f"  {name}", summary))
+    if server:
+        print(f"  server cpu mean={server['cpu_mean_pct']:.0f}% max={server['cpu_max_pct']:.0f}% "
+              f"rss start={server['rss_start_kb'] // 1024}MB max={server['rss_max_kb'] // 1024}MB "
+              f"end={server['rss_end_kb'] // 1024}MB")
+    print("  ok/s per second: " + ' '.join(
+        f"{point['rps'] - point['errors']:.0f}" for point in step['timeline']))
+
+
+def print_table(steps: List[Dict[str, Any]]):
+    """One line per step; saturation shows as flat throughput with rising p99."""
+    print(f"\n{'load':<24} {'ok/s':>8} {'err%':>6} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'cpu%':>6} {'rss MB':>7}")
+    for step in steps:
+        latencies = list(step['endpoints'].values())
+        p50 = max((s['p50_ms'] for s in latencies), default=0.0)
+        p99 = max((s['p99_ms'] for s in latencies), default=0.0)
+        server = step['server']
+        print(f"{step['load']:<24} {step['throughput']:>8.2f} {step['error_rate'] * 100:>6.1f} "
+              f"{p50:>9.1f} {p99:>9.1f} {server.get('cpu_mean_pct', 0):>6.0f} "
+              f"{server.get('rss_max_kb', 0) // 1024:>7}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the REST API")
+    parser.add_argument("--url",
+                        help="Base URL of a running API (default: start one in a child process)")
+    parser.add_argument("--server-pid", type=int,
+                        help="PID of the --url server, to report its RSS and CPU")
+    parser.add_argument("--concurrency", default="8",
+                        help="Comma-separated client counts; each is one step in closed-loop mode "
+                             "(default: 8)")
+    parser.add_argument("--rate",
+                        help="Comma-separated arrival rates (req/s); switches to open-loop mode")
+    parser.add_argument("--uniform", action="store_true",
+                        help="Evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--duration", type=float, default=15.0,
+                        help="Seconds per step (default: 15)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--docs", type=int, default=28,
+                        help="Synthetic documents to upload (default: 28)")
+    parser.add_argument("--kinds", default="digital",
+                        help="Comma-separated document renditions (default: digital)")
+    parser.add_argument("--corpus", default=".bench/corpus-load", help="Corpus directory")
+    parser.add_argument("--cache", action="store_true",
+                        help="Let repeat uploads be answered from stored documents and the "
+                             "pipeline cache")
+    parser.add_argument("--timeout", type=float, default=60.0,
+                        help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", help="Write the results JSON to this path")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    concurrency = [int(value) for value in args.concurrency.split(',') if value]
+    rates = [float(value) for value in args.rate.split(',') if value] if args.rate else []
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+
+    documents = generate_corpus(args.corpus, args.docs, args.seed, kinds)
+    print(f"Corpus: {len(documents)} documents ({', '.join(kinds)}) in {args.corpus}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        url, pid = args.url, args.server_pid
+        if url is None:
+            server, url = start_server(workdir, args.cache)
+            pid = server.pid
+            print(f"Started API at {url} (pid {pid})")
+        try:
+            workload = Workload(url, mix, documents, args.seed, reprocess=not args.cache)
+            if rates:
+                loads = [(f"rate={rate:g}/s c={concurrency[-1]}", rate) for rate in rates]
+            else:
+                loads = [(f"concurrency={clients}", clients) for clients in concurrency]
+
+            steps = []
+            for label, value in loads:
+                sampler = ServerSampler(pid).start()
+                if rates:
+                    recorder = run_open(workload, value, concurrency[-1], args.duration,
+                                        args.timeout, poisson=not args.uniform, seed=args.seed)
+                else:
+                    recorder = run_closed(workload, value, args.duration, args.timeout)
+                sampler.stop()
+                step = analyze(recorder, args.duration)
+                step.update(load=label, server=sampler.summary())
+                steps.append(step)
+                report(step)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.join()
+
+    print_table(steps)
+    if args.output:
+        Path(args.output).write_text(json.dumps({'mix': mix, 'steps': steps}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
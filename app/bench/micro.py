@@ -0,0 +1,114 @@
+"""
+Micro-benchmark harness for hot pure-Python code.
+
+``measure`` calibrates how many calls make up one timed round, runs several
+rounds and reports per-call statistics; the median is what baselines are
+compared on, since it is far less sensitive to a stray slow round than the
+mean. Baselines are JSON files keyed by benchmark name.
+
+The benchmarks themselves live in ``tests/test_benchmarks.py`` and run with
+``pytest -m benchmark --bench``.
+"""
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.bench.corpus import TEMPLATES
+
+# Input sizes in bytes of text, 1 KB to 5 MB
+TEXT_SIZES = {
+    '1KB': 1024,
+    '64KB': 64 * 1024,
+    '1MB': 1024 * 1024,
+    '5MB': 5 * 1024 * 1024,
+}
+
+
+def measure(
+    func: Callable,
+    *args,
+    rounds: int = 7,
+    min_round_time: float = 0.02,
+    max_time: float = 5.0,
+) -> Dict[str, float]:
+    """
+    Time ``func(*args)`` and return per-call statistics in seconds.
+
+    Each round repeats the call enough times to last ``min_round_time``, so
+    timer resolution does not dominate fast functions. Rounds are reduced
+    (to no fewer than 3) when the whole run would exceed ``max_time``.
+    """
+    start = time.perf_counter()
+    func(*args)
+    first = max(time.perf_counter() - start, 1e-9)
+
+    loops = max(1, math.ceil(min_round_time / first))
+    rounds = max(3, min(rounds, int(max_time / (first * loops))))
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(*args)
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'min': min(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'rounds': rounds,
+        'loops': loops,
+    }
+
+
+def make_text(document_type: str, size: int, seed: int = 0) -> str:
+    """
+    Build at least ``size`` bytes of text for ``document_type``.
+
+    Filler line items come first and the document's own lines last, so
+    patterns that do not match early have to scan the whole input.
+    """
+    rng = random.Random(seed)
+    body = '\n'.join(TEMPLATES[document_type](rng))
+    filler = []
+    length = len(body)
+    while length < size:
+        line = (f"{rng.randint(1, 999):>4} item {rng.randint(10000, 99999)} "
+                f"qty {rng.randint(1, 50)} at {rng.randint(1, 9999) / 100:.2f}")
+        filler.append(line)
+        length += len(line) + 1
+    return '\n'.join(filler + [body])
+
+
+def load_baseline(path) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get('benchmarks', {})
+
+
+def save_baseline(path, results: Dict[str, Dict[str, float]]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+        'benchmarks': results,
+    }, indent=2, sort_keys=True))
+
+
+def regression(result: Dict[str, float], baseline: Optional[Dict[str, float]],
+               threshold: float) -> Optional[str]:
+    """Describe the slowdown when the median is more than ``threshold`` above the baseline."""
+    if not baseline:
+        return None
+    ratio = result['median'] / baseline['median']
+    if ratio > 1 + threshold:
+        return (f"median {result['median'] * 1e6:.1f}µs vs baseline "
+                f"{baseline['median'] * 1e6:.1f}µs ({ratio:.2f}x, threshold {1 + threshold:.2f}x)")
+    return None
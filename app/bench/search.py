@@ -0,0 +1,138 @@
+"""
+Full-text search latency benchmark.
+
+Populates a scratch database with synthetic documents and measures
+``search_documents`` latency for a mix of single-term, multi-term, phrase,
+prefix and type-filtered queries.
+
+Usage: python -m app.bench.search [--docs 1000000] [--queries 200]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app import db
+from app.bench import summarize, format_summary
+
+DOCUMENT_TYPES = ["invoice", "purchase_order", "pay_stub", "w2", "driver_license", "flood_form"]
+
+VOCABULARY = (
+    "invoice number date total amount due vendor supplier bill to ship payment terms net "
+    "purchase order quantity unit price buyer customer delivery gross pay net pay earnings "
+    "deductions employer employee payroll federal tax wages social security medicare "
+    "license dob expires address county flood hazard determination zone lender borrower"
+).split()
+
+SYLLABLES = ["ac", "me", "glo", "bex", "ini", "tech", "um", "bre", "lla", "sta", "rk", "wa",
+             "yne", "ty", "rel", "cy", "ber", "dy", "ne", "hoo", "li", "soy", "lent", "zen"]
+
+# Queries are templates; ``{name}`` is replaced with a random company name per
+# repetition so that results are not served from SQLite's page cache alone.
+QUERIES = [
+    ("rare-term", "{name}", None),
+    ("rare-term+common-term", "{name} invoice", None),
+    ("phrase", '"{name} {name2}"', None),
+    ("prefix", "{prefix}*", None),
+    ("type-filtered", "{name}", "invoice"),
+    ("common-term", "payment", None),
+]
+
+
+def company_name(index: int) -> str:
+    """Deterministic pseudo company name for ``index``."""
+    parts = []
+    for _ in range(3):
+        parts.append(SYLLABLES[index % len(SYLLABLES)])
+        index //= len(SYLLABLES)
+    return "".join(parts)
+
+
+COMPANY_COUNT = len(SYLLABLES) ** 3
+
+
+def generate_text(rng: random.Random, words: int) -> str:
+    """Generate a synthetic document body with a few rare company names."""
+    body = [rng.choice(VOCABULARY) for _ in range(words)]
+    for _ in range(3):
+        body.insert(rng.randrange(len(body) + 1), company_name(rng.randrange(COMPANY_COUNT)))
+    return " ".join(body)
+
+
+def render_query(template: str, rng: random.Random) -> str:
+    name = company_name(rng.randrange(COMPANY_COUNT))
+    return template.format(
+        name=name,
+        name2=company_name(rng.randrange(COMPANY_COUNT)),
+        prefix=name[:4],
+    )
+
+
+def populate(docs: int, words: int, seed: int, batch_size: int = 10000) -> None:
+    """Insert ``docs`` synthetic documents in batches."""
+    rng = random.Random(seed)
+    conn = db.get_connection()
+    inserted = 0
+    while inserted < docs:
+        size = min(batch_size, docs - inserted)
+        rows = [
+            (f"synthetic/{inserted + i}.pdf", rng.choice(DOCUMENT_TYPES), generate_text(rng, words))
+            for i in range(size)
+        ]
+        conn.executemany(
+            "INSERT INTO documents (file_path, document_type, raw_text) VALUES (?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+        inserted += size
+        print(f"\rIndexed {inserted}/{docs} documents", end="", flush=True)
+    print()
+    conn.close()
+
+
+def run(docs: int, queries: int, words: int, seed: int, db_path: str = None) -> int:
+    workdir = None
+    if db_path is None:
+        workdir = tempfile.TemporaryDirectory()
+        db_path = str(Path(workdir.name) / "search_bench.db")
+    db.DB_PATH = db_path
+    db.init_db()
+
+    start = time.perf_counter()
+    populate(docs, words, seed)
+    print(f"Populated {docs} documents in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    db.rebuild_search_index()
+    print(f"Full index rebuild took {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(seed + 1)
+    for name, template, document_type in QUERIES:
+        latencies = []
+        for _ in range(queries):
+            query = render_query(template, rng)
+            start = time.perf_counter()
+            db.search_documents(query, document_type=document_type)
+            latencies.append(time.perf_counter() - start)
+        print(format_summary(name, summarize(latencies)))
+
+    if workdir is not None:
+        workdir.cleanup()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark full-text search latency")
+    parser.add_argument("--docs", type=int, default=1_000_000, help="Documents to index")
+    parser.add_argument("--queries", type=int, default=200, help="Repetitions per query")
+    parser.add_argument("--words", type=int, default=120, help="Words per document")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--db-path", help="Keep the benchmark database at this path")
+    args = parser.parse_args(argv)
+    return run(args.docs, args.queries, args.words, args.seed, args.db_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
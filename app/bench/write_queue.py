@@ -0,0 +1,95 @@
+"""
+Concurrent write benchmark: direct inserts vs. the group-commit queue.
+
+Simulates concurrent uploads, each storing one document and its fields, and
+reports per-write latency percentiles and overall throughput for both paths.
+
+Usage: python -m app.bench.write_queue [--threads 32] [--writes 50]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app import db
+from app.bench import summarize, format_summary
+from app.bench.search import generate_text
+from app.write_queue import WriteQueue
+
+FIELDS = {"invoice_number": "INV-0001", "invoice_date": "2024-01-15",
+          "total_amount": "$1,250.00", "vendor_name": "Acme Corp"}
+
+
+def direct_write(file_path, text):
+    document_id = db.insert_document(file_path, "invoice", text)
+    db.insert_fields(document_id, "invoice", FIELDS)
+    return document_id
+
+
+def run_clients(threads, writes, text, write):
+    """Run ``threads`` clients issuing ``writes`` writes each; return latencies and wall time."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def client(index):
+        local = []
+        barrier.wait()
+        for n in range(writes):
+            start = time.perf_counter()
+            try:
+                write(f"bench/{index}-{n}.pdf", text)
+            except Exception as e:
+                errors.append(e)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def report(name, latencies, errors, elapsed):
+    print(format_summary(name, summarize(latencies)))
+    print(f"{'':<28} throughput={len(latencies) / elapsed:.0f} writes/s errors={len(errors)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent database writes")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--writes", type=int, default=50, help="Writes per client")
+    parser.add_argument("--words", type=int, default=800, help="Words per document")
+    args = parser.parse_args(argv)
+
+    text = generate_text(random.Random(0), args.words)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db.DB_PATH = str(Path(workdir) / "direct.db")
+        db.init_db()
+        report("direct", *run_clients(args.threads, args.writes, text, direct_write))
+
+        db.DB_PATH = str(Path(workdir) / "queued.db")
+        db.init_db()
+        write_queue = WriteQueue().start()
+        report("group-commit queue", *run_clients(
+            args.threads, args.writes, text,
+            lambda path, body: write_queue.insert_document(path, "invoice", body, FIELDS),
+        ))
+        write_queue.stop()
+        print(f"{'':<28} batches={write_queue.batches} "
+              f"mean batch={write_queue.writes / max(write_queue.batches, 1):.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
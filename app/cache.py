@@ -3,54 +3,359 @@ Caching utilities for improved performance.
 """
 import functools
 import hashlib
+import os
 import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
 from pathlib import Path
 from app.logger import get_logger
-from app.config import BASE_DIR
+from app.config import BASE_DIR, CACHE_MAX_BYTES, CACHE_COMPRESS
+from app.utils import calculate_file_hash
 
 logger = get_logger(__name__)
 
+# Created by the first write, not at import
 CACHE_DIR = BASE_DIR / '.cache'
-CACHE_DIR.mkdir(exist_ok=True)
 
+_MISSING = object()
 
-def cache_result(cache_key_func=None):
+# Shortest interval between two eviction scans of the cache tree
+_EVICT_INTERVAL = 1.0
+
+# First byte of every cache file: payload encoding
+_PLAIN = b'P'
+_COMPRESSED = b'Z'
+
+
+def _update_key(digest, value):
+    """Feed a canonical, type-tagged encoding of ``value`` into ``digest``."""
+    if isinstance(value, Path):
+        if value.is_file():
+            # Content-based: the same bytes under any name share a key
+            value = ('file', calculate_file_hash(value))
+        else:
+            value = ('path', str(value))
+    
+    if value is None or isinstance(value, (bool, int, float)):
+        data = repr(value).encode()
+        tag = b'n'
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        tag = b's'
+    elif isinstance(value, (bytes, bytearray)):
+        data = bytes(value)
+        tag = b'b'
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'l%d:' % len(value))
+        for item in value:
+            _update_key(digest, item)
+        return
+    elif isinstance(value, dict):
+        digest.update(b'd%d:' % len(value))
+        for key in sorted(value, key=repr):
+            _update_key(digest, key)
+            _update_key(digest, value[key])
+        return
+    else:
+        data = repr(value).encode('utf-8')
+        tag = b'r'
+    
+    digest.update(tag + b'%d:' % len(data) + data)
+
+
+def make_cache_key(*parts):
+    """
+    Build a stable cache key from ``parts``.
+    
+    Unlike ``str(args)``, the key does not depend on dict ordering or object
+    identity, and existing files given as ``Path`` are keyed by content.
+    """
+    digest = hashlib.sha256()
+    _update_key(digest, parts)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Bounded, process-safe disk cache.
+    
+    Entries live under ``<directory>/<namespace>/<version>/<shard>/<key>``,
+    where the shard is the first two hex digits of the key, so no single
+    directory grows large. Writes go to a temporary file in the shard and
+    are renamed into place, so readers never see a partial entry even with
+    concurrent writers. Payloads are pickled and optionally zlib-compressed.
+    
+    Each namespace has a version (e.g. an extractor's version); entries of
+    any other version are never read and are purged when the namespace is
+    first used. ``invalidate`` drops a namespace outright. When the cache
+    grows past ``max_bytes`` the least recently used entries (by mtime,
+    refreshed on every hit) are removed until it is back under 90%. The
+    size is tracked as a running estimate between scans; one thread at a
+    time scans the tree to evict, at most once per ``_EVICT_INTERVAL``.
+    """
+    
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, compress=CACHE_COMPRESS):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._size = None
+        self._evicting = False
+        self._last_evict = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+    
+    def set_version(self, namespace, version):
+        """Set the version of a namespace and purge entries of other versions."""
+        version = str(version)
+        with self._lock:
+            if self._versions.get(namespace) == version:
+                return
+            self._versions[namespace] = version
+        
+        namespace_dir = self.directory / namespace
+        if namespace_dir.is_dir():
+            for entry in namespace_dir.iterdir():
+                if entry.is_dir() and entry.name != version:
+                    self._remove_tree(entry)
+                    logger.info(f"Purged stale cache version {namespace}/{entry.name}")
+    
+    def get(self, namespace, key, default=None):
+        """Get a cached value, or ``default`` on a miss."""
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            value = self._decode(data)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return default
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {str(e)}")
+            self._unlink(path)
+            with self._lock:
+                self.misses += 1
+            return default
+        
+        try:
+            # Refresh recency for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+    
+    def set(self, namespace, key, value):
+        """Store a value atomically."""
+        path = self._path(namespace, key)
+        data = self._encode(value)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            # An overwritten entry no longer counts towards the size
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._unlink(tmp_path)
+            raise
+        
+        with self._lock:
+            self.writes += 1
+            if self.max_bytes is None:
+                return
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced
+            evict = (self._size > self.max_bytes and not self._evicting
+                     and time.monotonic() - self._last_evict >= _EVICT_INTERVAL)
+            if evict:
+                self._evicting = True
+        if evict:
+            try:
+                self.evict()
+            finally:
+                with self._lock:
+                    self._evicting = False
+                    self._last_evict = time.monotonic()
+    
+    def delete(self, namespace, key):
+        """Remove a cached value."""
+        return self._unlink(self._path(namespace, key))
+    
+    def invalidate(self, namespace):
+        """Drop every entry of a namespace, for all processes sharing the cache."""
+        namespace_dir = self.directory / namespace
+        if namespace_dir.exists():
+            self._remove_tree(namespace_dir)
+            logger.info(f"Invalidated cache namespace {namespace}")
+    
+    def clear(self):
+        """Remove all cached entries and return how many files were removed."""
+        count = sum(1 for _ in self._iter_files()) if self.directory.exists() else 0
+        if self.directory.exists():
+            for entry in self.directory.iterdir():
+                if entry.is_dir():
+                    self._remove_tree(entry)
+                else:
+                    self._unlink(entry)
+        with self._lock:
+            self._size = 0
+        return count
+    
+    def evict(self):
+        """Remove least recently used entries until under 90% of ``max_bytes``."""
+        entries = []
+        for path in self._iter_files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            if self._unlink(path):
+                total -= size
+                evicted += 1
+        
+        with self._lock:
+            self._size = total
+            self.evictions += evicted
+        if evicted:
+            logger.debug(f"Evicted {evicted} cache entries")
+        return evicted
+    
+    def stats(self):
+        """Get cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'bytes': self._size,
+            }
+    
+    def _path(self, namespace, key):
+        version = self._versions.get(namespace, '0')
+        return self.directory / namespace / version / key[:2] / f"{key}.cache"
+    
+    def _encode(self, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.compress:
+            return _COMPRESSED + zlib.compress(payload, 1)
+        return _PLAIN + payload
+    
+    def _decode(self, data):
+        marker, payload = data[:1], data[1:]
+        if marker == _COMPRESSED:
+            payload = zlib.decompress(payload)
+        elif marker != _PLAIN:
+            raise ValueError("unknown cache file format")
+        return pickle.loads(payload)
+    
+    def _iter_files(self):
+        return self.directory.glob('**/*.cache')
+    
+    def _scan_size(self):
+        total = 0
+        for path in self._iter_files():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+    
+    def _remove_tree(self, path):
+        # Rename first so concurrent readers see the whole tree vanish at once
+        trash = path.with_name(f".trash-{uuid.uuid4().hex}")
+        try:
+            os.replace(path, trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+        with self._lock:
+            self._size = None
+    
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Get the shared disk cache."""
+    global _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = DiskCache()
+        return _disk_cache
+
+
+def cache_result(cache_key_func=None, namespace=None, version=1):
     """
     Decorator to cache function results to disk.
     
     Args:
         cache_key_func: Optional function to generate cache key from args
+        namespace: Cache namespace (default: the function's qualified name)
+        version: Bump to invalidate results cached by older code
     """
     def decorator(func):
+        name = namespace or f"{func.__module__}.{func.__qualname__}"
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            cache = get_disk_cache()
+            cache.set_version(name, version)
+            
             # Generate cache key
             if cache_key_func:
-                cache_key = cache_key_func(*args, **kwargs)
+                cache_key = make_cache_key(cache_key_func(*args, **kwargs))
             else:
-                # Default: hash of function name and arguments
-                key_data = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-                cache_key = hashlib.md5(key_data.encode()).hexdigest()
+                cache_key = make_cache_key(args, kwargs)
             
-            cache_file = CACHE_DIR / f"{cache_key}.cache"
-            
-            # Try to load from cache
-            if cache_file.exists():
-                try:
-                    with open(cache_file, 'rb') as f:
-                        result = pickle.load(f)
-                    logger.debug(f"Cache hit for {func.__name__}")
-                    return result
-                except Exception as e:
-                    logger.warning(f"Cache read error: {str(e)}")
+            result = cache.get(name, cache_key, _MISSING)
+            if result is not _MISSING:
+                logger.debug(f"Cache hit for {func.__name__}")
+                return result
             
             # Compute result
             result = func(*args, **kwargs)
             
             # Save to cache
             try:
-                with open(cache_file, 'wb') as f:
-                    pickle.dump(result, f)
+                cache.set(name, cache_key, result)
                 logger.debug(f"Cached result for {func.__name__}")
             except Exception as e:
                 logger.warning(f"Cache write error: {str(e)}")
@@ -63,45 +368,193 @@ def cache_result(cache_key_func=None):
 
 def clear_cache():
     """Clear all cached results."""
-    count = 0
-    for cache_file in CACHE_DIR.glob('*.cache'):
-        cache_file.unlink()
-        count += 1
-    
+    count = get_disk_cache().clear()
     logger.info(f"Cleared {count} cache files")
     return count
 
 
+def _approximate_size(value):
+    """Approximate the memory footprint of a cached value in bytes."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _approximate_size(k) + _approximate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_approximate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
 class LRUCache:
-    """Simple LRU cache implementation."""
+    """
+    Thread-safe LRU cache with O(1) get and set.
     
-    def __init__(self, max_size=100):
-        self.cache = {}
+    Entries are evicted least recently used first once the cache holds more
+    than ``max_size`` entries or, when ``max_bytes`` is set, more than
+    ``max_bytes`` of approximate value size. With ``ttl`` (seconds) entries
+    expire that long after they were set. Hit, miss, eviction and expiration
+    counts are available from ``stats()``.
+    """
+    
+    def __init__(self, max_size=100, max_bytes=None, ttl=None, sizeof=_approximate_size):
         self.max_size = max_size
-        self.access_order = []
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        # key -> (value, size, expires_at); ordered least to most recently used
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
     
-    def get(self, key):
+    def get(self, key, default=None):
         """Get value from cache."""
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
-        return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
     
     def set(self, key, value):
         """Set value in cache."""
-        if key in self.cache:
-            self.access_order.remove(key)
-        elif len(self.cache) >= self.max_size:
-            # Remove least recently used
-            lru_key = self.access_order.pop(0)
-            del self.cache[lru_key]
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
         
-        self.cache[key] = value
-        self.access_order.append(key)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            
+            while len(self._entries) > self.max_size or (
+                self.max_bytes is not None and self.current_bytes > self.max_bytes
+            ):
+                lru_key = next(iter(self._entries))
+                self._remove(lru_key)
+                self.evictions += 1
+    
+    def delete(self, key):
+        """Remove a key; returns True if it was cached."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
     
     def clear(self):
         """Clear the cache."""
-        self.cache.clear()
-        self.access_order.clear()
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self):
+        """Get cache counters and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+    
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process ``LRUCache`` over the shared ``DiskCache``.
+    
+    Lookups try memory first, then disk; disk hits are promoted to memory.
+    Writes go to both tiers. Hit counts are kept per tier.
+    """
+    
+    def __init__(self, namespace, version, memory=None, disk=None):
+        self.namespace = namespace
+        self.version = version
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk if disk is not None else get_disk_cache()
+        self.disk.set_version(namespace, version)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    def get(self, key, default=None):
+        """Get a value from the fastest tier that has it."""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self.memory_hits += 1
+            return value
+        
+        value = self.disk.get(self.namespace, key, _MISSING)
+        if value is not _MISSING:
+            self.memory.set(key, value)
+            with self._lock:
+                self.disk_hits += 1
+            return value
+        
+        with self._lock:
+            self.misses += 1
+        return default
+    
+    def set(self, key, value):
+        """Store a value in both tiers."""
+        self.memory.set(key, value)
+        try:
+            self.disk.set(self.namespace, key, value)
+        except OSError as e:
+            logger.warning(f"Disk cache write failed for {self.namespace}: {str(e)}")
+    
+    def invalidate(self):
+        """Drop this namespace from both tiers."""
+        self.memory.clear()
+        self.disk.invalidate(self.namespace)
+    
+    def stats(self):
+        """Get per-tier hit counts and the overall hit rate."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                'version': str(self.version),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+            }
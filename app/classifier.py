@@ -1,9 +1,13 @@
 from typing import Literal, Dict
 from app.logger import get_logger
 from app.config import CONFIDENCE_THRESHOLD
+from app.performance import traced
 
 logger = get_logger(__name__)
 
+# Bump when a change alters classifications, to invalidate cached results
+CLASSIFIER_VERSION = 1
+
 DocumentType = Literal[
     "invoice",
     "purchase_order",
@@ -16,13 +20,14 @@ DocumentType = Literal[
 ]
 
 
+@traced("classifier.classify_document")
 def classify_document(text: str) -> DocumentType:
     """
     Classify document based on text content.
     Returns the most likely document type.
     """
     lower = text.lower()
-    logger.info(f"Classifying document with text length: {len(text)}")
+    logger.debug("Classifying document with text length: %d", len(text))
 
     if "pay stub" in lower or "gross pay" in lower:
         logger.info("Classified as pay_stub")
@@ -56,6 +61,7 @@ def classify_document(text: str) -> DocumentType:
     return "unknown"
 
 
+@traced("classifier.get_classification_confidence")
 def get_classification_confidence(text: str, doc_type: DocumentType) -> float:
     """
     Calculate confidence score for a classification.
@@ -80,6 +86,6 @@ def get_classification_confidence(text: str, doc_type: DocumentType) -> float:
     matches = sum(1 for keyword in keywords if keyword in lower)
     
     confidence = min(matches / len(keywords), 1.0)
-    logger.debug(f"Classification confidence for {doc_type}: {confidence:.2f}")
+    logger.debug("Classification confidence for %s: %.2f", doc_type, confidence)
     
     return confidence
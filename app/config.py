@@ -9,13 +9,76 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Database settings
 DATABASE_PATH = os.getenv('DATABASE_PATH', BASE_DIR / 'documents.db')
-DATABASE_BACKUP_DIR = BASE_DIR / 'backups'
+DATABASE_BACKUP_DIR = Path(os.getenv('DATABASE_BACKUP_DIR', BASE_DIR / 'backups'))
+BACKUP_PAGES_PER_STEP = 256  # pages copied per online backup step
+BACKUP_STEP_SLEEP = 0.005  # seconds between steps, leaving the database to writers
+BACKUP_KEEP = 7  # most recent backups to keep
+
+# Retention settings
+ARCHIVE_DIR = Path(os.getenv('ARCHIVE_DIR', BASE_DIR / 'archive'))
+TEXT_RETENTION_DAYS = int(os.getenv('TEXT_RETENTION_DAYS', 365))
+ARCHIVE_BATCH_SIZE = 500  # documents archived per write transaction
+
+# Write queue settings (single writer thread with group commits)
+WRITE_QUEUE_MAX_SIZE = int(os.getenv('WRITE_QUEUE_MAX_SIZE', 1000))
+WRITE_QUEUE_BATCH_SIZE = int(os.getenv('WRITE_QUEUE_BATCH_SIZE', 64))
+WRITE_QUEUE_FLUSH_INTERVAL = float(os.getenv('WRITE_QUEUE_FLUSH_INTERVAL', 0.005))  # seconds
+WRITE_QUEUE_PUT_TIMEOUT = 2.0  # seconds to wait for space before rejecting
+WRITE_QUEUE_RESULT_TIMEOUT = 30.0  # seconds to wait for a durable ID
+
+# Search settings
+SEARCH_RESULT_LIMIT = 20
+SEARCH_MAX_RESULTS = 100
+
+# Export settings
+EXPORT_CHUNK_SIZE = 1000  # rows read and encoded per chunk
+
+# Read endpoint responses (ETags and compression)
+COMPRESS_MIN_BYTES = 1024  # smaller bodies are sent uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # used when the optional brotli package is installed
+
+# Statistics settings
+STATS_DAYS = 30  # days of per-day counts returned by get_stats()
 
 # Upload settings
 UPLOAD_FOLDER = BASE_DIR / 'uploads'
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
 
+# Batch classification (many files or an archive per request)
+BATCH_MAX_FILES = 100  # documents per batch, archive members included
+BATCH_MAX_UPLOAD_SIZE = 200 * 1024 * 1024  # whole request, and unpacked archive contents
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_EXECUTOR = os.getenv('BATCH_EXECUTOR', 'process')  # 'process' or 'thread'
+
+# Admission control for /api/v1/classify (separate fast and slow processing lanes)
+ADMISSION_OCR_PAGE_COST = 10  # an OCR page costs as much as this many native text pages
+ADMISSION_BYTES_PER_PAGE = 100 * 1024  # page estimate for PDFs whose pages cannot be counted
+ADMISSION_FAST_MAX_COST = 20  # documents up to this cost (in native pages) take the fast lane
+FAST_LANE_CONCURRENCY = int(os.getenv('FAST_LANE_CONCURRENCY', 4))
+FAST_LANE_QUEUE = int(os.getenv('FAST_LANE_QUEUE', 32))  # requests waiting for a slot before 429
+SLOW_LANE_CONCURRENCY = int(os.getenv('SLOW_LANE_CONCURRENCY', 1))
+SLOW_LANE_QUEUE = int(os.getenv('SLOW_LANE_QUEUE', 4))
+ADMISSION_QUEUE_TIMEOUT = 10.0  # seconds a queued request waits for a slot before 429
+DEGRADED_MODE = os.getenv('DEGRADED_MODE', 'auto')  # 'auto' (on load thresholds), 'on' or 'off'
+DEGRADE_SLOW_LANE_BACKLOG = 2  # slow-lane requests waiting for a slot that trigger degraded mode
+DEGRADE_LOAD_PER_CPU = 4.0  # 1-minute load average per CPU that triggers degraded mode
+
+# Idempotency-Key handling for /api/v1/classify (in memory, per process)
+IDEMPOTENCY_MAX_KEYS = 10000  # completed responses kept for replay
+IDEMPOTENCY_TTL = 24 * 3600.0  # seconds a completed response is replayed
+IDEMPOTENCY_WAIT_TIMEOUT = 120.0  # seconds a duplicate waits on the in-flight request
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Background jobs (durable queue in the jobs table)
+# Worker threads started by the API; 0 to process jobs with `python -m app.jobs` instead
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_LEASE_SECONDS = 120.0  # a worker that stops renewing for this long is presumed dead
+JOB_MAX_ATTEMPTS = 3
+JOB_POLL_INTERVAL = 0.5  # seconds between queue polls when idle
+JOB_MAX_WAIT = 60.0  # longest long-poll on GET /api/v1/jobs/<id>?wait=
+
 # Document processing settings
 EXTRACT_TIMEOUT = 30  # seconds
 MAX_TEXT_LENGTH = 1000000  # characters
@@ -24,10 +87,40 @@ MAX_TEXT_LENGTH = 1000000  # characters
 CONFIDENCE_THRESHOLD = 0.7
 DEFAULT_DOCUMENT_TYPE = 'unknown'
 
+# Cache settings
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 512 * 1024 * 1024))
+CACHE_COMPRESS = os.getenv('CACHE_COMPRESS', 'True').lower() == 'true'
+
+# Pipeline result cache (memory tier over the disk cache)
+PIPELINE_CACHE_ENABLED = os.getenv('PIPELINE_CACHE_ENABLED', 'True').lower() == 'true'
+PIPELINE_CACHE_MEMORY_ENTRIES = 256
+PIPELINE_CACHE_MEMORY_BYTES = 64 * 1024 * 1024
+
+# Tracing settings
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.01))  # fraction of requests traced
+TRACE_STORE_SIZE = 200  # completed traces kept in memory
+
+# Profiling (debug endpoints are disabled unless enabled and a token is set)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_MEMORY_FRAMES = 25  # traceback depth recorded by tracemalloc
+PROFILE_TOP_N = 25  # functions or allocation sites per report
+PROFILE_MAX_REQUESTS = 50  # requests that can be armed at once
+PROFILE_REPORTS_KEPT = 20
+
 # Logging settings
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = BASE_DIR / 'logs' / 'autodoc.log'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Write LOG_FILE as JSON lines
+LOG_STRUCTURED = os.getenv('LOG_STRUCTURED', '0').lower() in ('1', 'true', 'yes')
+# e.g. 'app.db=0.1': share of a logger's INFO/DEBUG records kept
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+# Level of the per-page extraction logger; its lines are DEBUG, so set DEBUG to see them
+LOG_PAGE_LEVEL = os.getenv('LOG_PAGE_LEVEL', 'INFO')
+# Records that may wait for the log writer; further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
 
 # Web server settings
 HOST = os.getenv('HOST', '0.0.0.0')
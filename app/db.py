@@ -1,13 +1,25 @@
+import json
 import sqlite3
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from app.logger import get_logger
-from app.config import DATABASE_PATH
+from app.config import DATABASE_PATH, SEARCH_RESULT_LIMIT, SEARCH_MAX_RESULTS, STATS_DAYS
+from app.exceptions import DatabaseError
+from app.performance import traced
+from app.utils import parse_amount, parse_date
 
 logger = get_logger(__name__)
 
 DB_PATH = DATABASE_PATH
 
+# Columns of the documents table a reader may select
+DOCUMENT_COLUMNS = (
+    "id", "file_path", "document_type", "raw_text", "created_at", "text_archive", "file_hash",
+    "ocr_status",
+)
+DOCUMENT_LIST_COLUMNS = ("id", "file_path", "document_type")
+
 
 def get_connection() -> sqlite3.Connection:
     """Get database connection with row factory."""
@@ -20,17 +32,36 @@ def init_db() -> None:
     conn = get_connection()
     cur = conn.cursor()
 
+    # Only takes effect on a new database; lets retention reclaim space
+    # with incremental vacuum instead of a full, blocking VACUUM
+    cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL lets readers proceed while the writer commits
+    cur.execute("PRAGMA journal_mode=WAL")
+
     cur.execute(
         """
     CREATE TABLE IF NOT EXISTS documents (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         file_path TEXT,
         document_type TEXT,
-        raw_text TEXT
+        raw_text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        text_archive TEXT,
+        file_hash TEXT,
+        ocr_status TEXT
     )
     """
     )
 
+    _migrate_documents_table(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_documents_file_hash ON documents (file_hash)")
+    _create_search_index(cur)
+    _create_stats_tables(cur)
+    _create_field_store(cur)
+    _create_telemetry_table(cur)
+    _create_jobs_table(cur)
+
     cur.execute(
         """
     CREATE TABLE IF NOT EXISTS invoice (
@@ -101,48 +132,340 @@ def init_db() -> None:
     conn.close()
 
 
-def insert_document(file_path: str, document_type: str, text: str) -> int:
-    """Insert a document record and return its ID."""
-    logger.info(f"Inserting document: {file_path}, type: {document_type}")
+def _migrate_documents_table(cur: sqlite3.Cursor) -> None:
+    """Add columns introduced after the documents table was first created."""
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(documents)")}
+
+    if "created_at" not in columns:
+        logger.info("Adding created_at column to documents")
+        # ALTER TABLE cannot add a column with a CURRENT_TIMESTAMP default, so
+        # existing rows are stamped now and a trigger stamps new ones.
+        cur.execute("ALTER TABLE documents ADD COLUMN created_at TIMESTAMP")
+        cur.execute("UPDATE documents SET created_at = CURRENT_TIMESTAMP")
+        cur.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS documents_created_at AFTER INSERT ON documents
+        WHEN new.created_at IS NULL BEGIN
+            UPDATE documents SET created_at = CURRENT_TIMESTAMP WHERE id = new.id;
+        END
+        """
+        )
+
+    if "text_archive" not in columns:
+        # Path of the cold archive holding raw_text once retention has run
+        cur.execute("ALTER TABLE documents ADD COLUMN text_archive TEXT")
+
+    if "file_hash" not in columns:
+        # SHA-256 of the uploaded file; documents stored before it was kept have none
+        cur.execute("ALTER TABLE documents ADD COLUMN file_hash TEXT")
+
+    if "ocr_status" not in columns:
+        # 'pending' while OCR deferred under load is queued, then 'done' or 'failed'
+        cur.execute("ALTER TABLE documents ADD COLUMN ocr_status TEXT")
+
+
+def _create_search_index(cur: sqlite3.Cursor) -> None:
+    """
+    Create the FTS5 index over extracted text.
+
+    The index is an external-content table over ``documents``; triggers keep
+    it in sync on every insert, update and delete, so it never needs a full
+    rebuild during normal operation.
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+    )
+    exists = cur.fetchone() is not None
+
+    cur.execute(
+        """
+    CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+        raw_text,
+        document_type UNINDEXED,
+        content='documents',
+        content_rowid='id'
+    )
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts (rowid, raw_text, document_type)
+        VALUES (new.id, new.raw_text, new.document_type);
+    END
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, raw_text, document_type)
+        VALUES ('delete', old.id, old.raw_text, old.document_type);
+    END
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_update
+    AFTER UPDATE OF raw_text, document_type ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, raw_text, document_type)
+        VALUES ('delete', old.id, old.raw_text, old.document_type);
+        INSERT INTO documents_fts (rowid, raw_text, document_type)
+        VALUES (new.id, new.raw_text, new.document_type);
+    END
+    """
+    )
+
+    if not exists:
+        # Databases created before the index existed need a one-off backfill
+        cur.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+
+
+def _create_stats_tables(cur: sqlite3.Cursor) -> None:
+    """
+    Create the per-type, per-day document counters.
+
+    Counters are maintained by triggers on ``documents`` so reading them costs
+    the same no matter how many documents are stored.
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_stats'"
+    )
+    exists = cur.fetchone() is not None
+
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS document_stats (
+        document_type TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (document_type, day)
+    ) WITHOUT ROWID
+    """
+    )
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_document_stats_day ON document_stats (day)")
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS document_stats_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO document_stats (document_type, day, count)
+        VALUES (
+            IFNULL(new.document_type, 'unknown'),
+            date(IFNULL(new.created_at, CURRENT_TIMESTAMP)),
+            1
+        )
+        ON CONFLICT (document_type, day) DO UPDATE SET count = count + 1;
+    END
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS document_stats_delete AFTER DELETE ON documents BEGIN
+        UPDATE document_stats SET count = count - 1
+        WHERE document_type = IFNULL(old.document_type, 'unknown')
+          AND day = date(old.created_at);
+    END
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS document_stats_update
+    AFTER UPDATE OF document_type ON documents
+    WHEN IFNULL(old.document_type, 'unknown') != IFNULL(new.document_type, 'unknown') BEGIN
+        UPDATE document_stats SET count = count - 1
+        WHERE document_type = IFNULL(old.document_type, 'unknown')
+          AND day = date(old.created_at);
+        INSERT INTO document_stats (document_type, day, count)
+        VALUES (IFNULL(new.document_type, 'unknown'), date(new.created_at), 1)
+        ON CONFLICT (document_type, day) DO UPDATE SET count = count + 1;
+    END
+    """
+    )
+
+    if not exists:
+        cur.execute(
+            """
+        INSERT INTO document_stats (document_type, day, count)
+        SELECT IFNULL(document_type, 'unknown'), date(created_at), COUNT(*)
+        FROM documents
+        GROUP BY 1, 2
+        """
+        )
+
+
+def _create_field_store(cur: sqlite3.Cursor) -> None:
+    """
+    Create the unified extracted-field store.
+
+    Every extractor's output is stored as one row per field. Alongside the raw
+    string value, amounts and dates are normalized into ``value_num`` and
+    ``value_date`` so range queries can use an index.
+    """
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS document_fields (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id INTEGER NOT NULL,
+        document_type TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT,
+        value_num REAL,
+        value_date TEXT,
+        FOREIGN KEY(document_id) REFERENCES documents(id)
+    )
+    """
+    )
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_document_fields_value "
+        "ON document_fields (document_type, field, value)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_document_fields_num "
+        "ON document_fields (document_type, field, value_num) WHERE value_num IS NOT NULL"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_document_fields_date "
+        "ON document_fields (document_type, field, value_date) WHERE value_date IS NOT NULL"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_document_fields_document ON document_fields (document_id)"
+    )
+
+
+TELEMETRY_COLUMNS = (
+    "file_bytes",
+    "page_count",
+    "ocr_used",
+    "extraction_ms",
+    "ocr_ms",
+    "classification_ms",
+    "field_extraction_ms",
+    "total_ms",
+    "peak_rss_kb",
+    "cache_hits",
+)
+
+# Bits of document_telemetry.cache_hits, one per pipeline stage
+CACHE_HIT_BITS = {"text": 1, "classification": 2, "fields": 4}
+
+
+def _create_telemetry_table(cur: sqlite3.Cursor) -> None:
+    """
+    Create the per-document processing telemetry table.
+
+    One narrow row per document, keyed by the document ID so it costs no
+    extra index; type and date come from ``documents`` when reporting.
+    ``cache_hits`` is a bitmask of ``CACHE_HIT_BITS``.
+    """
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS document_telemetry (
+        document_id INTEGER PRIMARY KEY,
+        file_bytes INTEGER,
+        page_count INTEGER,
+        ocr_used INTEGER,
+        extraction_ms REAL,
+        ocr_ms REAL,
+        classification_ms REAL,
+        field_extraction_ms REAL,
+        total_ms REAL,
+        peak_rss_kb INTEGER,
+        cache_hits INTEGER,
+        FOREIGN KEY(document_id) REFERENCES documents(id)
+    )
+    """
+    )
+
+
+@traced("db.insert_document")
+def insert_document(
+    file_path: str,
+    document_type: str,
+    text: str,
+    file_hash: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    ocr_status: Optional[str] = None,
+) -> int:
+    """
+    Insert a document record and return its ID.
+
+    ``file_hash`` is the SHA-256 of the file, used to recognise re-uploads.
+    ``ocr_status`` is 'pending' for a document classified without OCR under
+    load. When ``conn`` is given the row is written on it and the caller commits.
+    """
+    logger.debug("Inserting document: %s, type: %s", file_path, document_type)
     
-    conn = get_connection()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO documents (file_path, document_type, raw_text) VALUES (?, ?, ?)",
-        (file_path, document_type, text),
+        "INSERT INTO documents (file_path, document_type, raw_text, file_hash, ocr_status) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (file_path, document_type, text, file_hash, ocr_status),
     )
     document_id = cur.lastrowid
-    conn.commit()
-    conn.close()
+    if own_conn:
+        conn.commit()
+        conn.close()
     
-    logger.info(f"Document inserted with ID: {document_id}")
+    logger.info("Document inserted with ID: %d", document_id,
+                extra={'document_id': document_id, 'document_type': document_type})
     return document_id
 
 
-def get_all_documents() -> List[Dict]:
-    """Get all documents from database."""
+def _select_list(columns: Sequence[str]) -> str:
+    """SQL select list for document ``columns``, which must come from DOCUMENT_COLUMNS."""
+    unknown = [column for column in columns if column not in DOCUMENT_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"Invalid document columns: {unknown or 'none'}")
+    return ", ".join(columns)
+
+
+def get_all_documents(columns: Sequence[str] = DOCUMENT_LIST_COLUMNS) -> List[Dict]:
+    """Get all documents from database (only ``columns``, see ``DOCUMENT_COLUMNS``)."""
     logger.debug("Fetching all documents")
     
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT id, file_path, document_type FROM documents ORDER BY id DESC")
+    cur.execute(f"SELECT {_select_list(columns)} FROM documents ORDER BY id DESC")
     
     rows = cur.fetchall()
     conn.close()
     
     documents = [dict(row) for row in rows]
-    logger.debug(f"Found {len(documents)} documents")
+    logger.debug("Found %d documents", len(documents))
     
     return documents
 
 
-def get_document_by_id(doc_id: int) -> Optional[Dict]:
-    """Get a specific document by ID."""
-    logger.debug(f"Fetching document ID: {doc_id}")
+@traced("db.find_document_by_hash")
+def find_document_by_hash(file_hash: str) -> Optional[Dict]:
+    """Get the first document stored for a file with this SHA-256, if any."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT id, file_path, document_type, raw_text, ocr_status FROM documents "
+        "WHERE file_hash = ? ORDER BY id LIMIT 1",
+        (file_hash,),
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+@traced("db.get_document_by_id")
+def get_document_by_id(doc_id: int, columns: Sequence[str] = DOCUMENT_COLUMNS) -> Optional[Dict]:
+    """Get a specific document by ID (only ``columns``, see ``DOCUMENT_COLUMNS``)."""
+    logger.debug("Fetching document ID: %s", doc_id)
     
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
+    cur.execute(f"SELECT {_select_list(columns)} FROM documents WHERE id = ?", (doc_id,))
     
     row = cur.fetchone()
     conn.close()
@@ -150,6 +473,751 @@ def get_document_by_id(doc_id: int) -> Optional[Dict]:
     return dict(row) if row else None
 
 
+@traced("db.update_document_analysis")
+def update_document_analysis(
+    document_id: int,
+    document_type: str,
+    text: str,
+    fields: Dict[str, Any],
+    telemetry: Optional[Dict[str, Any]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> bool:
+    """
+    Replace a document's text, type and fields in place after deferred OCR.
+
+    Marks its OCR done; the search index and per-day stats follow through
+    their triggers. False if the document no longer exists. When ``conn`` is
+    given the caller commits.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.execute(
+        "UPDATE documents SET document_type = ?, raw_text = ?, ocr_status = 'done' WHERE id = ?",
+        (document_type, text, document_id),
+    )
+    updated = cur.rowcount == 1
+    if updated:
+        conn.execute("DELETE FROM document_fields WHERE document_id = ?", (document_id,))
+        insert_fields_batch([(document_id, document_type, fields)], conn=conn)
+        insert_telemetry_batch([(document_id, telemetry)], conn=conn)
+    if own_conn:
+        conn.commit()
+        conn.close()
+    logger.info("Document %d updated after OCR: %s", document_id, document_type,
+                extra={'document_id': document_id, 'document_type': document_type})
+    return updated
+
+
+def set_ocr_status(document_id: int, status: str) -> None:
+    """Record the outcome of a document's deferred OCR ('pending', 'done' or 'failed')."""
+    conn = get_connection()
+    conn.execute("UPDATE documents SET ocr_status = ? WHERE id = ?", (status, document_id))
+    conn.commit()
+    conn.close()
+
+
+def _field_rows(document_id: int, document_type: str, fields: Dict[str, Any]) -> List[Tuple]:
+    """Build document_fields rows, skipping empty values."""
+    rows = []
+    for field, value in fields.items():
+        if value is None or value == "":
+            continue
+        value = str(value)
+        rows.append((document_id, document_type, field, value,
+                     parse_amount(value), parse_date(value)))
+    return rows
+
+
+def insert_fields(document_id: int, document_type: str, fields: Dict[str, Any]) -> int:
+    """Store the extracted fields of one document and return the number stored."""
+    return insert_fields_batch([(document_id, document_type, fields)])
+
+
+@traced("db.insert_fields_batch")
+def insert_fields_batch(
+    documents: Iterable[Tuple[int, str, Dict[str, Any]]],
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Store extracted fields for many documents in a single transaction.
+
+    ``documents`` yields ``(document_id, document_type, fields)`` tuples. When
+    ``conn`` is given the rows are written on it and the caller commits.
+    """
+    rows = []
+    for document_id, document_type, fields in documents:
+        rows.extend(_field_rows(document_id, document_type, fields))
+    if not rows:
+        return 0
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    conn.executemany(
+        """
+        INSERT INTO document_fields
+            (document_id, document_type, field, value, value_num, value_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+    logger.debug("Stored %d extracted fields", len(rows))
+    return len(rows)
+
+
+def _telemetry_row(document_id: int, telemetry: Dict[str, Any]) -> Tuple:
+    row = [document_id]
+    for column in TELEMETRY_COLUMNS:
+        value = telemetry.get(column)
+        if column == "ocr_used" and value is not None:
+            value = int(bool(value))
+        elif column == "cache_hits" and isinstance(value, dict):
+            value = sum(bit for stage, bit in CACHE_HIT_BITS.items() if value.get(stage))
+        row.append(value)
+    return tuple(row)
+
+
+@traced("db.insert_telemetry_batch")
+def insert_telemetry_batch(
+    documents: Iterable[Tuple[int, Optional[Dict[str, Any]]]],
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Store processing telemetry for many documents.
+
+    ``documents`` yields ``(document_id, telemetry)`` pairs; ``telemetry``
+    holds any of ``TELEMETRY_COLUMNS`` (``cache_hits`` may be the per-stage
+    dict returned by the pipeline). When ``conn`` is given the caller commits.
+    """
+    rows = [_telemetry_row(document_id, telemetry)
+            for document_id, telemetry in documents if telemetry]
+    if not rows:
+        return 0
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    conn.executemany(
+        f"INSERT OR REPLACE INTO document_telemetry (document_id, {', '.join(TELEMETRY_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * (len(TELEMETRY_COLUMNS) + 1))})",
+        rows,
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return len(rows)
+
+
+def insert_telemetry(document_id: int, telemetry: Dict[str, Any]) -> int:
+    """Store the processing telemetry of one document."""
+    return insert_telemetry_batch([(document_id, telemetry)])
+
+
+def _telemetry_filters(
+    document_type: Optional[str], since: Optional[str], until: Optional[str]
+) -> Tuple[str, List[Any]]:
+    sql = ""
+    params: List[Any] = []
+    if document_type:
+        sql += " AND d.document_type = ?"
+        params.append(document_type)
+    if since:
+        sql += " AND d.created_at >= ?"
+        params.append(since)
+    if until:
+        sql += " AND d.created_at < date(?, '+1 day')"
+        params.append(until)
+    return sql, params
+
+
+def slowest_documents(
+    limit: int = 20,
+    document_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> List[Dict]:
+    """Documents with the longest total processing time, slowest first."""
+    filters, params = _telemetry_filters(document_type, since, until)
+    conn = get_connection()
+    rows = conn.execute(
+        f"""
+        SELECT d.id, d.file_path, d.document_type, d.created_at, t.*
+        FROM document_telemetry t
+        JOIN documents d ON d.id = t.document_id
+        WHERE 1 = 1{filters}
+        ORDER BY t.total_ms DESC
+        LIMIT ?
+        """,
+        params + [limit],
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+TELEMETRY_GROUPS = {
+    "type": "d.document_type",
+    "day": "date(d.created_at)",
+    "week": "strftime('%Y-W%W', d.created_at)",
+    "month": "strftime('%Y-%m', d.created_at)",
+}
+
+
+def telemetry_summary(
+    group_by: str = "type",
+    document_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Aggregate telemetry per document type or per period.
+
+    Each group carries the document count, average and maximum total time,
+    total compute time, the OCR share, average pages and stage times, and
+    the cache hit rate of the text stage. Groups are ordered by total
+    compute time, most expensive first.
+    """
+    if group_by not in TELEMETRY_GROUPS:
+        raise DatabaseError(
+            f"Cannot group telemetry by {group_by!r}. Allowed: {sorted(TELEMETRY_GROUPS)}"
+        )
+    filters, params = _telemetry_filters(document_type, since, until)
+    conn = get_connection()
+    rows = conn.execute(
+        f"""
+        SELECT {TELEMETRY_GROUPS[group_by]} AS grp,
+               COUNT(*) AS documents,
+               AVG(t.total_ms) AS avg_ms,
+               MAX(t.total_ms) AS max_ms,
+               SUM(t.total_ms) AS total_ms,
+               AVG(t.ocr_used) AS ocr_rate,
+               AVG(t.page_count) AS avg_pages,
+               AVG(t.extraction_ms) AS avg_extraction_ms,
+               AVG(t.ocr_ms) AS avg_ocr_ms,
+               AVG(t.classification_ms) AS avg_classification_ms,
+               AVG(t.field_extraction_ms) AS avg_field_extraction_ms,
+               MAX(t.peak_rss_kb) AS max_rss_kb,
+               AVG((t.cache_hits & {CACHE_HIT_BITS['text']}) > 0) AS cache_hit_rate
+        FROM document_telemetry t
+        JOIN documents d ON d.id = t.document_id
+        WHERE 1 = 1{filters}
+        GROUP BY grp
+        ORDER BY total_ms DESC
+        """,
+        params,
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def telemetry_regressions(days: int = 7, threshold: float = 1.2) -> List[Dict]:
+    """
+    Document types whose average processing time grew between periods.
+
+    Compares the last ``days`` days with the ``days`` before them and
+    returns types whose average total time grew by at least ``threshold``
+    times, largest ratio first.
+    """
+    conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT d.document_type,
+               AVG(CASE WHEN d.created_at >= datetime('now', ?) THEN t.total_ms END) AS current_ms,
+               AVG(CASE WHEN d.created_at < datetime('now', ?) THEN t.total_ms END) AS previous_ms,
+               SUM(d.created_at >= datetime('now', ?)) AS current_documents,
+               SUM(d.created_at < datetime('now', ?)) AS previous_documents
+        FROM document_telemetry t
+        JOIN documents d ON d.id = t.document_id
+        WHERE d.created_at >= datetime('now', ?)
+        GROUP BY d.document_type
+        """,
+        (f"-{days} days",) * 4 + (f"-{2 * days} days",),
+    ).fetchall()
+    conn.close()
+
+    regressions = []
+    for row in rows:
+        row = dict(row)
+        if row["current_ms"] is None or not row["previous_ms"]:
+            continue
+        row["ratio"] = row["current_ms"] / row["previous_ms"]
+        if row["ratio"] >= threshold:
+            regressions.append(row)
+    regressions.sort(key=lambda row: row["ratio"], reverse=True)
+    return regressions
+
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+def _create_jobs_table(cur: sqlite3.Cursor) -> None:
+    """
+    Create the background job queue.
+
+    A worker claims a job by setting its ``lease_owner`` and a
+    ``lease_expires`` time (Unix seconds) and keeps renewing the lease while
+    it works. A running job whose lease has expired belongs to a worker that
+    died; it is claimed again until ``max_attempts`` is reached.
+    """
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL DEFAULT 'classify',
+        file_path TEXT NOT NULL,
+        filename TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        document_id INTEGER,
+        result TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(jobs)")}
+    if "kind" not in columns:
+        cur.execute("ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT 'classify'")
+
+
+def create_job(
+    job_id: str,
+    file_path: str,
+    filename: str,
+    max_attempts: int,
+    kind: str = "classify",
+    document_id: Optional[int] = None,
+) -> None:
+    """
+    Queue a job to process ``file_path``.
+
+    A 'classify' job stores a new document; an 'ocr' job re-processes the
+    existing ``document_id`` with OCR and updates it in place.
+    """
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO jobs (id, kind, file_path, filename, max_attempts, document_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (job_id, kind, file_path, filename, max_attempts, document_id),
+    )
+    conn.commit()
+    conn.close()
+    logger.info("Queued job %s for %s", job_id, filename, extra={'job_id': job_id})
+
+
+def requeue_ocr_job(
+    job_id: str,
+    document_id: int,
+    file_path: str,
+    filename: str,
+    max_attempts: int,
+) -> str:
+    """
+    Queue OCR again for a document whose deferred OCR failed or was lost.
+
+    Returns the ID of the document's queued or running 'ocr' job when it has
+    one; otherwise queues ``job_id`` and marks the document's OCR pending.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        # IMMEDIATE, so two re-uploads cannot both queue a job
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            """
+            SELECT id FROM jobs
+            WHERE kind = 'ocr' AND document_id = ? AND status IN ('queued', 'running')
+            ORDER BY created_at, rowid
+            LIMIT 1
+            """,
+            (document_id,),
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, file_path, filename, max_attempts, document_id) "
+                "VALUES (?, 'ocr', ?, ?, ?, ?)",
+                (job_id, file_path, filename, max_attempts, document_id),
+            )
+            conn.execute("UPDATE documents SET ocr_status = 'pending' WHERE id = ?",
+                         (document_id,))
+        else:
+            job_id = row["id"]
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return job_id
+
+
+def _job_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a job by ID, with its result decoded."""
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    return _job_dict(row) if row else None
+
+
+def claim_job(owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Lease the oldest runnable job to ``owner``; returns it, or None when idle.
+
+    Runnable means queued, or running with an expired lease. Jobs whose lease
+    expired on their last attempt are marked failed instead, along with the
+    deferred OCR of their document.
+    """
+    now = time.time()
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        # IMMEDIATE takes the write lock up front, so two workers cannot
+        # select the same job
+        conn.execute("BEGIN IMMEDIATE")
+        # An OCR job lost on its last attempt fails its document's OCR too
+        conn.execute(
+            """
+            UPDATE documents SET ocr_status = 'failed'
+            WHERE id IN (
+                SELECT document_id FROM jobs
+                WHERE kind = 'ocr' AND status = 'running' AND lease_expires < ?
+                  AND attempts >= max_attempts
+            )
+            """,
+            (now,),
+        )
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'failed', lease_owner = NULL, lease_expires = NULL,
+                error = 'Worker lost after ' || attempts || ' attempts',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts
+            """,
+            (now,),
+        )
+        row = conn.execute(
+            """
+            SELECT id FROM jobs
+            WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+            ORDER BY created_at, rowid
+            LIMIT 1
+            """,
+            (now,),
+        ).fetchone()
+        job = None
+        if row is not None:
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                (owner, now + lease_seconds, row["id"]),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            job = _job_dict(row)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return job
+
+
+def renew_job_leases(owner: str, job_ids: Iterable[str], lease_seconds: float) -> int:
+    """Extend the leases ``owner`` holds on ``job_ids``; returns how many it still holds."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    conn = get_connection()
+    cur = conn.execute(
+        f"""
+        UPDATE jobs SET lease_expires = ?
+        WHERE lease_owner = ? AND status = 'running' AND id IN ({', '.join('?' * len(job_ids))})
+        """,
+        [time.time() + lease_seconds, owner, *job_ids],
+    )
+    conn.commit()
+    conn.close()
+    return cur.rowcount
+
+
+def complete_job(
+    job_id: str,
+    owner: str,
+    document_id: Optional[int],
+    result: Dict[str, Any],
+    conn: Optional[sqlite3.Connection] = None,
+) -> bool:
+    """
+    Mark a job done with its result; False if ``owner`` no longer holds it.
+
+    Pass the ``conn`` the document was written on so the document and the
+    job's completion commit together (the caller commits).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.execute(
+        """
+        UPDATE jobs
+        SET status = 'done', document_id = ?, result = ?, error = NULL,
+            lease_owner = NULL, lease_expires = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """,
+        (document_id, json.dumps(result), job_id, owner),
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return cur.rowcount == 1
+
+
+def fail_job(job_id: str, owner: str, error: str, retry: bool = True) -> Optional[str]:
+    """
+    Record a failed attempt; returns the job's new status.
+
+    With ``retry`` the job is queued again unless it is out of attempts.
+    Returns None when ``owner`` no longer holds the job.
+    """
+    conn = get_connection()
+    cur = conn.execute(
+        """
+        UPDATE jobs
+        SET status = CASE WHEN ? AND attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """,
+        (retry, error, job_id, owner),
+    )
+    status = None
+    if cur.rowcount == 1:
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        status = row["status"]
+    conn.commit()
+    conn.close()
+    return status
+
+
+def job_counts() -> Dict[str, int]:
+    """Number of jobs in each status."""
+    conn = get_connection()
+    rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    conn.close()
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+@traced("db.get_document_fields")
+def get_document_fields(document_id: int) -> Dict[str, str]:
+    """Get the extracted fields of a document."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT field, value FROM document_fields WHERE document_id = ? ORDER BY id",
+        (document_id,),
+    )
+    fields = {row["field"]: row["value"] for row in cur.fetchall()}
+    conn.close()
+    return fields
+
+
+@traced("db.find_documents_by_fields")
+def find_documents_by_fields(
+    document_type: str,
+    equals: Optional[Dict[str, Any]] = None,
+    between: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    limit: int = SEARCH_MAX_RESULTS,
+) -> List[Dict]:
+    """
+    Find documents of a type by extracted field values.
+
+    ``equals`` maps field names to exact values. ``between`` maps field names
+    to inclusive ``(low, high)`` bounds, either of which may be ``None``;
+    bounds that parse as dates compare against the normalized date, otherwise
+    against the normalized amount. For example, all invoices from a vendor in
+    the first quarter::
+
+        find_documents_by_fields(
+            "invoice",
+            equals={"vendor_name": "Acme Corp"},
+            between={"invoice_date": ("2024-01-01", "2024-03-31")},
+        )
+
+    Each condition is resolved through the document_fields indexes.
+    """
+    conditions = []
+    params: List[Any] = []
+
+    for field, value in (equals or {}).items():
+        conditions.append(
+            "d.id IN (SELECT document_id FROM document_fields "
+            "WHERE document_type = ? AND field = ? AND value = ?)"
+        )
+        params.extend([document_type, field, str(value)])
+
+    for field, (low, high) in (between or {}).items():
+        bounds = [bound for bound in (low, high) if bound is not None]
+        if bounds and all(parse_date(bound) for bound in bounds):
+            column, low, high = "value_date", parse_date(low), parse_date(high)
+        elif all(parse_amount(bound) is not None for bound in bounds):
+            column, low, high = "value_num", parse_amount(low), parse_amount(high)
+        else:
+            raise DatabaseError(f"Range bounds for {field!r} must both be dates or amounts")
+
+        clause = (
+            f"d.id IN (SELECT document_id FROM document_fields "
+            f"WHERE document_type = ? AND field = ? AND {column} IS NOT NULL"
+        )
+        params.extend([document_type, field])
+        if low is not None:
+            clause += f" AND {column} >= ?"
+            params.append(low)
+        if high is not None:
+            clause += f" AND {column} <= ?"
+            params.append(high)
+        conditions.append(clause + ")")
+
+    sql = "SELECT d.id, d.file_path, d.document_type FROM documents d WHERE d.document_type = ?"
+    params.insert(0, document_type)
+    for condition in conditions:
+        sql += f" AND {condition}"
+    sql += " ORDER BY d.id DESC LIMIT ?"
+    params.append(limit)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(row) for row in rows]
+
+
+@traced("db.get_stats")
+def get_stats(days: int = STATS_DAYS) -> Dict[str, Any]:
+    """
+    Get document counts from the incrementally maintained counters.
+
+    Returns the overall total, counts per document type (most common first)
+    and counts per day for the last ``days`` days (most recent first).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT document_type, SUM(count) AS count
+        FROM document_stats
+        GROUP BY document_type
+        HAVING SUM(count) > 0
+        ORDER BY count DESC, document_type
+        """
+    )
+    by_type = {row["document_type"]: row["count"] for row in cur.fetchall()}
+
+    cur.execute(
+        """
+        SELECT day, SUM(count) AS count
+        FROM document_stats
+        WHERE day >= date('now', ?)
+        GROUP BY day
+        HAVING SUM(count) > 0
+        ORDER BY day DESC
+        """,
+        (f"-{days} days",),
+    )
+    by_day = {row["day"]: row["count"] for row in cur.fetchall()}
+    conn.close()
+
+    return {
+        "total": sum(by_type.values()),
+        "by_type": by_type,
+        "by_day": by_day,
+    }
+
+
+@traced("db.search_documents")
+def search_documents(
+    query: str,
+    document_type: Optional[str] = None,
+    limit: int = SEARCH_RESULT_LIMIT,
+    offset: int = 0,
+) -> List[Dict]:
+    """
+    Full-text search over extracted document text.
+
+    Results are ranked by BM25 (best match first) and carry a short
+    highlighted snippet of the matching text. ``query`` uses FTS5 query
+    syntax, e.g. ``invoice AND "acme corp"`` or ``vend*``.
+    """
+    logger.debug("Searching documents: %r, type: %s", query, document_type)
+
+    sql = """
+        SELECT d.id, d.file_path, d.document_type,
+               snippet(documents_fts, 0, '[', ']', '...', 16) AS snippet,
+               bm25(documents_fts) AS rank
+        FROM documents_fts
+        JOIN documents d ON d.id = documents_fts.rowid
+        WHERE documents_fts MATCH ?
+    """
+    params: List[Any] = [query]
+    if document_type:
+        sql += " AND documents_fts.document_type = ?"
+        params.append(document_type)
+    sql += " ORDER BY rank LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        raise DatabaseError(f"Invalid search query {query!r}: {str(e)}")
+    finally:
+        conn.close()
+
+    results = [dict(row) for row in rows]
+    logger.debug("Search returned %d documents", len(results))
+    return results
+
+
+def rebuild_search_index() -> int:
+    """Rebuild the full-text index from the documents table and return its size."""
+    logger.info("Rebuilding full-text search index")
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+    cur.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+    conn.commit()
+    count = cur.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    conn.close()
+
+    logger.info("Search index rebuilt over %d documents", count)
+    return count
+
+
 def insert_invoice(document_id: int, fields: Dict[str, Any]) -> None:
     conn = get_connection()
     cur = conn.cursor()
@@ -22,6 +22,33 @@ class DatabaseError(AutoDocException):
     """Raised when database operations fail."""
     pass
 
+
+class WriteQueueFullError(DatabaseError):
+    """Raised when the database write queue is at capacity."""
+    pass
+
+
+class AdmissionRejectedError(AutoDocException):
+    """Raised when a processing lane is saturated; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, lane: str, retry_after: int):
+        super().__init__(message)
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class IdempotencyConflictError(AutoDocException):
+    """Raised when an idempotency key is reused for another request, or is still in use."""
+
+    def __init__(self, message: str, in_progress: bool = False):
+        super().__init__(message)
+        self.in_progress = in_progress
+
+
+class ExportError(AutoDocException):
+    """Raised when a document export cannot be produced."""
+    pass
+
 class ValidationError(AutoDocException):
     """Raised when document validation fails."""
     pass
@@ -0,0 +1,235 @@
+"""
+Streaming export of documents to CSV, JSONL or Parquet.
+
+Rows are read from SQLite in fixed-size chunks and encoded chunk by chunk, so
+memory use stays flat no matter how many documents are exported. The same
+generator feeds files written by the CLI and chunked HTTP responses.
+"""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+from app import db
+from app.config import EXPORT_CHUNK_SIZE
+from app.exceptions import ExportError, ValidationError
+from app.logger import get_logger
+from app.utils import parse_date
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+BASE_COLUMNS = ['id', 'file_path', 'document_type', 'created_at']
+
+
+def export_columns(include_text=False, include_fields=False) -> List[str]:
+    """Columns produced by an export with the given options."""
+    columns = list(BASE_COLUMNS)
+    if include_text:
+        columns.append('raw_text')
+    if include_fields:
+        columns.append('fields')
+    return columns
+
+
+def iter_document_chunks(
+    document_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_text: bool = False,
+    include_fields: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield documents in chunks of at most ``chunk_size`` rows, oldest first.
+
+    ``since`` and ``until`` are inclusive dates on ``created_at``. With
+    ``include_fields`` each row carries a ``fields`` dict, loaded with one
+    query per chunk.
+    """
+    columns = export_columns(include_text=include_text)
+    sql = f"SELECT {', '.join(columns)} FROM documents WHERE 1 = 1"
+    params: List[Any] = []
+    if document_type:
+        sql += " AND document_type = ?"
+        params.append(document_type)
+    if since:
+        sql += " AND created_at >= ?"
+        params.append(_parse_bound(since, 'since'))
+    if until:
+        sql += " AND created_at < date(?, '+1 day')"
+        params.append(_parse_bound(until, 'until'))
+    sql += " ORDER BY id"
+
+    conn = db.get_connection()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = [dict(row) for row in rows]
+            if include_fields:
+                _attach_fields(conn, chunk)
+            yield chunk
+    finally:
+        conn.close()
+
+
+def _parse_bound(value: str, name: str) -> str:
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValidationError(f"Invalid {name} date: {value!r}")
+    return parsed
+
+
+def _attach_fields(conn, chunk: List[Dict[str, Any]]) -> None:
+    by_id = {row['id']: row for row in chunk}
+    for row in chunk:
+        row['fields'] = {}
+    placeholders = ', '.join('?' * len(by_id))
+    cur = conn.execute(
+        f"SELECT document_id, field, value FROM document_fields "
+        f"WHERE document_id IN ({placeholders}) ORDER BY id",
+        list(by_id),
+    )
+    for document_id, field, value in cur:
+        by_id[document_id]['fields'][field] = value
+
+
+def iter_export(fmt: str = 'csv', **filters) -> Iterator[bytes]:
+    """
+    Encode an export as a stream of byte chunks.
+
+    ``filters`` are passed to ``iter_document_chunks``. One encoded chunk is
+    yielded per database chunk (plus a header for CSV).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported export format {fmt!r}. Allowed: {sorted(EXPORT_FORMATS)}")
+    # Validate up front: once streaming has started errors can no longer be reported
+    for bound in ('since', 'until'):
+        if filters.get(bound):
+            _parse_bound(filters[bound], bound)
+
+    chunks = iter_document_chunks(**filters)
+    columns = export_columns(
+        include_text=filters.get('include_text', False),
+        include_fields=filters.get('include_fields', False),
+    )
+    if fmt == 'csv':
+        return _iter_csv(chunks, columns)
+    if fmt == 'jsonl':
+        return _iter_jsonl(chunks)
+    return _iter_parquet(chunks, columns, *_load_pyarrow())
+
+
+def _iter_csv(chunks, columns) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for chunk in chunks:
+        for row in chunk:
+            if 'fields' in row:
+                row['fields'] = json.dumps(row['fields'])
+            writer.writerow(row)
+        yield _drain(buffer).encode('utf-8')
+    # Header only, when nothing matched
+    remainder = _drain(buffer)
+    if remainder:
+        yield remainder.encode('utf-8')
+
+
+def _iter_jsonl(chunks) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield ''.join(json.dumps(row) + '\n' for row in chunk).encode('utf-8')
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def _iter_parquet(chunks, columns, pa, pq) -> Iterator[bytes]:
+    types = {
+        'id': pa.int64(),
+        'fields': pa.map_(pa.string(), pa.string()),
+    }
+    schema = pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            if 'fields' in columns:
+                for row in chunk:
+                    row['fields'] = list(row['fields'].items())
+            # Each chunk becomes one row group, flushed to the caller at once
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _drain(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are handed off as they are written."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def export_documents(path: str, fmt: Optional[str] = None, **filters) -> int:
+    """
+    Export documents to ``path`` and return the number of bytes written.
+
+    The format defaults to the file extension (``.csv``, ``.jsonl``,
+    ``.parquet``).
+    """
+    if fmt is None:
+        fmt = str(path).rsplit('.', 1)[-1].lower()
+    logger.info(f"Exporting documents to {path} as {fmt}")
+
+    stream = iter_export(fmt, **filters)
+    written = 0
+    with open(path, 'wb') as f:
+        for data in stream:
+            f.write(data)
+            written += len(data)
+
+    logger.info(f"Exported {written} bytes to {path}")
+    return written
@@ -0,0 +1,37 @@
+"""
+Field extractors for each supported document type.
+"""
+from typing import Any, Callable, Dict
+
+from app.extractors.invoice_extractor import extract_invoice_fields
+from app.extractors.po_extractor import extract_po_fields
+from app.extractors.id_extractor import (
+    extract_driver_license_fields,
+    extract_passport_fields,
+    extract_w2_fields,
+)
+from app.extractors.paystub_extractor import extract_pay_stub_fields
+from app.extractors.flood_form_extractor import extract_flood_form_fields
+from app.performance import span
+
+# Bump when a change to any extractor alters its output, to invalidate cached results
+EXTRACTORS_VERSION = 1
+
+EXTRACTORS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "invoice": extract_invoice_fields,
+    "purchase_order": extract_po_fields,
+    "driver_license": extract_driver_license_fields,
+    "passport": extract_passport_fields,
+    "w2": extract_w2_fields,
+    "pay_stub": extract_pay_stub_fields,
+    "flood_form": extract_flood_form_fields,
+}
+
+
+def extract_fields(document_type: str, text: str) -> Dict[str, Any]:
+    """Extract key fields for ``document_type``; unknown types yield no fields."""
+    extractor = EXTRACTORS.get(document_type)
+    if extractor is None:
+        return {}
+    with span(f"extractors.{document_type}"):
+        return extractor(text)
@@ -0,0 +1,111 @@
+"""
+Idempotency keys for retried requests.
+
+A client that retries a timed-out upload with the same ``Idempotency-Key``
+gets the original outcome instead of a second run of the pipeline. While
+the first request is still running, duplicates wait on its result; once it
+completes, its response is kept (bounded, with a TTL) and replayed. A key
+reused for a different upload is refused, since replaying the first
+file's result for it would be wrong.
+
+Keys are held in memory, per process.
+"""
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.cache import LRUCache
+from app.config import IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL, IDEMPOTENCY_WAIT_TIMEOUT
+from app.exceptions import IdempotencyConflictError
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IdempotencyStore:
+    """Completed results by key (LRU with TTL) plus futures for keys still running."""
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS, ttl: float = IDEMPOTENCY_TTL,
+                 wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT):
+        self.wait_timeout = wait_timeout
+        self._completed = LRUCache(max_size=max_keys, ttl=ttl)  # key -> (fingerprint, result)
+        self._in_flight: Dict[str, Tuple[Optional[str], Future]] = {}
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        key: str,
+        fingerprint: Optional[str],
+        func: Callable[[], Any],
+        keep: Callable[[Any], bool] = lambda result: True,
+    ) -> Tuple[Any, bool]:
+        """
+        Run ``func`` once per key; returns ``(result, replayed)``.
+
+        ``fingerprint`` identifies the request the key was first used for;
+        a different fingerprint raises ``IdempotencyConflictError``. Results
+        for which ``keep`` is false (e.g. server errors) are handed to the
+        requests waiting on them but not replayed later, so a retry can
+        succeed. A duplicate that waits longer than ``wait_timeout`` raises
+        ``IdempotencyConflictError`` with ``in_progress`` set.
+        """
+        with self._lock:
+            stored = self._completed.get(key)
+            if stored is None:
+                running = self._in_flight.get(key)
+                if running is None:
+                    future = Future()
+                    self._in_flight[key] = (fingerprint, future)
+
+        if stored is not None:
+            self._check(key, stored[0], fingerprint)
+            logger.info(f"Replaying completed request for idempotency key {key}")
+            return stored[1], True
+
+        if running is not None:
+            self._check(key, running[0], fingerprint)
+            logger.info(f"Waiting on in-flight request for idempotency key {key}")
+            try:
+                return running[1].result(timeout=self.wait_timeout), True
+            except FutureTimeoutError:
+                raise IdempotencyConflictError(
+                    f"A request with idempotency key {key} is still in progress", in_progress=True)
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # Stored before the in-flight entry goes, so no duplicate slips between them
+            if keep(result):
+                self._completed.set(key, (fingerprint, result))
+            del self._in_flight[key]
+        future.set_result(result)
+        return result, False
+
+    @staticmethod
+    def _check(key: str, expected: Optional[str], fingerprint: Optional[str]):
+        if expected != fingerprint:
+            raise IdempotencyConflictError(
+                f"Idempotency key {key} was already used for a different request")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {**self._completed.stats(), 'in_flight': in_flight}
+
+
+_idempotency_store = None
+_idempotency_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the process-wide idempotency store."""
+    global _idempotency_store
+    with _idempotency_store_lock:
+        if _idempotency_store is None:
+            _idempotency_store = IdempotencyStore()
+        return _idempotency_store
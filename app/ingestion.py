@@ -1,22 +1,51 @@
-import pdfplumber
+"""
+Text extraction from PDFs (native text, with an OCR fallback) and images.
+
+pdfplumber, PIL and pytesseract (which pulls in pandas) are imported on
+first use, not at module load, so importing the pipeline stays cheap for
+the CLI, the API's startup and health checks.
+"""
+import time
 from pathlib import Path
-from PIL import Image
-import pytesseract
-from pytesseract import TesseractNotFoundError
+from typing import Any, Dict, Optional
 
-from app.logger import get_logger
+from app.logger import PAGE_LOGGER, get_logger
 from app.exceptions import DocumentProcessingError, UnsupportedFileTypeError
 from app.config import EXTRACT_TIMEOUT
+from app.performance import PerformanceMonitor, process_rss_kb, span
 
 logger = get_logger(__name__)
+# One record per page; off unless LOG_PAGE_LEVEL is DEBUG (see app.logger)
+page_logger = get_logger(PAGE_LOGGER)
+
+# Bump when a change alters extracted text, to invalidate cached results
+# (2: cached extraction results carry page count and OCR use)
+EXTRACTION_VERSION = 2
 
 
-def extract_text_from_file(path: str) -> str:
+def extract_text_from_file(
+    path: str,
+    stats: Optional[Dict[str, Any]] = None,
+    defer_ocr: bool = False,
+) -> str:
     """
     Extract text from a document file.
     Supports PDF and image formats.
+
+    When ``stats`` is given it is filled with ``page_count``, ``ocr_used``,
+    ``ocr_deferred``, ``ocr_unavailable`` (OCR was needed but tesseract is
+    not installed), ``ocr_ms`` and ``peak_rss_kb`` (process RSS sampled
+    after each page is read or rendered).
+
+    With ``defer_ocr`` (degraded mode under load) only native PDF text is
+    read: a file that would need OCR returns no text and sets
+    ``ocr_deferred`` so the caller can queue the OCR for later.
     """
-    logger.info(f"Starting text extraction from: {path}")
+    if stats is None:
+        stats = {}
+    stats.update(page_count=0, ocr_used=False, ocr_deferred=False, ocr_unavailable=False,
+                 ocr_ms=0.0, peak_rss_kb=0)
+    logger.info("Starting text extraction from: %s", path)
     
     try:
         file_path = Path(path)
@@ -27,69 +56,112 @@ def extract_text_from_file(path: str) -> str:
         suffix = file_path.suffix.lower()
         
         if suffix == ".pdf":
-            text = _extract_text_from_pdf(file_path)
+            text = _extract_text_from_pdf(file_path, stats, defer_ocr)
         elif suffix in {".png", ".jpg", ".jpeg", ".bmp", ".tiff"}:
-            text = _extract_text_from_image(file_path)
+            text = _extract_text_from_image(file_path, stats, defer_ocr)
         else:
             raise UnsupportedFileTypeError(f"Unsupported file type: {file_path.suffix}")
         
-        logger.info(f"Successfully extracted {len(text)} characters from {path}")
+        logger.info("Successfully extracted %d characters from %s", len(text), path,
+                    extra={'page_count': stats['page_count'], 'ocr_used': stats['ocr_used']})
         return text
         
     except Exception as e:
-        logger.error(f"Error extracting text from {path}: {str(e)}")
+        logger.error("Error extracting text from %s: %s", path, e)
         raise DocumentProcessingError(f"Failed to extract text: {str(e)}")
 
 
-def _extract_text_from_pdf(path: Path) -> str:
+def _sample_rss(stats: Dict[str, Any]) -> None:
+    stats['peak_rss_kb'] = max(stats['peak_rss_kb'], process_rss_kb())
+
+
+def _ocr(image, stats: Dict[str, Any], operation: str) -> str:
+    """Run tesseract on an image, accounting its time in ``stats``."""
+    import pytesseract
+
+    stats['ocr_used'] = True
+    start = time.perf_counter()
+    try:
+        with PerformanceMonitor(operation, stage='ocr'):
+            return pytesseract.image_to_string(image)
+    finally:
+        stats['ocr_ms'] += (time.perf_counter() - start) * 1000
+
+
+def _extract_text_from_pdf(path: Path, stats: Dict[str, Any], defer_ocr: bool = False) -> str:
     """Extract text from PDF file with OCR fallback."""
-    logger.debug(f"Extracting text from PDF: {path}")
+    import pdfplumber
+
+    logger.debug("Extracting text from PDF: %s", path)
     
     # First try standard text extraction
     text_parts: list[str] = []
     with pdfplumber.open(path) as pdf:
-        logger.debug(f"PDF has {len(pdf.pages)} pages")
+        logger.debug("PDF has %d pages", len(pdf.pages))
+        stats['page_count'] = len(pdf.pages)
         
         for i, page in enumerate(pdf.pages):
-            page_text = page.extract_text() or ""
+            with span("pdfplumber.extract_text", page=i + 1):
+                page_text = page.extract_text() or ""
             text_parts.append(page_text)
-            logger.debug(f"Page {i+1}: extracted {len(page_text)} characters")
+            _sample_rss(stats)
+            page_logger.debug("Page %d: extracted %d characters", i + 1, len(page_text))
 
         combined = "\n".join(text_parts).strip()
         if combined:
             logger.info("Successfully extracted text from PDF (native)")
             return combined
 
+        if defer_ocr:
+            logger.info("No embedded text found; OCR deferred")
+            stats['ocr_deferred'] = True
+            return ""
+
         # Fallback: OCR each page image when PDF has no embedded text
+        from pytesseract import TesseractNotFoundError
         logger.info("No embedded text found, attempting OCR")
         ocr_parts: list[str] = []
         for i, page in enumerate(pdf.pages):
-            pil_image = page.to_image(resolution=300).original
+            with span("pdfplumber.render", page=i + 1):
+                pil_image = page.to_image(resolution=300).original
+            # The rendered page is alive here, so this is the high-water mark
+            _sample_rss(stats)
             try:
-                ocr_text = pytesseract.image_to_string(pil_image)
-                logger.debug(f"OCR page {i+1}: extracted {len(ocr_text)} characters")
+                ocr_text = _ocr(pil_image, stats, f"OCR of page {i+1}")
+                page_logger.debug("OCR page %d: extracted %d characters", i + 1, len(ocr_text))
             except TesseractNotFoundError:
                 logger.warning("Tesseract not found, OCR unavailable")
+                stats['ocr_unavailable'] = True
                 ocr_text = ""
             ocr_parts.append(ocr_text or "")
 
     result = "\n".join(ocr_parts)
-    logger.info(f"OCR extraction complete: {len(result)} characters")
+    logger.info("OCR extraction complete: %d characters", len(result))
     return result
 
 
-def _extract_text_from_image(path: Path) -> str:
+def _extract_text_from_image(path: Path, stats: Dict[str, Any], defer_ocr: bool = False) -> str:
     """Extract text from image file using OCR."""
-    logger.debug(f"Extracting text from image: {path}")
+    from PIL import Image
+    from pytesseract import TesseractNotFoundError
+
+    logger.debug("Extracting text from image: %s", path)
     
     try:
         image = Image.open(path)
-        text = pytesseract.image_to_string(image)
-        logger.info(f"OCR extraction from image: {len(text)} characters")
+        stats['page_count'] = getattr(image, 'n_frames', 1)
+        if defer_ocr:
+            logger.info("OCR of %s deferred", path.name)
+            stats['ocr_deferred'] = True
+            return ""
+        _sample_rss(stats)
+        text = _ocr(image, stats, f"OCR of {path.name}")
+        logger.info("OCR extraction from image: %d characters", len(text))
         return text
     except TesseractNotFoundError:
         logger.error("Tesseract not found, OCR unavailable")
+        stats['ocr_unavailable'] = True
         return ""
     except Exception as e:
-        logger.error(f"Error during OCR: {str(e)}")
+        logger.error("Error during OCR: %s", e)
         raise DocumentProcessingError(f"OCR failed: {str(e)}")
@@ -0,0 +1,176 @@
+"""
+Streaming upload intake.
+
+Werkzeug hands each uploaded file's bytes to a stream from the request's
+``_get_file_stream`` as the multipart body is parsed. ``IntakeRequest``
+returns an ``UploadStream``: a uniquely named temporary file in the upload
+folder that hashes the bytes as they arrive, sniffs the content type from
+the first chunk and enforces the per-file size limit. Disallowed or
+oversized files are rejected mid-body (415 or 413) instead of after the
+whole upload has been written out, and the SHA-256 is known the moment
+parsing ends, so a file that was already processed can be answered without
+touching it again.
+
+``store_upload`` then renames the temporary file to its final name, which
+is atomic within the folder: a reader never sees a partial file, and
+concurrent uploads never overwrite each other's temporary files.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Set, Tuple
+
+from flask import Request, current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+from app.config import ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE
+
+SNIFF_BYTES = 1024  # PDF allows its header anywhere in the first 1024 bytes
+
+_TEMP_PREFIX = '.upload-'
+
+
+def sniff_extensions(head: bytes) -> Set[str]:
+    """File extensions consistent with a file's leading bytes (empty if unrecognised)."""
+    if b'%PDF-' in head[:SNIFF_BYTES]:
+        return {'.pdf'}
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return {'.png'}
+    if head.startswith(b'\xff\xd8\xff'):
+        return {'.jpg', '.jpeg'}
+    return set()
+
+
+class UploadStream:
+    """
+    Writable temporary upload file that hashes, sniffs and size-checks its content.
+
+    Reads, seeks and everything else go to the underlying file, so Werkzeug
+    and ``FileStorage`` use it like any spooled upload.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        filename: str,
+        max_size: Optional[int] = MAX_UPLOAD_SIZE,
+        allowed_extensions: Optional[Iterable[str]] = ALLOWED_EXTENSIONS,
+    ):
+        self.filename = filename
+        self.suffix = Path(filename).suffix.lower()
+        self.max_size = max_size
+        self.check_content = allowed_extensions is not None
+        if self.check_content and self.suffix not in allowed_extensions:
+            raise UnsupportedMediaType(
+                f"File type {self.suffix or '(none)'} not supported. "
+                f"Allowed: {sorted(allowed_extensions)}"
+            )
+        fd, path = tempfile.mkstemp(dir=directory, prefix=_TEMP_PREFIX, suffix='.part')
+        self.path = Path(path)
+        self.size = 0
+        self.stored = False
+        self._file = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self._head = b''
+        self._sniffed = False
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge(
+                f"{self.filename} exceeds the limit of {self.max_size} bytes")
+        self._sha256.update(data)
+        if self.check_content and not self._sniffed:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        return self._file.write(data)
+
+    def _sniff(self):
+        self._sniffed = True
+        if self.suffix not in sniff_extensions(self._head):
+            raise UnsupportedMediaType(f"Content of {self.filename} is not a {self.suffix} file")
+
+    def finish(self) -> str:
+        """Complete the checks for files shorter than the sniff window; return the SHA-256."""
+        if self.check_content and not self._sniffed:
+            self._sniff()
+        return self._sha256.hexdigest()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def move_to(self, path: Path) -> Path:
+        """Atomically give the file its final name."""
+        self._file.flush()
+        os.replace(self.path, path)
+        self.path = Path(path)
+        self.stored = True
+        return self.path
+
+    def discard(self):
+        """Close the file and delete it unless it was stored."""
+        self._file.close()
+        if not self.stored:
+            self.path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class IntakeRequest(Request):
+    """
+    Request whose file uploads stream into ``UploadStream`` objects.
+
+    ``max_file_size`` and ``allowed_extensions`` apply to every uploaded
+    file; a view can change them before touching ``request.files`` (set
+    ``allowed_extensions`` to None to accept any type). Temporary files that
+    were not stored are deleted when the request closes.
+    """
+
+    max_file_size: Optional[int] = MAX_UPLOAD_SIZE
+    allowed_extensions: Optional[Iterable[str]] = ALLOWED_EXTENSIONS
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        folder = Path(current_app.config['UPLOAD_FOLDER'])
+        folder.mkdir(parents=True, exist_ok=True)
+        stream = UploadStream(folder, filename or '', self.max_file_size, self.allowed_extensions)
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+    def close(self) -> None:
+        super().close()
+        for stream in self.__dict__.pop('_upload_streams', []):
+            stream.discard()
+
+
+def store_upload(file: FileStorage, path: Path) -> Tuple[Path, str]:
+    """
+    Give an uploaded file its final ``path``; returns the path and the file's SHA-256.
+
+    Streams from ``IntakeRequest`` are renamed into place. Any other upload
+    (e.g. a small one Werkzeug kept in memory) is copied to a temporary file
+    beside ``path`` and renamed, so ``path`` only ever holds a complete file.
+    """
+    path = Path(path)
+    stream = file.stream
+    if isinstance(stream, UploadStream):
+        file_hash = stream.finish()
+        return stream.move_to(path), file_hash
+
+    sha256 = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=_TEMP_PREFIX, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(64 * 1024), b''):
+                sha256.update(chunk)
+                out.write(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    return path, sha256.hexdigest()
@@ -0,0 +1,291 @@
+"""
+Background document jobs for AutoDoc Classifier.
+
+Uploads submitted as jobs are recorded in the ``jobs`` table and processed
+by a pool of worker threads, so the HTTP request returns at once instead of
+holding its connection through OCR. The OCR deferred for documents
+classified in degraded mode is queued the same way, as 'ocr' jobs that
+update their document in place. The queue is durable: a worker leases a
+job and renews the lease while it runs, and a job whose worker died (its
+lease expired) is picked up again by any worker, in this process or another,
+up to ``JOB_MAX_ATTEMPTS`` attempts.
+
+The API starts ``JOB_WORKERS`` workers in its own process when
+``create_app()`` runs; set it to 0 and run ``python -m app.jobs --workers N``
+to process jobs in separate processes.
+"""
+import argparse
+import atexit
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Sequence
+
+from app import db
+from app.config import (
+    JOB_WORKERS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+)
+from app.exceptions import AutoDocException, DocumentProcessingError
+from app.logger import get_logger, setup_logging
+from app.performance import start_trace
+from app.pipeline import analyze_document
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = ('done', 'failed')
+
+# Notified whenever a worker in this process finishes a job attempt
+_job_finished = threading.Condition()
+
+
+def submit_job(file_path: str, filename: str, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+    """Queue ``file_path`` for processing and return the job ID."""
+    job_id = uuid.uuid4().hex
+    db.create_job(job_id, file_path, filename, max_attempts)
+    runner = get_job_runner()
+    if runner is not None:
+        runner.wake()
+    return job_id
+
+
+def submit_ocr_job(
+    document_id: int,
+    file_path: str,
+    filename: str,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> str:
+    """Queue the OCR deferred for a stored document; the job updates it in place."""
+    job_id = uuid.uuid4().hex
+    db.create_job(job_id, file_path, filename, max_attempts, kind='ocr', document_id=document_id)
+    runner = get_job_runner()
+    if runner is not None:
+        runner.wake()
+    return job_id
+
+
+def resume_ocr_job(
+    document_id: int,
+    file_path: str,
+    filename: str,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> str:
+    """
+    Make sure a document whose deferred OCR is not done has an OCR job.
+
+    Returns its queued or running OCR job, or a new one when the last one
+    failed or was lost.
+    """
+    job_id = db.requeue_ocr_job(uuid.uuid4().hex, document_id, file_path, filename,
+                                max_attempts)
+    runner = get_job_runner()
+    if runner is not None:
+        runner.wake()
+    return job_id
+
+
+def job_response(result: Dict[str, Any], document_id: int) -> Dict[str, Any]:
+    """The classification result reported for a document, as returned by the API."""
+    return {
+        'document_id': document_id,
+        'document_type': result['document_type'],
+        'confidence': result['confidence'],
+        'fields': result['fields'],
+        'file_hash': result['file_hash'],
+        'text_length': len(result['text']),
+        'cache_hits': result['cache_hits'],
+    }
+
+
+def wait_for_job(
+    job_id: str,
+    timeout: float,
+    poll_interval: float = JOB_POLL_INTERVAL,
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a job, waiting up to ``timeout`` seconds for it to finish.
+
+    Wakes as soon as a worker in this process finishes a job, and polls the
+    table for jobs finished by other processes.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = db.get_job(job_id)
+        remaining = deadline - time.monotonic()
+        if job is None or job['status'] in TERMINAL_STATUSES or remaining <= 0:
+            return job
+        with _job_finished:
+            _job_finished.wait(min(remaining, poll_interval))
+
+
+class JobRunner:
+    """
+    Worker threads that claim and process jobs.
+
+    Each worker has its own lease owner ID (host, PID and worker number), so
+    a lease identifies the exact worker holding a job. One heartbeat thread
+    renews the leases of every job running in this process.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self.failed = 0
+        self._active: Dict[str, str] = {}  # job ID -> lease owner
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.owner}:{index}",),
+                                      name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Started {self.workers} job workers")
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming jobs and wait for running ones to finish."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wake(self):
+        """Skip the idle poll wait: a job was just queued."""
+        self._wake.set()
+
+    def _work(self, owner: str):
+        while not self._stop.is_set():
+            try:
+                job = db.claim_job(owner, self.lease_seconds)
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job, owner)
+
+    def _run(self, job: Dict[str, Any], owner: str):
+        with self._lock:
+            self._active[job['id']] = owner
+        logger.info(f"Job {job['id']} attempt {job['attempts']}/{job['max_attempts']}: "
+                    f"{job['filename']}")
+        try:
+            with start_trace('job', job_id=job['id'], attempt=job['attempts']):
+                result = analyze_document(job['file_path'])
+                if job['kind'] == 'ocr' and not result['text'].strip():
+                    # Tesseract missing or a blank scan: keep the native-text analysis
+                    raise DocumentProcessingError("OCR produced no text")
+                self._store(job, owner, result)
+            with self._lock:
+                self.processed += 1
+        except Exception as e:
+            # Unreadable or unsupported files fail the same way every time
+            retry = not isinstance(e, AutoDocException)
+            status = db.fail_job(job['id'], owner, str(e), retry=retry)
+            if status == 'failed' and job['kind'] == 'ocr':
+                db.set_ocr_status(job['document_id'], 'failed')
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Job {job['id']} failed ({status}): {str(e)}")
+        finally:
+            with self._lock:
+                self._active.pop(job['id'], None)
+            with _job_finished:
+                _job_finished.notify_all()
+
+    def _store(self, job: Dict[str, Any], owner: str, result: Dict[str, Any]):
+        """Write the document (or update it, for deferred OCR) and complete the job atomically."""
+        conn = db.get_connection()
+        try:
+            if job['kind'] == 'ocr':
+                document_id = job['document_id']
+                db.update_document_analysis(document_id, result['document_type'], result['text'],
+                                            result['fields'], result['telemetry'], conn=conn)
+            else:
+                document_id = db.insert_document(job['file_path'], result['document_type'],
+                                                 result['text'], result['file_hash'], conn=conn)
+                db.insert_fields_batch([(document_id, result['document_type'], result['fields'])],
+                                       conn=conn)
+                db.insert_telemetry_batch([(document_id, result['telemetry'])], conn=conn)
+            response = job_response(result, document_id)
+            if db.complete_job(job['id'], owner, document_id, response, conn=conn):
+                conn.commit()
+            else:
+                # The lease expired and another worker owns the job now
+                conn.rollback()
+                logger.warning(f"Job {job['id']} lease lost; discarding this attempt's result")
+        finally:
+            conn.close()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                by_owner: Dict[str, list] = {}
+                for job_id, owner in self._active.items():
+                    by_owner.setdefault(owner, []).append(job_id)
+            for owner, job_ids in by_owner.items():
+                try:
+                    db.renew_job_leases(owner, job_ids, self.lease_seconds)
+                except sqlite3.Error as e:
+                    logger.error(f"Could not renew job leases: {str(e)}")
+
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> Optional[JobRunner]:
+    """Get the process-wide job runner, starting it on first use (None when JOB_WORKERS is 0)."""
+    global _job_runner
+    if JOB_WORKERS <= 0:
+        return None
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner().start()
+            atexit.register(_job_runner.stop, 5.0)
+        return _job_runner
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Process queued document jobs")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1), help="Worker threads")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    db.init_db()
+    runner = JobRunner(workers=args.workers).start()
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+    stopped.wait()
+    logger.info("Stopping job workers")
+    runner.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
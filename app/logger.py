@@ -1,26 +1,179 @@
 """
 Logging configuration and utilities for AutoDoc Classifier.
+
+``setup_logging`` routes every record through a queue: the logging thread
+only merges the message with its arguments and enqueues the record, and a
+background ``QueueListener`` formats it and writes the log file and stderr,
+so request threads never wait on log I/O. The queue holds at most
+``LOG_QUEUE_SIZE`` records: if the writer stalls, further records are
+dropped (and counted in ``autodoc_log_records_dropped_total``) rather than
+blocking callers or growing memory without bound. Messages use %-style
+arguments, so a record below the active level is never formatted at all.
+
+With ``LOG_STRUCTURED`` the log file holds one JSON object per record,
+including any ``extra`` fields. ``LOG_SAMPLING`` keeps only a fraction of a
+busy logger's INFO and DEBUG records, and the per-page extraction logger
+(``PAGE_LOGGER``) has its own level, ``LOG_PAGE_LEVEL``, so page-by-page
+debug output stays off unless asked for.
 """
+import atexit
+import copy
+import itertools
+import json
 import logging
-import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from app.config import LOG_LEVEL, LOG_FILE, LOG_FORMAT
+from typing import Dict, Optional
+from app.config import (
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_STRUCTURED,
+    LOG_SAMPLING,
+    LOG_PAGE_LEVEL,
+    LOG_QUEUE_SIZE,
+)
+from app.metrics import LOG_RECORDS_DROPPED
+
+PAGE_LOGGER = 'app.ingestion.pages'
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object, with its ``extra`` fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items()
+                     if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction ``rate`` of the records at or below ``max_level``.
+
+    Records are kept evenly (every 10th at 0.1) rather than at random; more
+    severe records always pass.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self._seen = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        n = next(self._seen)
+        return int((n + 1) * self.rate) > int(n * self.rate)
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    Enqueue records with their message merged; layout and timestamps are
+    left to the listener. A record that finds the queue full is dropped.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(level=record.levelname)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments may change after the call returns, so they are merged now
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _LogListener(QueueListener):
+    """A ``QueueListener`` whose stop waits for room in a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def set_sampling(name: str, rate: Optional[float], max_level: int = logging.INFO) -> None:
+    """Sample a logger's records at ``rate`` (None or 1 keeps them all)."""
+    logger = logging.getLogger(name)
+    for existing in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+        logger.removeFilter(existing)
+    if rate is not None and rate < 1:
+        logger.addFilter(SamplingFilter(rate, max_level))
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse ``'app.db=0.1,app.classifier=0.5'`` into logger rates."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
 
 def setup_logging():
-    """Initialize logging configuration."""
+    """
+    Initialize logging configuration.
+
+    Entry points call this explicitly (it is not run on import); repeated
+    calls do nothing. The listener is stopped, flushing queued records, at
+    exit or by ``stop_logging``.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
     # Create logs directory if it doesn't exist
     log_dir = Path(LOG_FILE).parent
     log_dir.mkdir(exist_ok=True)
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL),
-        format=LOG_FORMAT,
-        handlers=[
-            logging.FileHandler(LOG_FILE),
-            logging.StreamHandler()
-        ]
-    )
+
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(JsonFormatter() if LOG_STRUCTURED else logging.Formatter(LOG_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = _LogListener(records, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = _AsyncQueueHandler(records)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, LOG_LEVEL))
+    root.addHandler(_queue_handler)
+    logging.getLogger(PAGE_LOGGER).setLevel(getattr(logging, LOG_PAGE_LEVEL))
+    for name, rate in parse_sampling(LOG_SAMPLING).items():
+        set_sampling(name, rate)
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out queued records and detach the queue from the root logger."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = _queue_handler = None
+
 
 def get_logger(name):
     """Get a logger instance for a module."""
@@ -1,29 +1,42 @@
 import sys
 from pathlib import Path
 
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document
-from app.extractors.invoice_extractor import extract_invoice_fields
-from app.extractors.po_extractor import extract_po_fields
-from app.db import init_db, insert_document, insert_invoice, insert_purchase_order
+from app.pipeline import analyze_document
+from app.db import (
+    init_db,
+    insert_document,
+    insert_fields,
+    insert_telemetry,
+    insert_invoice,
+    insert_purchase_order,
+)
 
 
 def process_file(file_path: str) -> None:
-    text = extract_text_from_file(file_path)
-    doc_type = classify_document(text)
-
-    document_id = insert_document(file_path=file_path, document_type=doc_type, text=text)
+    result = analyze_document(file_path)
+    doc_type = result["document_type"]
+    fields = result["fields"]
+
+    document_id = insert_document(
+        file_path=file_path,
+        document_type=doc_type,
+        text=result["text"],
+        file_hash=result["file_hash"],
+    )
+    insert_fields(document_id, doc_type, fields)
+    insert_telemetry(document_id, result["telemetry"])
 
     if doc_type == "invoice":
-        fields = extract_invoice_fields(text)
         insert_invoice(document_id, fields)
         print(f"Processed invoice: {fields}")
 
     elif doc_type == "purchase_order":
-        fields = extract_po_fields(text)
         insert_purchase_order(document_id, fields)
         print(f"Processed purchase order: {fields}")
 
+    elif fields:
+        print(f"Processed {doc_type}: {fields}")
+
     else:
         print(f"Unsupported or unknown document type for file: {file_path}")
 
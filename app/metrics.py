@@ -0,0 +1,259 @@
+"""
+In-process metrics for AutoDoc Classifier.
+
+Counters and latency histograms live in a process-wide registry and are
+rendered in the Prometheus text exposition format. Histograms use fixed
+buckets, so memory stays constant however many observations are made, and
+p50/p95/p99 are estimated from the buckets the same way Prometheus'
+``histogram_quantile`` does.
+"""
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans cache hits (sub-millisecond) through OCR of long scans
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Metric:
+    """Base for a metric family with optional labels."""
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.extend(extra.items())
+        if not pairs:
+            return ''
+        body = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return '{' + body + '}'
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in items]
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed upper bounds."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = _bucket_index(self.bounds, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = _HistogramValue(len(self.bounds))
+            entry.buckets[index] += 1
+            entry.sum += value
+            entry.count += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate the ``q`` quantile, or None when nothing was observed."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            if entry is None or not entry.count:
+                return None
+            return self._estimate(entry, q)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and p50/p95/p99 for every label combination."""
+        result = {}
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                name = ','.join(key) or self.name
+                stats = {
+                    'count': entry.count,
+                    'sum': entry.sum,
+                    'mean': entry.sum / entry.count if entry.count else 0.0,
+                }
+                for q in QUANTILES:
+                    stats[f"p{int(q * 100)}"] = self._estimate(entry, q)
+                result[name] = stats
+        return result
+
+    def _estimate(self, entry: _HistogramValue, q: float) -> float:
+        # Linear interpolation inside the bucket holding the rank
+        rank = q * entry.count
+        cumulative = 0
+        for index, count in enumerate(entry.buckets):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                if math.isinf(upper):
+                    # Nothing better than the largest finite bound
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-2]
+
+    def _render_samples(self, items) -> List[str]:
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.bounds, entry.buckets):
+                cumulative += count
+                le = '+Inf' if math.isinf(bound) else _number(bound)
+                lines.append(
+                    f"{self.name}_bucket{self._format_labels(key, {'le': le})} {cumulative}"
+                )
+            labels = self._format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_number(entry.sum)}")
+            lines.append(f"{self.name}_count{labels} {entry.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def get(self, name) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop all recorded values, keeping the registered metrics."""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.clear()
+
+
+def _bucket_index(bounds, value) -> int:
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds) - 1
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'autodoc_stage_duration_seconds',
+    'Time spent in each processing stage.',
+    labelnames=('stage',),
+)
+STAGE_TOTAL = REGISTRY.counter(
+    'autodoc_stage_total',
+    'Processing stage runs by outcome.',
+    labelnames=('stage', 'outcome'),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'autodoc_http_request_duration_seconds',
+    'HTTP request latency by endpoint.',
+    labelnames=('endpoint',),
+)
+HTTP_REQUESTS_TOTAL = REGISTRY.counter(
+    'autodoc_http_requests_total',
+    'HTTP requests by endpoint and status code.',
+    labelnames=('endpoint', 'status'),
+)
+ADMISSION_TOTAL = REGISTRY.counter(
+    'autodoc_admission_total',
+    'Classify requests by processing lane and admission outcome.',
+    labelnames=('lane', 'outcome'),
+)
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'autodoc_log_records_dropped_total',
+    'Log records dropped because the logging queue was full.',
+    labelnames=('level',),
+)
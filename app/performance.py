@@ -1,25 +1,43 @@
 """
 Performance monitoring and profiling utilities.
+
+Durations are measured with ``time.perf_counter`` (monotonic, so wall-clock
+adjustments cannot produce negative or skewed timings). ``PerformanceMonitor``
+also records every run in the stage latency histogram of ``app.metrics`` and,
+inside a sampled trace, as a span.
 """
-import time
+import contextvars
 import functools
+import os
+import random
+import resource
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import TRACE_SAMPLE_RATE, TRACE_STORE_SIZE
 from app.logger import get_logger
+from app.metrics import STAGE_SECONDS, STAGE_TOTAL
 
 logger = get_logger(__name__)
 
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
 
 def timer(func):
     """Decorator to measure function execution time."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_time = time.perf_counter()
         result = func(*args, **kwargs)
-        end_time = time.time()
-        duration = end_time - start_time
-        
-        logger.info(f"{func.__name__} took {duration:.4f} seconds")
+        duration = time.perf_counter() - start_time
+
+        logger.info("%s took %.4f seconds", func.__name__, duration)
         return result
-    
+
     return wrapper
 
 
@@ -28,42 +46,336 @@ def log_performance(operation_name):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            result = func(*args, **kwargs)
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            logger.info(f"{operation_name} completed in {duration:.4f}s")
-            return result
+            with PerformanceMonitor(operation_name):
+                return func(*args, **kwargs)
         return wrapper
     return decorator
 
 
+def process_rss_kb() -> int:
+    """
+    Current resident set size of this process in KB.
+
+    Reads ``/proc/self/statm`` where available; elsewhere falls back to the
+    peak RSS reported by ``getrusage``.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
 class PerformanceMonitor:
-    """Context manager for monitoring performance."""
-    
-    def __init__(self, operation_name):
+    """
+    Context manager for monitoring performance.
+
+    The duration is logged and observed in the stage latency histogram under
+    ``stage`` (default: the operation name), and the run is counted as a
+    success or an error. Within a sampled trace the run is also a span named
+    after the stage.
+    """
+
+    def __init__(self, operation_name, stage=None):
         self.operation_name = operation_name
+        self.stage = stage or operation_name
         self.start_time = None
         self.end_time = None
-    
+        self._span = span(self.stage, operation=operation_name)
+
     def __enter__(self):
-        self.start_time = time.time()
-        logger.debug(f"Starting {self.operation_name}")
+        self._span.__enter__()
+        self.start_time = time.perf_counter()
+        logger.debug("Starting %s", self.operation_name)
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.end_time = time.time()
+        self.end_time = time.perf_counter()
         duration = self.end_time - self.start_time
-        
+        self._span.__exit__(exc_type, exc_val, exc_tb)
+
+        STAGE_SECONDS.observe(duration, stage=self.stage)
         if exc_type:
-            logger.error(f"{self.operation_name} failed after {duration:.4f}s")
+            STAGE_TOTAL.inc(stage=self.stage, outcome='error')
+            logger.error("%s failed after %.4fs", self.operation_name, duration,
+                         extra={'stage': self.stage, 'duration_s': duration})
         else:
-            logger.info(f"{self.operation_name} completed in {duration:.4f}s")
-    
+            STAGE_TOTAL.inc(stage=self.stage, outcome='success')
+            logger.info("%s completed in %.4fs", self.operation_name, duration,
+                        extra={'stage': self.stage, 'duration_s': duration})
+
     @property
     def duration(self):
         """Get duration in seconds."""
-        if self.start_time and self.end_time:
+        if self.start_time is not None and self.end_time is not None:
             return self.end_time - self.start_time
         return None
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+#
+# A trace is the tree of spans for one unit of work (an upload, a CLI run).
+# The active span lives in a context variable, so nested ``span()`` blocks
+# attach to their parent without passing it around, and each thread or
+# asyncio task sees its own. Only a sampled fraction of traces record spans;
+# for the rest ``span()`` costs one context variable lookup.
+# ---------------------------------------------------------------------------
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('autodoc_span', default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'end',
+                 'thread_id', 'attributes', 'error')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None, start=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.thread_id = threading.get_ident()
+        self.attributes = attributes or {}
+        self.error = None
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        """Attach attributes to the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+
+class Trace:
+    """All spans recorded for one trace ID."""
+
+    def __init__(self, name, trace_id=None, sampled=True):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+
+    @property
+    def duration(self):
+        return self.root.duration if self.root else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'duration_ms': _ms(self.duration),
+            'spans': len(self.spans),
+            'error': self.root.error if self.root else None,
+        }
+
+
+class TraceStore:
+    """Bounded, thread-safe store of the most recently completed traces."""
+
+    def __init__(self, max_traces=TRACE_STORE_SIZE):
+        self._traces = OrderedDict()
+        self._max_traces = max_traces
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self._max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self, limit: Optional[int] = None) -> List[Trace]:
+        """Completed traces, newest first."""
+        with self._lock:
+            traces = list(reversed(self._traces.values()))
+        return traces[:limit] if limit else traces
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+TRACE_STORE = TraceStore()
+
+
+class start_trace:
+    """
+    Context manager opening the root span of a new trace.
+
+    The trace is sampled with probability ``TRACE_SAMPLE_RATE`` unless
+    ``sampled`` forces a decision. Sampled traces are kept in
+    ``TRACE_STORE`` when the root span ends. The ``Trace`` is returned
+    either way, so its ID can be reported to the caller.
+    """
+
+    def __init__(self, name, sampled=None, trace_id=None, **attributes):
+        if sampled is None:
+            sampled = random.random() < TRACE_SAMPLE_RATE
+        self.trace = Trace(name, trace_id=trace_id, sampled=sampled)
+        self.attributes = attributes
+        self._token = None
+
+    def __enter__(self) -> Trace:
+        if self.trace.sampled:
+            self.trace.root = Span(self.trace, self.trace.name, attributes=self.attributes)
+            self._token = _current_span.set(self.trace.root)
+        return self.trace
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._token is None:
+            return False
+        _finish(self.trace.root, exc_type)
+        _current_span.reset(self._token)
+        TRACE_STORE.add(self.trace)
+        return False
+
+
+class span:
+    """
+    Context manager timing a child of the active span.
+
+    Does nothing (and returns None) when no sampled trace is active.
+    """
+
+    __slots__ = ('name', 'attributes', '_span', '_token')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._span = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        self._span = Span(parent.trace, self.name, parent.span_id, self.attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._span is not None:
+            _finish(self._span, exc_type)
+            _current_span.reset(self._token)
+            self._span = None
+        return False
+
+
+def traced(name=None):
+    """Decorator running the function inside a span (default: its qualified name)."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(span_: Span, exc_type):
+    span_.end = time.perf_counter()
+    if exc_type is not None:
+        span_.error = exc_type.__name__
+
+
+def current_span() -> Optional[Span]:
+    """The active span, or None outside a sampled trace."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """ID of the active sampled trace, if any."""
+    active = _current_span.get()
+    return active.trace.trace_id if active else None
+
+
+def record_span(parent: Optional[Span], name, start, end, **attributes) -> Optional[Span]:
+    """
+    Add an already-timed span under ``parent``.
+
+    For work done on behalf of a trace by code that cannot run inside its
+    context, such as one group commit serving several requests.
+    """
+    if parent is None:
+        return None
+    recorded = Span(parent.trace, name, parent.span_id, attributes, start=start)
+    recorded.end = end
+    return recorded
+
+
+def in_current_context(func):
+    """
+    Bind ``func`` to a copy of the caller's context.
+
+    Wrap each task handed to a thread pool, e.g.
+    ``executor.submit(in_current_context(work), arg)``, so spans opened
+    by the worker join the submitting request's trace.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def to_chrome_trace(traces) -> Dict[str, Any]:
+    """
+    Convert traces to the Chrome trace-event format.
+
+    Load the JSON in ``chrome://tracing`` or https://ui.perfetto.dev. Every
+    span becomes a complete ("X") event; the trace is used as the process
+    so that concurrent traces appear as separate rows.
+    """
+    events = []
+    for pid, trace in enumerate(traces, start=1):
+        events.append({
+            'name': 'process_name', 'ph': 'M', 'pid': pid,
+            'args': {'name': f"{trace.name} {trace.trace_id[:8]}"},
+        })
+        for recorded in list(trace.spans):
+            if recorded.end is None:
+                continue
+            args = dict(recorded.attributes)
+            args.update(trace_id=trace.trace_id, span_id=recorded.span_id)
+            if recorded.parent_id:
+                args['parent_id'] = recorded.parent_id
+            if recorded.error:
+                args['error'] = recorded.error
+            events.append({
+                'name': recorded.name,
+                'cat': trace.name,
+                'ph': 'X',
+                'ts': recorded.start * 1e6,
+                'dur': recorded.duration * 1e6,
+                'pid': pid,
+                'tid': recorded.thread_id,
+                'args': {key: _jsonable(value) for key, value in args.items()},
+            })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
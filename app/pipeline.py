@@ -0,0 +1,198 @@
+"""
+Document processing pipeline for AutoDoc Classifier.
+
+Runs text extraction, classification and field extraction for a file. Each
+stage's result is cached in a two-tier (memory + disk) cache keyed by the
+file's SHA-256 and the versions of the stages it depends on, so a repeated
+document skips the work, and bumping one stage's version recomputes that
+stage (and whatever consumes its output) while earlier stages stay cached.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.cache import LRUCache, TieredCache, make_cache_key
+from app.classifier import (
+    CLASSIFIER_VERSION,
+    classify_document,
+    get_classification_confidence,
+)
+from app.config import (
+    PIPELINE_CACHE_ENABLED,
+    PIPELINE_CACHE_MEMORY_ENTRIES,
+    PIPELINE_CACHE_MEMORY_BYTES,
+)
+from app.extractors import EXTRACTORS_VERSION, extract_fields
+from app.ingestion import EXTRACTION_VERSION, extract_text_from_file
+from app.logger import get_logger
+from app.performance import PerformanceMonitor, process_rss_kb, span
+from app.utils import calculate_file_hash
+
+logger = get_logger(__name__)
+
+STAGES = ('text', 'classification', 'fields')
+
+STAGE_VERSIONS = {
+    'text': EXTRACTION_VERSION,
+    'classification': CLASSIFIER_VERSION,
+    'fields': EXTRACTORS_VERSION,
+}
+
+_stage_caches = None
+_stage_caches_lock = threading.Lock()
+
+
+def get_stage_caches() -> Dict[str, TieredCache]:
+    """Get the per-stage caches, creating them on first use."""
+    global _stage_caches
+    with _stage_caches_lock:
+        if _stage_caches is None:
+            _stage_caches = {
+                stage: TieredCache(
+                    f"pipeline-{stage}",
+                    STAGE_VERSIONS[stage],
+                    memory=LRUCache(
+                        max_size=PIPELINE_CACHE_MEMORY_ENTRIES,
+                        max_bytes=PIPELINE_CACHE_MEMORY_BYTES,
+                    ),
+                )
+                for stage in STAGES
+            }
+        return _stage_caches
+
+
+def _stage_key(stage: str, file_hash: str) -> str:
+    # A stage's key covers the versions of every stage feeding it; its own
+    # version is the cache namespace version
+    upstream = [STAGE_VERSIONS[name] for name in STAGES[:STAGES.index(stage)]]
+    return make_cache_key(file_hash, upstream)
+
+
+def _cached(stage: str, file_hash: str, compute, cache_hits: Dict[str, bool],
+            keep=lambda value: True):
+    """Get a stage's result from its cache, computing it on a miss (and caching it if ``keep``)."""
+    if not PIPELINE_CACHE_ENABLED:
+        cache_hits[stage] = False
+        return compute()
+
+    cache = get_stage_caches()[stage]
+    key = _stage_key(stage, file_hash)
+    with span(f"cache.{stage}") as lookup:
+        value = cache.get(key)
+        if lookup is not None:
+            lookup.set(hit=value is not None)
+    cache_hits[stage] = value is not None
+    if value is None:
+        value = compute()
+        if keep(value):
+            cache.set(key, value)
+    return value
+
+
+def analyze_document(
+    file_path: str,
+    file_hash: Optional[str] = None,
+    defer_ocr: bool = False,
+) -> Dict[str, Any]:
+    """
+    Extract text, classify and extract fields for a document file.
+
+    Returns the file hash, text, document type, confidence, extracted fields,
+    per stage whether the result came from the cache, and the ``telemetry``
+    to store with the document (see ``db.TELEMETRY_COLUMNS``).
+
+    With ``defer_ocr`` a document that needs OCR is classified without it
+    and ``ocr_pending`` is set in the result; those partial results are not
+    cached, so the later OCR pass computes every stage afresh. Nor are the
+    results of a run that needed OCR while tesseract was not installed.
+    """
+    start = time.perf_counter()
+    if file_hash is None:
+        file_hash = calculate_file_hash(file_path)
+    cache_hits: Dict[str, bool] = {}
+    extraction_stats: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+
+    def extract():
+        with PerformanceMonitor(f"Text extraction of {file_path}", stage='extraction'):
+            text = extract_text_from_file(file_path, stats=extraction_stats, defer_ocr=defer_ocr)
+        return {
+            'text': text,
+            'page_count': extraction_stats['page_count'],
+            'ocr_used': extraction_stats['ocr_used'],
+            'ocr_deferred': extraction_stats['ocr_deferred'],
+            'ocr_unavailable': extraction_stats['ocr_unavailable'],
+        }
+
+    extraction = _timed('extraction_ms', timings, _cached, 'text', file_hash, extract, cache_hits,
+                        _complete_extraction)
+    text = extraction['text']
+    ocr_pending = extraction.get('ocr_deferred', False)
+    complete = _complete_extraction(extraction)
+
+    def keep(value):
+        # Results built on text without its OCR are not the document's real ones
+        return complete
+
+    def classify():
+        with PerformanceMonitor(f"Classification of {file_path}", stage='classification'):
+            doc_type = classify_document(text)
+            return {
+                'document_type': doc_type,
+                'confidence': get_classification_confidence(text, doc_type),
+            }
+
+    classification = _timed('classification_ms', timings, _cached, 'classification', file_hash,
+                            classify, cache_hits, keep)
+    doc_type = classification['document_type']
+
+    def fields_of():
+        with PerformanceMonitor(f"Field extraction of {file_path}", stage='field_extraction'):
+            return extract_fields(doc_type, text)
+
+    fields = _timed('field_extraction_ms', timings, _cached, 'fields', file_hash, fields_of,
+                    cache_hits, keep)
+
+    if all(cache_hits.values()):
+        logger.info("All pipeline stages served from cache for %s", file_path)
+
+    telemetry = dict(
+        timings,
+        file_bytes=os.path.getsize(file_path),
+        page_count=extraction['page_count'],
+        ocr_used=extraction['ocr_used'],
+        ocr_ms=extraction_stats.get('ocr_ms', 0.0),
+        peak_rss_kb=max(extraction_stats.get('peak_rss_kb', 0), process_rss_kb()),
+        cache_hits=dict(cache_hits),
+        total_ms=(time.perf_counter() - start) * 1000,
+    )
+
+    return {
+        'file_hash': file_hash,
+        'text': text,
+        'document_type': doc_type,
+        'confidence': classification['confidence'],
+        'fields': fields,
+        'cache_hits': cache_hits,
+        'ocr_pending': ocr_pending,
+        'telemetry': telemetry,
+    }
+
+
+def _complete_extraction(extraction: Dict[str, Any]) -> bool:
+    # OCR deferred under load, or skipped because tesseract is not installed
+    return not (extraction.get('ocr_deferred') or extraction.get('ocr_unavailable'))
+
+
+def _timed(name: str, timings: Dict[str, float], func, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get hit counts and hit rate for each stage cache."""
+    return {stage: cache.stats() for stage, cache in get_stage_caches().items()}
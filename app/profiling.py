@@ -0,0 +1,305 @@
+"""
+On-demand CPU and memory profiling for AutoDoc Classifier.
+
+Three modes are supported:
+
+- ``sample``: a background thread samples the profiled thread's stack every
+  few milliseconds and reports collapsed stacks (``a;b;c count`` lines), the
+  input format of flamegraph.pl and speedscope. Overhead is low and does
+  not depend on how many Python calls the code makes.
+- ``cprofile``: deterministic profiling with ``cProfile``; reports the
+  functions with the highest cumulative time.
+- ``memory``: ``tracemalloc`` snapshots of the allocation sites holding the
+  most memory near the traced peak and when the work finishes. Only
+  allocations made through Python's allocator are seen; buffers a C
+  library allocates itself show up in ``rss_peak_kb`` only.
+
+Profiling is serialized: one profile runs at a time per process.
+"""
+import cProfile
+import io
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_MEMORY_FRAMES,
+    PROFILE_TOP_N,
+    PROFILE_REPORTS_KEPT,
+)
+from app.exceptions import ValidationError
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_MODES = ('sample', 'cprofile', 'memory')
+
+_profile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Periodically sample one thread's Python stack."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, most frequent first."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_call(mode: str, func: Callable, *args, **kwargs) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run ``func(*args, **kwargs)`` under the profiler for ``mode``.
+
+    Returns the function's result and the profile report. Exceptions from
+    ``func`` propagate after the profiler is stopped.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValidationError(f"Unknown profile mode {mode!r}. Allowed: {list(PROFILE_MODES)}")
+
+    with _profile_lock:
+        report: Dict[str, Any] = {'mode': mode}
+        start = time.perf_counter()
+        if mode == 'sample':
+            sampler = StackSampler().start()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                sampler.stop()
+                report['samples'] = sampler.samples
+                report['interval'] = sampler.interval
+                report['collapsed'] = sampler.collapsed()
+        elif mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(func, *args, **kwargs)
+            finally:
+                report['stats'] = _format_stats(profiler)
+        else:
+            result = _trace_memory(func, args, kwargs, report)
+        report['seconds'] = time.perf_counter() - start
+    return result, report
+
+
+def _format_stats(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+    return out.getvalue()
+
+
+class _PeakWatcher:
+    """
+    Snapshot traced memory near its peak.
+
+    A snapshot taken when the work ends only shows what is still allocated;
+    buffers freed before then (page renders, intermediate strings) would be
+    missed. The watcher polls the traced size and takes a new snapshot each
+    time it grows past the previous one by ``growth``.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, growth: float = 1.1):
+        self.interval = interval
+        self.growth = growth
+        self.snapshot = None
+        self.snapshot_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='memory-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_bytes * self.growth:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_bytes = current
+
+
+def _trace_memory(func, args, kwargs, report) -> Any:
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(PROFILE_MEMORY_FRAMES)
+    tracemalloc.reset_peak()
+    watcher = _PeakWatcher().start()
+    try:
+        result = func(*args, **kwargs)
+        final = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        watcher.stop()
+        if started_here:
+            tracemalloc.stop()
+
+    report['traced_current_bytes'] = current
+    report['traced_peak_bytes'] = peak
+    report['rss_peak_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report['top'] = _top_sites(final)
+    if watcher.snapshot is not None:
+        report['peak_snapshot_bytes'] = watcher.snapshot_bytes
+        report['top_at_peak'] = _top_sites(watcher.snapshot)
+    return result
+
+
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    # Modules imported lazily during the run are not the document's cost
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+
+def _top_sites(snapshot) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces(_MEMORY_FILTERS)
+    return [
+        {
+            'site': str(stat.traceback[0]),
+            'bytes': stat.size,
+            'blocks': stat.count,
+            'traceback': stat.traceback.format()[-6:],
+        }
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]
+    ]
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a profile report as plain text."""
+    if report['mode'] == 'sample':
+        return report['collapsed']
+    if report['mode'] == 'cprofile':
+        return report['stats']
+
+    lines = [
+        f"traced peak: {report['traced_peak_bytes']:,} bytes, "
+        f"still allocated: {report['traced_current_bytes']:,} bytes, "
+        f"process peak RSS: {report['rss_peak_kb']:,} KB",
+    ]
+    sections = [('Allocated at end', report['top'])]
+    if 'top_at_peak' in report:
+        sections.insert(0, (f"Allocated near peak ({report['peak_snapshot_bytes']:,} bytes)",
+                            report['top_at_peak']))
+    for title, entries in sections:
+        lines.extend(['', f"{title}:"])
+        for entry in entries:
+            lines.append(f"{entry['bytes']:>14,} B {entry['blocks']:>8} blocks  {entry['site']}")
+    return '\n'.join(lines) + '\n'
+
+
+def profile_file(file_path: str, mode: str = 'sample') -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Profile text extraction, classification and field extraction of a file.
+
+    The pipeline cache is bypassed so the work is actually done. Returns the
+    analysis (document type and fields) and the profile report.
+    """
+    from app.classifier import classify_document
+    from app.extractors import extract_fields
+    from app.ingestion import extract_text_from_file
+
+    def run():
+        text = extract_text_from_file(file_path)
+        document_type = classify_document(text)
+        return {
+            'document_type': document_type,
+            'fields': extract_fields(document_type, text),
+            'text_length': len(text),
+        }
+
+    logger.info(f"Profiling {file_path} ({mode})")
+    result, report = profile_call(mode, run)
+    report['file'] = str(file_path)
+    return result, report
+
+
+class ProfileSession:
+    """
+    Profiles the next N requests that ask for it.
+
+    ``arm`` sets the mode and the number of requests; each request calls
+    ``claim`` and, when it gets a mode, runs under ``profile_call`` and
+    hands its report to ``add``. The most recent reports are kept.
+    """
+
+    def __init__(self, keep: int = PROFILE_REPORTS_KEPT):
+        self._lock = threading.Lock()
+        self.mode = None
+        self.remaining = 0
+        self.reports: deque = deque(maxlen=keep)
+
+    def arm(self, mode: str, requests: int):
+        if mode not in PROFILE_MODES:
+            raise ValidationError(f"Unknown profile mode {mode!r}. Allowed: {list(PROFILE_MODES)}")
+        with self._lock:
+            self.mode = mode
+            self.remaining = max(int(requests), 0)
+
+    def claim(self) -> Optional[str]:
+        """Take one profiling slot; returns the mode, or None when not armed."""
+        with self._lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            return self.mode
+
+    def add(self, report: Dict[str, Any]):
+        with self._lock:
+            self.reports.append(report)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'remaining': self.remaining,
+                'reports': len(self.reports),
+            }
+
+    def recent(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.reports)
+
+
+PROFILE_SESSION = ProfileSession()
@@ -0,0 +1,74 @@
+"""
+Conditional and compressed responses for read endpoints.
+
+``cacheable`` gives a view's 200 responses a strong ETag (a hash of the
+exact bytes sent), answers a matching ``If-None-Match`` with an empty 304,
+and compresses large bodies with brotli or gzip according to
+``Accept-Encoding``. Each encoding is a different representation, so its
+ETag carries the encoding as a suffix; the ETag is decided before
+compressing, so a 304 costs a hash of the body and no compression.
+
+Brotli is used when the optional ``brotli`` package is installed.
+"""
+import functools
+import gzip
+import hashlib
+from typing import Optional
+
+from flask import Response, make_response, request
+
+from app.config import COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is offered instead
+    brotli = None
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding) -> Optional[str]:
+    """Pick the best encoding the client accepts (None for identity)."""
+    best = accept_encoding.best_match(available_encodings())
+    return best if best in available_encodings() else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output (and so the representation) deterministic
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def cacheable(view):
+    """Add ETag / If-None-Match handling and compression to a view's 200 responses."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+
+        body = response.get_data()
+        encoding = None
+        if len(body) >= COMPRESS_MIN_BYTES:
+            encoding = negotiate_encoding(request.accept_encodings)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        if encoding:
+            etag = f"{etag}-{encoding}"
+        response.vary.add('Accept-Encoding')
+
+        if request.if_none_match.contains(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            not_modified.vary.add('Accept-Encoding')
+            return not_modified
+
+        response.set_etag(etag)
+        if encoding:
+            response.set_data(compress(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+        return response
+    return wrapper
@@ -3,6 +3,7 @@ Utility functions for AutoDoc Classifier.
 """
 import hashlib
 import mimetypes
+import re
 from pathlib import Path
 from datetime import datetime
 from app.config import ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE
@@ -63,3 +64,31 @@ def truncate_text(text, max_length=100):
     if len(text) <= max_length:
         return text
     return text[:max_length-3] + '...'
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y')
+AMOUNT_PATTERN = re.compile(r'^\s*(-)?\s*[$€£]?\s*([0-9][0-9,]*(?:\.[0-9]+)?|\.[0-9]+)\s*$')
+
+
+def parse_amount(value):
+    """Parse a monetary or numeric string such as '$1,234.50' into a float."""
+    if value is None:
+        return None
+    match = AMOUNT_PATTERN.match(str(value))
+    if not match:
+        return None
+    amount = float(match.group(2).replace(',', ''))
+    return -amount if match.group(1) else amount
+
+
+def parse_date(value):
+    """Parse a date string in a common US/ISO format into 'YYYY-MM-DD'."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
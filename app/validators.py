@@ -19,8 +19,8 @@ class DocumentValidator:
     
     def is_valid(self):
         """Check if document is valid."""
-        self.validate()
-        return len(self.errors) == 0
+        self.errors = []
+        return self.validate()
     
     def add_error(self, error_msg):
         """Add validation error."""
@@ -36,12 +36,13 @@ class InvoiceValidator(DocumentValidator):
             self.add_error("Invoice text too short")
         
         # Check for required keywords
+        lower = self.text.lower()
         required_keywords = ['invoice', 'total', 'amount']
         for keyword in required_keywords:
-            if keyword.lower() not in self.text.lower():
+            if keyword not in lower:
                 self.add_error(f"Missing required keyword: {keyword}")
         
-        return self.is_valid()
+        return len(self.errors) == 0
 
 class PurchaseOrderValidator(DocumentValidator):
     """Validator for purchase order documents."""
@@ -52,13 +53,14 @@ class PurchaseOrderValidator(DocumentValidator):
             self.add_error("Purchase order text too short")
         
         # Check for required keywords
+        lower = self.text.lower()
         required_keywords = ['purchase order', 'po', 'quantity']
-        keyword_found = any(kw.lower() in self.text.lower() for kw in required_keywords)
+        keyword_found = any(kw in lower for kw in required_keywords)
         
         if not keyword_found:
             self.add_error("Missing purchase order keywords")
         
-        return self.is_valid()
+        return len(self.errors) == 0
 
 class PaystubValidator(DocumentValidator):
     """Validator for paystub documents."""
@@ -69,13 +71,14 @@ class PaystubValidator(DocumentValidator):
             self.add_error("Paystub text too short")
         
         # Check for required keywords
+        lower = self.text.lower()
         required_keywords = ['pay', 'earnings', 'deductions', 'gross']
-        keyword_count = sum(1 for kw in required_keywords if kw.lower() in self.text.lower())
+        keyword_count = sum(1 for kw in required_keywords if kw in lower)
         
         if keyword_count < 2:
             self.add_error("Insufficient paystub keywords found")
         
-        return self.is_valid()
+        return len(self.errors) == 0
 
 def get_validator(document_type):
     """Get appropriate validator for document type."""
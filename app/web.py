@@ -4,18 +4,8 @@ from typing import Dict, Any
 
 from flask import Flask, render_template_string, request
 
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document
-from app.extractors.invoice_extractor import extract_invoice_fields
-from app.extractors.po_extractor import extract_po_fields
-from app.extractors.id_extractor import (
-    extract_driver_license_fields,
-    extract_passport_fields,
-    extract_w2_fields,
-)
-from app.extractors.paystub_extractor import extract_pay_stub_fields
-from app.extractors.flood_form_extractor import extract_flood_form_fields
-from app.db import init_db, insert_document
+from app.pipeline import analyze_document
+from app.db import init_db, insert_document, insert_fields, insert_telemetry
 
 app = Flask(__name__)
 
@@ -131,30 +121,16 @@ def index():
             save_path.parent.mkdir(exist_ok=True)
             file.save(save_path)
 
-            text = extract_text_from_file(str(save_path))
+            result = analyze_document(str(save_path))
+            text = result["text"]
             print("===== DEBUG EXTRACTED TEXT (first 500 chars) from", filename)
             print(text[:500])
-            doc_type = classify_document(text)
+            doc_type = result["document_type"]
+            fields = result["fields"]
 
-            # Only store base document for now
-            insert_document(str(save_path), doc_type, text)
-
-            if doc_type == "invoice":
-                fields = extract_invoice_fields(text)
-            elif doc_type == "purchase_order":
-                fields = extract_po_fields(text)
-            elif doc_type == "driver_license":
-                fields = extract_driver_license_fields(text)
-            elif doc_type == "passport":
-                fields = extract_passport_fields(text)
-            elif doc_type == "w2":
-                fields = extract_w2_fields(text)
-            elif doc_type == "pay_stub":
-                fields = extract_pay_stub_fields(text)
-            elif doc_type == "flood_form":
-                fields = extract_flood_form_fields(text)
-            else:
-                fields = {}
+            document_id = insert_document(str(save_path), doc_type, text, result["file_hash"])
+            insert_fields(document_id, doc_type, fields)
+            insert_telemetry(document_id, result["telemetry"])
 
             idx = len(TABLE) + 1
             TABLE[idx] = {
@@ -0,0 +1,234 @@
+"""
+Single-writer group-commit queue for database writes.
+
+Request handlers hand their writes to one background thread instead of each
+opening a connection and contending for SQLite's write lock. The writer drains
+the queue in batches and commits each batch in one transaction, so the cost of
+a commit (and its fsync) is shared by every write in the batch. Callers get a
+``Future`` that resolves to the document ID once the batch is durable.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from app import db
+from app.config import (
+    WRITE_QUEUE_MAX_SIZE,
+    WRITE_QUEUE_BATCH_SIZE,
+    WRITE_QUEUE_FLUSH_INTERVAL,
+    WRITE_QUEUE_PUT_TIMEOUT,
+    WRITE_QUEUE_RESULT_TIMEOUT,
+)
+from app.exceptions import WriteQueueFullError
+from app.logger import get_logger
+from app.performance import PerformanceMonitor, current_span, record_span
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class _DocumentWrite:
+    """A pending document insert and the future waiting on it."""
+
+    __slots__ = ('file_path', 'document_type', 'text', 'fields', 'telemetry', 'file_hash',
+                 'ocr_status', 'future', 'span', 'queued_at')
+
+    def __init__(self, file_path, document_type, text, fields, telemetry=None, file_hash=None,
+                 ocr_status=None):
+        self.file_path = file_path
+        self.document_type = document_type
+        self.text = text
+        self.fields = fields
+        self.telemetry = telemetry
+        self.file_hash = file_hash
+        self.ocr_status = ocr_status
+        self.future = Future()
+        # The writer thread runs outside the caller's context; keep its span
+        # so the commit can be recorded in the caller's trace
+        self.span = current_span()
+        self.queued_at = time.perf_counter()
+
+
+class WriteQueue:
+    """
+    Bounded write-behind queue with a single writer thread.
+
+    A batch is committed when it reaches ``batch_size`` writes or when
+    ``flush_interval`` seconds have passed since its first write arrived.
+    ``submit`` blocks for up to ``put_timeout`` seconds when the queue is full
+    and then raises ``WriteQueueFullError``, pushing back on callers instead
+    of buffering without limit.
+    """
+
+    def __init__(
+        self,
+        max_size=WRITE_QUEUE_MAX_SIZE,
+        batch_size=WRITE_QUEUE_BATCH_SIZE,
+        flush_interval=WRITE_QUEUE_FLUSH_INTERVAL,
+        put_timeout=WRITE_QUEUE_PUT_TIMEOUT,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        """Start the writer thread if it is not already running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='db-writer', daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Flush pending writes and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(
+        self,
+        file_path: str,
+        document_type: str,
+        text: str,
+        fields: Optional[Dict[str, Any]] = None,
+        telemetry: Optional[Dict[str, Any]] = None,
+        file_hash: Optional[str] = None,
+        ocr_status: Optional[str] = None,
+    ) -> Future:
+        """Queue a document (with its extracted fields and telemetry) for insertion."""
+        write = _DocumentWrite(file_path, document_type, text, fields or {}, telemetry, file_hash,
+                               ocr_status)
+        try:
+            self._queue.put(write, timeout=self.put_timeout)
+        except queue.Full:
+            raise WriteQueueFullError(
+                f"Write queue is full ({self._queue.maxsize} pending writes)"
+            )
+        return write.future
+
+    def insert_document(
+        self,
+        file_path: str,
+        document_type: str,
+        text: str,
+        fields: Optional[Dict[str, Any]] = None,
+        telemetry: Optional[Dict[str, Any]] = None,
+        file_hash: Optional[str] = None,
+        ocr_status: Optional[str] = None,
+        timeout=WRITE_QUEUE_RESULT_TIMEOUT,
+    ) -> int:
+        """Queue a document and wait until its ID is durable."""
+        future = self.submit(file_path, document_type, text, fields, telemetry, file_hash,
+                             ocr_status)
+        return future.result(timeout)
+
+    @property
+    def pending(self):
+        """Number of writes waiting for the writer thread."""
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = db.get_connection()
+        try:
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """Block for the first write, then gather more until full or timed out."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, conn, batch):
+        monitor = PerformanceMonitor(f"Commit of {len(batch)} writes", stage='db_write')
+        try:
+            with monitor:
+                ids = self._write(conn, batch)
+        except Exception as e:
+            conn.rollback()
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Retry one by one so a single bad write does not fail the batch
+            logger.warning(f"Group commit of {len(batch)} writes failed, retrying singly: {str(e)}")
+            for write in batch:
+                self._commit(conn, [write])
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for write, document_id in zip(batch, ids):
+            if write.span is not None:
+                record_span(write.span, 'write_queue.wait', write.queued_at, monitor.start_time)
+                record_span(write.span, 'db_write', monitor.start_time, monitor.end_time,
+                            batch_size=len(batch))
+            write.future.set_result(document_id)
+
+    def _write(self, conn, batch):
+        ids = []
+        for write in batch:
+            ids.append(db.insert_document(
+                write.file_path, write.document_type, write.text, write.file_hash, conn=conn,
+                ocr_status=write.ocr_status,
+            ))
+        db.insert_fields_batch(
+            ((document_id, write.document_type, write.fields)
+             for write, document_id in zip(batch, ids)),
+            conn=conn,
+        )
+        db.insert_telemetry_batch(
+            ((document_id, write.telemetry) for write, document_id in zip(batch, ids)),
+            conn=conn,
+        )
+        conn.commit()
+        return ids
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    """Get the process-wide write queue, starting its writer on first use."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue().start()
+            atexit.register(_write_queue.stop)
+        return _write_queue
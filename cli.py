@@ -3,17 +3,31 @@
 Command-line interface for AutoDoc Classifier.
 """
 import argparse
+import json
 import sys
 from pathlib import Path
 
 from app.logger import setup_logging, get_logger
-from app.ingestion import extract_text_from_file
-from app.classifier import classify_document, get_classification_confidence
-from app.db import init_db, insert_document
-from app.utils import validate_file
-from app.config import DATABASE_PATH
+from app.performance import start_trace, to_chrome_trace
+from app.profiling import PROFILE_MODES, format_report, profile_file
+from app.pipeline import analyze_document
+from app.db import (
+    init_db,
+    insert_document,
+    insert_fields,
+    insert_telemetry,
+    search_documents,
+    rebuild_search_index,
+    slowest_documents,
+    telemetry_summary,
+    telemetry_regressions,
+    TELEMETRY_GROUPS,
+)
+from app.export import export_documents
+from app.utils import validate_file, parse_date
+from app.backup import backup_database, archive_old_text
+from app.config import DATABASE_PATH, DATABASE_BACKUP_DIR, SEARCH_RESULT_LIMIT
 
-setup_logging()
 logger = get_logger(__name__)
 
 
@@ -26,21 +40,26 @@ def process_document(file_path: str, verbose: bool = False):
         # Validate file
         validate_file(file_path)
         
-        # Extract text
-        text = extract_text_from_file(file_path)
-        if verbose:
-            print(f"Extracted {len(text)} characters")
-        
-        # Classify
-        doc_type = classify_document(text)
-        confidence = get_classification_confidence(text, doc_type)
+        # Extract text, classify and extract fields (cached per stage)
+        result = analyze_document(file_path)
+        text = result['text']
+        doc_type = result['document_type']
+        fields = result['fields']
         
         if verbose:
+            print(f"Extracted {len(text)} characters")
             print(f"Document Type: {doc_type}")
-            print(f"Confidence: {confidence:.2%}")
+            print(f"Confidence: {result['confidence']:.2%}")
+            for name, value in fields.items():
+                print(f"  {name}: {value}")
+            cached = [stage for stage, hit in result['cache_hits'].items() if hit]
+            if cached:
+                print(f"Cached stages: {', '.join(cached)}")
         
         # Save to database
-        doc_id = insert_document(file_path, doc_type, text)
+        doc_id = insert_document(file_path, doc_type, text, result['file_hash'])
+        insert_fields(doc_id, doc_type, fields)
+        insert_telemetry(doc_id, result['telemetry'])
         
         print(f"✓ Document processed successfully (ID: {doc_id})")
         return doc_id
@@ -51,6 +70,105 @@ def process_document(file_path: str, verbose: bool = False):
         return None
 
 
+def search(query: str, document_type: str = None, limit: int = SEARCH_RESULT_LIMIT):
+    """Search processed documents and print ranked matches."""
+    try:
+        results = search_documents(query, document_type=document_type, limit=limit)
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}")
+        print(f"✗ Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    for result in results:
+        print(f"#{result['id']} [{result['document_type']}] {result['file_path']}")
+        print(f"    {result['snippet']}")
+
+    print(f"\n{len(results)} matching documents")
+    return 0
+
+
+def export(args):
+    """Export documents to a file using the CLI filter options."""
+    try:
+        written = export_documents(
+            args.export,
+            fmt=args.format,
+            document_type=args.document_type,
+            since=args.since,
+            until=args.until,
+            include_fields=args.include_fields,
+            include_text=args.include_text,
+        )
+    except Exception as e:
+        logger.error(f"Error exporting documents: {str(e)}")
+        print(f"✗ Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    print(f"✓ Exported documents to {args.export} ({written:,} bytes)")
+    return 0
+
+
+def telemetry_report(args):
+    """Print the slowest documents, per-group cost and regressions."""
+    try:
+        since = parse_date(args.since) if args.since else None
+        until = parse_date(args.until) if args.until else None
+        slowest = slowest_documents(args.limit, args.document_type, since, until)
+        groups = telemetry_summary(args.group_by, args.document_type, since, until)
+        regressions = telemetry_regressions(args.period_days)
+    except Exception as e:
+        logger.error(f"Error building telemetry report: {str(e)}")
+        print(f"✗ Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    print(f"Slowest {len(slowest)} documents:")
+    for row in slowest:
+        ocr = 'ocr' if row['ocr_used'] else '   '
+        print(f"  {row['total_ms']:>10.1f} ms  {row['page_count'] or 0:>3} pages  {ocr}  "
+              f"#{row['id']} [{row['document_type']}] {row['file_path']}")
+
+    print(f"\nCost by {args.group_by}:")
+    print(f"  {'group':<20} {'docs':>6} {'avg ms':>10} {'max ms':>10} {'total s':>10} "
+          f"{'ocr':>5} {'pages':>6} {'cached':>7}")
+    for row in groups:
+        print(f"  {str(row['grp']):<20} {row['documents']:>6} {row['avg_ms']:>10.1f} "
+              f"{row['max_ms']:>10.1f} {row['total_ms'] / 1000:>10.1f} "
+              f"{row['ocr_rate'] or 0:>5.0%} {row['avg_pages'] or 0:>6.1f} "
+              f"{row['cache_hit_rate'] or 0:>7.0%}")
+
+    print(f"\nRegressions (last {args.period_days} days vs the {args.period_days} before):")
+    if not regressions:
+        print("  none")
+    for row in regressions:
+        print(f"  {row['document_type']:<20} {row['previous_ms']:>10.1f} ms -> "
+              f"{row['current_ms']:>10.1f} ms  ({row['ratio']:.2f}x, "
+              f"{row['current_documents']} documents)")
+    return 0
+
+
+def profile(args):
+    """Profile each file and print or save the reports."""
+    reports = []
+    for file_path in args.files:
+        try:
+            result, report = profile_file(file_path, args.profile)
+        except Exception as e:
+            print(f"✗ Profiling {file_path} failed: {str(e)}", file=sys.stderr)
+            return 1
+        print(f"✓ {file_path}: {result['document_type']} in {report['seconds']:.3f}s",
+              file=sys.stderr)
+        reports.append(format_report(report))
+    
+    output = ''.join(reports)
+    if args.profile_output:
+        with open(args.profile_output, 'w') as f:
+            f.write(output)
+        print(f"✓ Profile written to {args.profile_output}", file=sys.stderr)
+    else:
+        print(output, end='')
+    return 0
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -59,7 +177,7 @@ def main():
     
     parser.add_argument(
         'files',
-        nargs='+',
+        nargs='*',
         help='Document files to process'
     )
     
@@ -80,23 +198,184 @@ def main():
         help='Database path (default: documents.db)'
     )
     
+    parser.add_argument(
+        '--search',
+        metavar='QUERY',
+        help='Full-text search over processed documents'
+    )
+    
+    parser.add_argument(
+        '--type',
+        dest='document_type',
+        help='Restrict search or export results to a document type'
+    )
+    
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=SEARCH_RESULT_LIMIT,
+        help=f'Maximum number of search results or slowest documents '
+             f'(default: {SEARCH_RESULT_LIMIT})'
+    )
+    
+    parser.add_argument(
+        '--export',
+        metavar='PATH',
+        help='Export documents to a .csv, .jsonl or .parquet file'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'jsonl', 'parquet'],
+        help='Export format (default: from the file extension)'
+    )
+    
+    parser.add_argument(
+        '--since',
+        help='Export or report documents created on or after this date'
+    )
+    
+    parser.add_argument(
+        '--until',
+        help='Export or report documents created on or before this date'
+    )
+    
+    parser.add_argument(
+        '--include-fields',
+        action='store_true',
+        help='Include extracted fields in the export'
+    )
+    
+    parser.add_argument(
+        '--include-text',
+        action='store_true',
+        help='Include extracted text in the export'
+    )
+    
+    parser.add_argument(
+        '--backup',
+        nargs='?',
+        const=str(DATABASE_BACKUP_DIR),
+        metavar='DIR',
+        help=f'Take an online backup of the database (default dir: {DATABASE_BACKUP_DIR})'
+    )
+    
+    parser.add_argument(
+        '--archive-older-than',
+        type=int,
+        metavar='DAYS',
+        help='Move extracted text of documents older than DAYS to compressed '
+             'archives and reclaim the space'
+    )
+    
+    parser.add_argument(
+        '--rebuild-index',
+        action='store_true',
+        help='Rebuild the full-text search index'
+    )
+    
+    parser.add_argument(
+        '--telemetry-report',
+        action='store_true',
+        help='Report the slowest documents, cost per type or period, and regressions'
+    )
+    
+    parser.add_argument(
+        '--group-by',
+        choices=sorted(TELEMETRY_GROUPS),
+        default='type',
+        help='Group the telemetry report by document type or period (default: type)'
+    )
+    
+    parser.add_argument(
+        '--period-days',
+        type=int,
+        default=7,
+        help='Compare the last N days with the N days before for regressions (default: 7)'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='Trace every file and write the spans as Chrome trace JSON to FILE'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        help='Profile extraction of each file (bypassing the cache) instead of storing it: '
+             'sample (collapsed stacks), cprofile or memory (top allocation sites)'
+    )
+    
+    parser.add_argument(
+        '--profile-output',
+        metavar='FILE',
+        help='Write profile reports to FILE instead of stdout'
+    )
+    
     args = parser.parse_args()
     
+    maintenance = args.backup or args.archive_older_than is not None
+    if not (args.files or args.init_db or args.search or args.rebuild_index or args.export
+            or args.telemetry_report or maintenance):
+        parser.error('no files to process')
+    
+    setup_logging()
+    
     # Initialize database
     if args.init_db:
         init_db()
         if args.verbose:
             print(f"Database initialized at: {DATABASE_PATH}")
     
+    if args.backup:
+        report = backup_database(args.backup)
+        print(f"✓ Backup written to {report['path']} "
+              f"({report['bytes']:,} bytes in {report['seconds']:.2f}s)")
+    
+    if args.archive_older_than is not None:
+        report = archive_old_text(args.archive_older_than)
+        print(f"✓ Archived text of {report['documents']} documents "
+              f"({report['text_bytes']:,} bytes -> {report['archive_bytes']:,} bytes compressed), "
+              f"reclaimed {report['reclaimed_bytes']:,} bytes in {report['seconds']:.2f}s")
+    
+    if args.rebuild_index:
+        count = rebuild_search_index()
+        print(f"✓ Search index rebuilt ({count} documents)")
+    
+    if args.search:
+        return search(args.search, args.document_type, args.limit)
+    
+    if args.export:
+        return export(args)
+    
+    if args.telemetry_report:
+        return telemetry_report(args)
+    
+    if not args.files:
+        return 0
+    
+    if args.profile:
+        return profile(args)
+    
     # Process each file
     success_count = 0
+    traces = []
     for file_path in args.files:
         if not Path(file_path).exists():
             print(f"✗ File not found: {file_path}", file=sys.stderr)
             continue
         
-        if process_document(file_path, args.verbose):
-            success_count += 1
+        with start_trace('process_document', sampled=bool(args.trace), file=file_path) as trace:
+            if process_document(file_path, args.verbose):
+                success_count += 1
+        if trace.sampled:
+            traces.append(trace)
+    
+    if args.trace:
+        with open(args.trace, 'w') as f:
+            json.dump(to_chrome_trace(traces), f)
+        print(f"✓ Trace of {len(traces)} documents written to {args.trace}")
     
     # Summary
     total = len(args.files)
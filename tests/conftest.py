@@ -0,0 +1,69 @@
+"""
+Shared fixtures for AutoDoc Classifier tests.
+"""
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the database module at a fresh, initialized database."""
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    db.init_db()
+    return db
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench", action="store_true",
+                    help="Run the micro-benchmarks marked 'benchmark' (skipped otherwise)")
+    group.addoption("--bench-baseline", default=".bench/micro-baseline.json",
+                    help="Baseline JSON to compare micro-benchmarks against")
+    group.addoption("--bench-save", action="store_true",
+                    help="Save this run's micro-benchmark results as the baseline")
+    group.addoption("--bench-threshold", type=float, default=0.25,
+                    help="Fail a micro-benchmark whose median is this fraction slower "
+                         "than baseline")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench"):
+        return
+    skip = pytest.mark.skip(reason="micro-benchmark; run with --bench")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session):
+    results = getattr(session.config, "_bench_results", None)
+    if results and session.config.getoption("--bench-save"):
+        from app.bench.micro import save_baseline
+        save_baseline(session.config.getoption("--bench-baseline"), results)
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Measure a callable, record the result under the test's name and fail
+    when it is slower than the saved baseline.
+    """
+    from app.bench.micro import load_baseline, measure, regression
+
+    config = request.config
+    if not hasattr(config, "_bench_results"):
+        config._bench_results = {}
+        config._bench_baseline = load_baseline(config.getoption("--bench-baseline"))
+
+    def run(func, *args, **kwargs):
+        name = request.node.name
+        result = measure(func, *args, **kwargs)
+        config._bench_results[name] = result
+        slower = regression(result, config._bench_baseline.get(name),
+                            config.getoption("--bench-threshold"))
+        if slower and not config.getoption("--bench-save"):
+            pytest.fail(f"{name} regressed: {slower}")
+        return result
+
+    return run
@@ -0,0 +1,155 @@
+"""
+Tests for admission control and the fast/slow processing lanes.
+"""
+import io
+import threading
+import time
+
+import pytest
+
+from app import admission, api
+from app.admission import AdmissionController, Lane, estimate_cost
+from app.exceptions import AdmissionRejectedError
+
+DIGITAL_PDF = (b"%PDF-1.4\n1 0 obj << /Type /Pages /Count 1 >>\n"
+               b"2 0 obj << /Type /Page /Resources << /Font << >> >> >>\n")
+SCANNED_PDF = b"%PDF-1.4\n" + b"<< /Type /Page /Resources << /XObject << >> >> >>\n" * 3
+# Pages and fonts inside a compressed object stream, as most current tools write them
+OBJECT_STREAM_PDF = (b"%PDF-1.5\n1 0 obj\n"
+                     b"<< /Type /ObjStm /N 4 /First 24 /Filter /FlateDecode /Length 300 >>\n"
+                     b"stream\n" + bytes(range(256)) * 2 + b"\nendstream\nendobj\n")
+
+
+def test_estimate_cost(tmp_path):
+    digital = tmp_path / "invoice.pdf"
+    digital.write_bytes(DIGITAL_PDF)
+    scanned = tmp_path / "scan.pdf"
+    scanned.write_bytes(SCANNED_PDF)
+    image = tmp_path / "receipt.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    assert estimate_cost(digital)[1:] == (1, False, 1)
+    assert estimate_cost(scanned)[1:] == (3, True, 3 * admission.ADMISSION_OCR_PAGE_COST)
+    assert estimate_cost(image).ocr_likely is True
+
+
+def test_estimate_cost_of_object_stream_pdf(tmp_path):
+    """Test that fonts hidden in object streams do not make a digital PDF look scanned."""
+    path = tmp_path / "report.pdf"
+    path.write_bytes(OBJECT_STREAM_PDF)
+
+    cost = estimate_cost(path)
+
+    assert (cost.pages, cost.ocr_likely, cost.units) == (1, None, 1)
+    assert AdmissionController().lane_for(cost).name == "fast"
+
+
+def test_estimate_cost_scans_in_chunks(tmp_path, monkeypatch):
+    """Test that markers split between chunks are counted once."""
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(SCANNED_PDF * 20 + DIGITAL_PDF)
+    whole = estimate_cost(path)
+    monkeypatch.setattr(admission, "_SCAN_CHUNK_BYTES", 7)
+
+    assert estimate_cost(path) == whole == (path.stat().st_size, 61, False, 61)
+
+
+def test_lanes_route_by_cost():
+    controller = AdmissionController(fast_max_cost=5)
+    assert controller.lane_for(admission.Cost(100, 1, False, 1)) is controller.fast
+    assert controller.lane_for(admission.Cost(100, 3, True, 30)) is controller.slow
+
+
+def test_saturated_lane_rejects_with_retry_after():
+    """Test that a full queue is rejected at once while the other lane stays open."""
+    lane = Lane("slow", concurrency=1, max_queue=1, queue_timeout=5)
+    controller = AdmissionController(slow=lane, fast_max_cost=5)
+    release = threading.Event()
+    running = threading.Event()
+
+    def hold():
+        with lane.slot():
+            running.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    running.wait(5)
+
+    def wait_in_queue():
+        with lane.slot():
+            pass
+
+    queued = threading.Thread(target=wait_in_queue)
+    queued.start()
+    while lane.stats()["waiting"] == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        with controller.admit(admission.Cost(0, 100, True, 1000)):
+            pass
+    assert (rejected.value.lane, rejected.value.retry_after) == ("slow", 2)
+    with controller.admit(admission.Cost(0, 1, False, 1)) as fast:
+        assert fast.name == "fast"
+
+    release.set()
+    holder.join()
+    queued.join()
+    assert lane.stats()["rejected"] == 1
+
+
+def test_queue_timeout_rejects():
+    lane = Lane("fast", concurrency=1, max_queue=5, queue_timeout=0.01)
+    with lane.slot():
+        with pytest.raises(AdmissionRejectedError):
+            with lane.slot():
+                pass
+
+
+def test_classify_returns_429(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path)
+    controller = AdmissionController(fast=Lane("fast", concurrency=1, max_queue=0))
+    monkeypatch.setattr(api, "get_admission_controller", lambda: controller)
+    client = api.app.test_client()
+
+    with controller.fast.slot():
+        response = client.post("/api/v1/classify",
+                               data={"file": (io.BytesIO(DIGITAL_PDF), "a.pdf")},
+                               content_type="multipart/form-data")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["lane"] == "fast"
+    assert list(tmp_path.glob("*a.pdf")) == []
+
+
+def test_degraded_classify_defers_ocr(temp_db, tmp_path, monkeypatch):
+    """Test that under load a scan is stored as OCR-pending and its OCR queued."""
+    from app import jobs
+    from app.write_queue import WriteQueue
+
+    def analyze(path, file_hash=None, defer_ocr=False):
+        return {"file_hash": file_hash, "text": "", "document_type": "unknown", "confidence": 0.0,
+                "fields": {}, "cache_hits": {}, "ocr_pending": defer_ocr, "telemetry": {}}
+
+    write_queue = WriteQueue().start()
+    monkeypatch.setattr(api, "get_write_queue", lambda: write_queue)
+    monkeypatch.setattr(api, "analyze_document", analyze)
+    controller = AdmissionController(degraded_mode="on")
+    monkeypatch.setattr(api, "get_admission_controller", lambda: controller)
+    monkeypatch.setattr(jobs, "get_job_runner", lambda: None)
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path)
+    client = api.app.test_client()
+    try:
+        response = client.post("/api/v1/classify",
+                               data={"file": (io.BytesIO(SCANNED_PDF), "scan.pdf")},
+                               content_type="multipart/form-data")
+    finally:
+        write_queue.stop()
+
+    body = response.get_json()
+    assert (body["degraded"], body["ocr_status"]) == (True, "pending")
+    assert temp_db.get_document_by_id(body["document_id"])["ocr_status"] == "pending"
+    job = temp_db.get_job(body["ocr_job_id"])
+    assert (job["kind"], job["status"]) == ("ocr", "queued")
+    assert job["document_id"] == body["document_id"]
@@ -0,0 +1,55 @@
+"""
+Tests for online backups and text retention.
+"""
+import sqlite3
+from pathlib import Path
+from app.backup import backup_database, archive_old_text, load_archived_text
+
+
+def test_backup_copies_database(temp_db, tmp_path):
+    """Test that a backup is a complete, readable copy."""
+    temp_db.insert_document("a.pdf", "invoice", "text")
+    report = backup_database(tmp_path / "backups", pages_per_step=1, step_sleep=0)
+
+    conn = sqlite3.connect(report["path"])
+    assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 1
+    conn.close()
+    assert report["bytes"] > 0
+
+
+def test_backup_rotation(temp_db, tmp_path):
+    """Test that only the most recent backups are kept."""
+    backup_dir = tmp_path / "backups"
+    for name in ("documents-20240101-000000.db", "documents-20240102-000000.db"):
+        (backup_dir / name).parent.mkdir(exist_ok=True)
+        (backup_dir / name).write_bytes(b"")
+    report = backup_database(backup_dir, keep=2)
+    assert report["pruned"] == 1
+    assert len(list(backup_dir.glob("documents-*.db"))) == 2
+
+    # Backups in the same second get distinct names, and the oldest are pruned
+    again = backup_database(backup_dir, keep=2)
+    assert again["path"] != report["path"]
+    assert sorted(p.name for p in backup_dir.glob("documents-*.db")) == sorted(
+        [Path(report["path"]).name, Path(again["path"]).name])
+
+
+def test_archive_old_text(temp_db, tmp_path):
+    """Test that old text moves to the archive and new text stays."""
+    conn = temp_db.get_connection()
+    conn.execute(
+        "INSERT INTO documents (file_path, document_type, raw_text, created_at) "
+        "VALUES ('old.pdf', 'invoice', 'old invoice text', '2000-01-01 00:00:00')"
+    )
+    conn.commit()
+    conn.close()
+    new_id = temp_db.insert_document("new.pdf", "invoice", "new invoice text")
+
+    report = archive_old_text(30, tmp_path / "archive")
+    assert report["documents"] == 1
+    assert temp_db.get_document_by_id(1)["raw_text"] is None
+    assert load_archived_text(1) == "old invoice text"
+    assert temp_db.get_document_by_id(new_id)["raw_text"] == "new invoice text"
+    assert [r["id"] for r in temp_db.search_documents("invoice")] == [new_id]
+
+    assert archive_old_text(30, tmp_path / "archive")["documents"] == 0
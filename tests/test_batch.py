@@ -0,0 +1,126 @@
+"""
+Tests for batch classification.
+"""
+import io
+import json
+import random
+import zipfile
+
+import pytest
+
+from app import api, batch, pipeline
+from app.bench.corpus import TEMPLATES, write_text_pdf
+from app.exceptions import ValidationError
+from app.write_queue import WriteQueue
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """Run batches on an in-process thread pool."""
+    monkeypatch.setattr(batch, "BATCH_EXECUTOR", "thread")
+    monkeypatch.setattr(batch, "_pool", None)
+    yield
+    if batch._pool is not None:
+        batch._pool.shutdown()
+
+
+@pytest.fixture
+def client(temp_db, thread_pool, tmp_path, monkeypatch):
+    write_queue = WriteQueue().start()
+    monkeypatch.setattr(api, "get_write_queue", lambda: write_queue)
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path / "uploads")
+    monkeypatch.setattr(pipeline, "PIPELINE_CACHE_ENABLED", False)
+    yield api.app.test_client()
+    write_queue.stop()
+
+
+def pdf_bytes(tmp_path, document_type):
+    path = tmp_path / f"{document_type}.pdf"
+    write_text_pdf(path, TEMPLATES[document_type](random.Random(1)))
+    return path.read_bytes()
+
+
+def test_unpack_archive_ignores_member_paths(tmp_path):
+    """Test that archive members cannot be written outside the batch directory."""
+    archive_path = tmp_path / "packet.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("../../escape.pdf", b"%PDF-1.4")
+        archive.writestr("docs/a.pdf", b"%PDF-1.4")
+        archive.writestr("docs/", b"")
+    dest = tmp_path / "batch"
+    dest.mkdir()
+
+    items = batch.unpack_archive(archive_path, dest, start_index=3)
+
+    assert [name for name, _ in items] == ["../../escape.pdf", "docs/a.pdf"]
+    assert [path.name for _, path in items] == ["003-escape.pdf", "004-a.pdf"]
+    assert all(path.parent == dest for _, path in items)
+
+
+def test_unpack_archive_limits(tmp_path, monkeypatch):
+    """Test that too many members or unreadable archives are rejected."""
+    monkeypatch.setattr(batch, "BATCH_MAX_FILES", 2)
+    archive_path = tmp_path / "packet.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for n in range(3):
+            archive.writestr(f"{n}.pdf", b"%PDF-1.4")
+
+    with pytest.raises(ValidationError):
+        batch.unpack_archive(archive_path, tmp_path)
+
+    (tmp_path / "bad.tar").write_bytes(b"not an archive")
+    with pytest.raises(ValidationError):
+        batch.unpack_archive(tmp_path / "bad.tar", tmp_path)
+
+
+def test_batch_of_files_and_archive(client, tmp_path, temp_db):
+    """Test per-file results for plain uploads, archive members and invalid files."""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as packet:
+        packet.writestr("w2.pdf", pdf_bytes(tmp_path, "w2"))
+        packet.writestr("notes.txt", b"not a document")
+    archive.seek(0)
+
+    response = client.post("/api/v1/classify/batch", data={"files": [
+        (io.BytesIO(pdf_bytes(tmp_path, "invoice")), "invoice.pdf"),
+        (archive, "packet.zip"),
+    ]}, content_type="multipart/form-data")
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body["count"], body["succeeded"], body["failed"]) == (3, 2, 1)
+    results = body["results"]
+    assert [r["filename"] for r in results] == ["invoice.pdf", "w2.pdf", "notes.txt"]
+    assert results[0]["document_type"] == "invoice"
+    assert results[1]["document_type"] == "w2"
+    assert results[2]["success"] is False
+    assert temp_db.get_document_by_id(results[1]["document_id"])["document_type"] == "w2"
+    # Stored with its hash, so a later upload of the same file is found as a duplicate
+    assert temp_db.find_document_by_hash(results[1]["file_hash"])["id"] == results[1]["document_id"]
+
+
+def test_batch_streams_ndjson(client, tmp_path):
+    """Test that streamed results end with a summary line."""
+    response = client.post("/api/v1/classify/batch?stream=1", data={"files": [
+        (io.BytesIO(pdf_bytes(tmp_path, "invoice")), "a.pdf"),
+        (io.BytesIO(pdf_bytes(tmp_path, "invoice")), "a.pdf"),
+    ]}, content_type="multipart/form-data")
+
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1]
+    assert lines[-1] == {"done": True, "count": 2, "succeeded": 2, "failed": 0}
+
+
+def test_batch_requires_files(client):
+    assert client.post("/api/v1/classify/batch").status_code == 400
+
+
+def test_batch_intake_error_removes_batch_dir(client, tmp_path):
+    response = client.post("/api/v1/classify/batch", data={"files": [
+        (io.BytesIO(b"%PDF-1.4"), "a.pdf"),
+        (io.BytesIO(b"not an archive"), "packet.tar"),
+    ]}, content_type="multipart/form-data")
+
+    assert response.status_code == 400
+    assert list((tmp_path / "uploads").glob("batch-*")) == []
@@ -0,0 +1,120 @@
+"""
+Micro-benchmarks for the classifier, extractors, validators and cache.
+
+Skipped by default. Run before a release with:
+
+    pytest -m benchmark --bench -o addopts=""                 # compare with the baseline
+    pytest -m benchmark --bench --bench-save -o addopts=""    # record a new baseline
+"""
+import logging
+
+import pytest
+
+from app.bench.imports import ENTRY_POINTS, import_profile, parse_importtime
+from app.bench.micro import TEXT_SIZES, make_text, measure, regression
+from app.cache import LRUCache
+from app.classifier import classify_document, get_classification_confidence
+from app.extractors import EXTRACTORS
+from app.validators import InvoiceValidator, PaystubValidator, PurchaseOrderValidator
+
+VALIDATORS = {
+    "invoice": InvoiceValidator,
+    "purchase_order": PurchaseOrderValidator,
+    "pay_stub": PaystubValidator,
+}
+
+_texts = {}
+
+
+def text_for(document_type, size_name):
+    """Benchmark inputs are built once per session; the 5 MB ones are not cheap."""
+    key = (document_type, size_name)
+    if key not in _texts:
+        _texts[key] = make_text(document_type, TEXT_SIZES[size_name])
+    return _texts[key]
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    """Keep per-call log records out of the measurements."""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", TEXT_SIZES)
+def test_classify_document(bench, size):
+    text = text_for("purchase_order", size)
+    bench(classify_document, text)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", TEXT_SIZES)
+def test_classification_confidence(bench, size):
+    text = text_for("invoice", size)
+    bench(get_classification_confidence, text, "invoice")
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", TEXT_SIZES)
+@pytest.mark.parametrize("document_type", sorted(EXTRACTORS))
+def test_extract_fields(bench, document_type, size):
+    text = text_for(document_type, size)
+    bench(EXTRACTORS[document_type], text)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", TEXT_SIZES)
+@pytest.mark.parametrize("document_type", sorted(VALIDATORS))
+def test_validator(bench, document_type, size):
+    text = text_for(document_type, size)
+    bench(lambda: VALIDATORS[document_type](text).is_valid())
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("entries", [1_000, 100_000])
+def test_lru_cache_get_set(bench, entries):
+    cache = LRUCache(max_size=entries, max_bytes=entries * 1024, ttl=3600)
+    for key in range(entries):
+        cache.set(key, "x" * 64)
+    keys = list(range(0, entries * 2, 7))
+
+    def mixed():
+        # 90% reads (half of them misses), 10% writes with eviction
+        for n, key in enumerate(keys[:1000]):
+            if n % 10:
+                cache.get(key)
+            else:
+                cache.set(key, "y" * 64)
+
+    bench(mixed)
+
+
+def test_measure_and_regression():
+    """Test the harness itself (runs without --bench)."""
+    result = measure(sum, range(100), rounds=3, min_round_time=0.001)
+    assert result["rounds"] >= 3 and result["loops"] >= 1
+    assert 0 < result["min"] <= result["median"]
+
+    assert regression(result, None, 0.25) is None
+    assert regression(result, {"median": result["median"] * 2}, 0.25) is None
+    assert "2.00x" in regression(result, {"median": result["median"] / 2}, 0.25)
+    assert len(make_text("invoice", 10_000)) >= 10_000
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   zipfile\n"
+        "import time:      2000 |       2120 | app.pipeline\n"
+    )
+    modules = parse_importtime(stderr)
+    assert modules["app.pipeline"] == {"self_us": 2000, "cumulative_us": 2120, "depth": 0}
+    assert modules["zipfile"]["depth"] == 1
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_points_defer_heavy_imports(module):
+    """Test that cold start does not load pdfplumber, PIL, pytesseract or pandas (no --bench)."""
+    assert import_profile(module)["heavy"] == []
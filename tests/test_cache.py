@@ -0,0 +1,174 @@
+"""
+Tests for caching utilities.
+"""
+import threading
+import time
+from app.cache import LRUCache
+
+
+def test_lru_eviction_order():
+    """Test that the least recently used entry is evicted."""
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit():
+    """Test eviction by approximate size."""
+    cache = LRUCache(max_size=100, max_bytes=10)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 6
+
+    cache.set("huge", "z" * 11)
+    assert "huge" not in cache
+    assert "b" in cache
+
+
+def test_ttl_expiry():
+    """Test that entries expire after the TTL."""
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_hit_miss_counters():
+    """Test hit and miss accounting."""
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_thread_safety():
+    """Test concurrent access keeps the size bound."""
+    cache = LRUCache(max_size=50)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.set(offset + i % 100, i)
+            cache.get(offset + (i * 7) % 100)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
+
+
+def test_cache_key_is_stable(tmp_path):
+    """Test keys ignore dict order and follow file content."""
+    from app.cache import make_cache_key
+    assert make_cache_key({"a": 1, "b": 2}) == make_cache_key({"b": 2, "a": 1})
+    assert make_cache_key("1") != make_cache_key(1)
+
+    first, second = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    first.write_bytes(b"same")
+    second.write_bytes(b"same")
+    assert make_cache_key(first) == make_cache_key(second)
+
+
+def test_disk_cache_round_trip(tmp_path):
+    """Test storing values in sharded, compressed files."""
+    from app.cache import DiskCache
+    cache = DiskCache(tmp_path, compress=True)
+    cache.set("texts", "ab" * 32, {"text": "hello"})
+    assert cache.get("texts", "ab" * 32) == {"text": "hello"}
+    assert cache.get("texts", "cd" * 32) is None
+    assert (tmp_path / "texts" / "0" / "ab").is_dir()
+    assert not list(tmp_path.glob("**/.tmp-*"))
+
+
+def test_disk_cache_versions(tmp_path):
+    """Test that entries from another version are never served."""
+    from app.cache import DiskCache
+    cache = DiskCache(tmp_path)
+    cache.set_version("classifier", 1)
+    cache.set("classifier", "k" * 64, "invoice")
+
+    upgraded = DiskCache(tmp_path)
+    upgraded.set_version("classifier", 2)
+    assert upgraded.get("classifier", "k" * 64) is None
+    assert not (tmp_path / "classifier" / "1").exists()
+
+    upgraded.set("classifier", "k" * 64, "w2")
+    upgraded.invalidate("classifier")
+    assert upgraded.get("classifier", "k" * 64) is None
+
+
+def test_disk_cache_eviction(tmp_path):
+    """Test LRU eviction once the size bound is exceeded."""
+    import os
+    from app.cache import DiskCache
+    cache = DiskCache(tmp_path, max_bytes=3000, compress=False)
+    for i in range(3):
+        cache.set("blobs", f"{i:064d}", b"x" * 900)
+        path = cache._path("blobs", f"{i:064d}")
+        os.utime(path, (i, i))
+    cache.get("blobs", f"{0:064d}")
+    cache.set("blobs", f"{3:064d}", b"x" * 900)
+
+    assert cache.get("blobs", f"{1:064d}") is None
+    assert cache.get("blobs", f"{0:064d}") == b"x" * 900
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_disk_cache_tracks_size_between_scans(tmp_path, monkeypatch):
+    """Test that overwrites keep the size estimate and eviction scans are throttled."""
+    from app.cache import DiskCache
+    cache = DiskCache(tmp_path, max_bytes=3000, compress=False)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+    for _ in range(10):
+        cache.set("blobs", "0" * 64, b"x" * 900)
+    size = cache.stats()["bytes"]
+    assert size < 1000 and not scans
+
+    for i in range(1, 10):
+        cache.set("blobs", f"{i:064d}", b"x" * 900)
+    # Over budget on most of these writes, but scanned once within the interval
+    assert len(scans) == 1
+
+
+def test_disk_cache_counters_are_thread_safe(tmp_path):
+    import threading
+    from app.cache import DiskCache
+    cache = DiskCache(tmp_path)
+    threads = [threading.Thread(target=lambda: [cache.get("blobs", "0" * 64) for _ in range(500)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["misses"] == 4000
+
+
+def test_cache_result_decorator(tmp_path, monkeypatch):
+    """Test that the decorator computes once per distinct arguments."""
+    from app import cache as cache_module
+    monkeypatch.setattr(cache_module, "_disk_cache", cache_module.DiskCache(tmp_path))
+    calls = []
+
+    @cache_module.cache_result()
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert square(4) == 16
+    assert calls == [3, 4]
@@ -0,0 +1,63 @@
+"""
+Tests for streaming document export.
+"""
+import csv
+import io
+import json
+import pytest
+from app.export import export_documents, iter_export
+from app.exceptions import ExportError, ValidationError
+
+
+def _populate(db, count=5):
+    for i in range(count):
+        doc_type = "invoice" if i % 2 else "w2"
+        doc_id = db.insert_document(f"{i}.pdf", doc_type, f"text {i}")
+        db.insert_fields(doc_id, doc_type, {"number": str(i)})
+
+
+def test_csv_export_is_chunked(temp_db):
+    """Test that CSV is produced one chunk per database chunk."""
+    _populate(temp_db)
+    chunks = list(iter_export("csv", chunk_size=2, include_fields=True))
+    assert len(chunks) == 3
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert json.loads(rows[0]["fields"]) == {"number": "0"}
+
+
+def test_jsonl_export_filters(temp_db):
+    """Test type and date filters."""
+    _populate(temp_db)
+    data = b"".join(iter_export("jsonl", document_type="invoice", since="2000-01-01",
+                                until="2999-12-31", include_text=True))
+    rows = [json.loads(line) for line in data.decode().splitlines()]
+    assert [row["raw_text"] for row in rows] == ["text 1", "text 3"]
+    assert b"".join(iter_export("jsonl", until="2000-01-01")) == b""
+
+
+def test_export_to_file(temp_db, tmp_path):
+    """Test exporting to a file with the format taken from the extension."""
+    _populate(temp_db, 2)
+    path = tmp_path / "out.jsonl"
+    assert export_documents(str(path)) == path.stat().st_size
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_parquet_export(temp_db, tmp_path):
+    """Test Parquet export when pyarrow is available."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    _populate(temp_db)
+    path = tmp_path / "out.parquet"
+    export_documents(str(path), include_fields=True, chunk_size=2)
+    assert pq.ParquetFile(str(path)).num_row_groups == 3
+    assert pq.read_table(str(path)).num_rows == 5
+
+
+def test_export_rejects_bad_arguments(temp_db):
+    """Test that invalid formats and dates fail before streaming starts."""
+    with pytest.raises(ExportError):
+        iter_export("xml")
+    with pytest.raises(ValidationError):
+        iter_export("csv", since="yesterday")
@@ -0,0 +1,54 @@
+"""
+Tests for the extracted-field store.
+"""
+import pytest
+from app.extractors import extract_fields
+from app.exceptions import DatabaseError
+
+
+def _store(db, doc_type, fields):
+    doc_id = db.insert_document(f"{len(fields)}.pdf", doc_type, "text")
+    db.insert_fields(doc_id, doc_type, fields)
+    return doc_id
+
+
+def test_extract_fields_dispatch():
+    """Test extractor registry dispatch."""
+    fields = extract_fields("invoice", "Invoice Number: INV-001\nTotal Amount: $50.00")
+    assert fields["invoice_number"] == "INV-001"
+    assert extract_fields("unknown", "anything") == {}
+
+
+def test_fields_round_trip(temp_db):
+    """Test storing and reading back fields, skipping empty values."""
+    doc_id = _store(temp_db, "pay_stub", {"employer": "Acme", "net_pay": "$1,000.00", "cycle": ""})
+    assert temp_db.get_document_fields(doc_id) == {"employer": "Acme", "net_pay": "$1,000.00"}
+
+
+def test_find_by_vendor_and_date_range(temp_db):
+    """Test the 'invoices from vendor X between dates' query."""
+    jan = _store(temp_db, "invoice", {"vendor_name": "Acme", "invoice_date": "01/15/2024"})
+    _store(temp_db, "invoice", {"vendor_name": "Acme", "invoice_date": "2024-06-01"})
+    _store(temp_db, "invoice", {"vendor_name": "Globex", "invoice_date": "2024-01-20"})
+
+    results = temp_db.find_documents_by_fields(
+        "invoice",
+        equals={"vendor_name": "Acme"},
+        between={"invoice_date": ("2024-01-01", "2024-03-31")},
+    )
+    assert [doc["id"] for doc in results] == [jan]
+
+
+def test_find_by_amount_range(temp_db):
+    """Test open-ended numeric ranges on normalized amounts."""
+    _store(temp_db, "invoice", {"total_amount": "$99.00"})
+    large = _store(temp_db, "invoice", {"total_amount": "$1,250.00"})
+
+    results = temp_db.find_documents_by_fields("invoice", between={"total_amount": ("1000", None)})
+    assert [doc["id"] for doc in results] == [large]
+
+
+def test_find_rejects_mixed_bounds(temp_db):
+    """Test that unparseable range bounds are rejected."""
+    with pytest.raises(DatabaseError):
+        temp_db.find_documents_by_fields("invoice", between={"total_amount": ("abc", "10")})
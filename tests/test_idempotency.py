@@ -0,0 +1,103 @@
+"""
+Tests for Idempotency-Key handling.
+"""
+import io
+import threading
+import time
+
+import pytest
+
+from app import api
+from app.exceptions import IdempotencyConflictError
+from app.idempotency import IdempotencyStore
+from app.write_queue import WriteQueue
+
+
+def test_concurrent_duplicates_share_one_run():
+    """Test that duplicates wait on the in-flight request instead of running again."""
+    store = IdempotencyStore()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(store.run("k", "a", work)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(store.run("k", "a", work)))
+    second.start()
+    assert store.stats()["in_flight"] == 1
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert sorted(results, key=lambda item: item[1]) == [("result", False), ("result", True)]
+    assert store.run("k", "a", work) == ("result", True)
+    assert len(calls) == 1
+
+
+def test_conflicts_and_unkept_results():
+    store = IdempotencyStore()
+    store.run("k", "a", lambda: 200)
+    with pytest.raises(IdempotencyConflictError) as conflict:
+        store.run("k", "b", lambda: 200)
+    assert conflict.value.in_progress is False
+
+    assert store.run("retry", "a", lambda: 500, keep=lambda status: status < 500) == (500, False)
+    assert store.run("retry", "a", lambda: 200) == (200, False)
+
+
+def test_failed_run_is_not_kept():
+    store = IdempotencyStore()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        store.run("k", "a", fail)
+    assert store.run("k", "a", lambda: "ok") == ("ok", False)
+
+
+def test_classify_replays_response(temp_db, tmp_path, monkeypatch):
+    """Test that a retried upload is answered without running the pipeline again."""
+    runs = []
+
+    def analyze(path, file_hash=None, defer_ocr=False):
+        runs.append(path)
+        return {"file_hash": file_hash, "text": "INVOICE", "document_type": "invoice",
+                "confidence": 0.9, "fields": {}, "cache_hits": {}, "ocr_pending": False,
+                "telemetry": {"total_ms": 1.0}}
+
+    write_queue = WriteQueue().start()
+    monkeypatch.setattr(api, "get_write_queue", lambda: write_queue)
+    monkeypatch.setattr(api, "get_idempotency_store", lambda store=IdempotencyStore(): store)
+    monkeypatch.setattr(api, "analyze_document", analyze)
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path)
+    client = api.app.test_client()
+
+    def upload(content, key):
+        return client.post("/api/v1/classify?reprocess=1",
+                           data={"file": (io.BytesIO(content), "a.pdf")},
+                           content_type="multipart/form-data", headers={"Idempotency-Key": key})
+
+    try:
+        first = upload(b"%PDF-1.4 one", "key-1")
+        retry = upload(b"%PDF-1.4 one", "key-1")
+        other = upload(b"%PDF-1.4 two", "key-1")
+    finally:
+        write_queue.stop()
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert len(runs) == 1
+    assert other.status_code == 422
@@ -0,0 +1,98 @@
+"""
+Tests for streaming upload intake.
+"""
+import hashlib
+import io
+import random
+
+import pytest
+
+from app import api, jobs, pipeline
+from app.bench.corpus import TEMPLATES, write_text_pdf
+from app.intake import sniff_extensions
+from app.write_queue import WriteQueue
+
+
+@pytest.fixture
+def client(temp_db, tmp_path, monkeypatch):
+    write_queue = WriteQueue().start()
+    monkeypatch.setattr(api, "get_write_queue", lambda: write_queue)
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path / "uploads")
+    monkeypatch.setattr(pipeline, "PIPELINE_CACHE_ENABLED", False)
+    yield api.app.test_client()
+    write_queue.stop()
+
+
+def upload(client, content, filename, query=""):
+    return client.post(f"/api/v1/classify{query}", data={"file": (io.BytesIO(content), filename)},
+                       content_type="multipart/form-data")
+
+
+def leftovers(tmp_path):
+    uploads = (tmp_path / "uploads").iterdir()
+    return [path.name for path in uploads if path.name.startswith(".upload-")]
+
+
+def test_sniff_extensions():
+    assert sniff_extensions(b"\n%PDF-1.7\n") == {".pdf"}
+    assert sniff_extensions(b"\x89PNG\r\n\x1a\n....") == {".png"}
+    assert sniff_extensions(b"\xff\xd8\xff\xe0") == {".jpg", ".jpeg"}
+    assert sniff_extensions(b"MZ\x90\x00") == set()
+
+
+def test_rejects_while_streaming(client, tmp_path, monkeypatch):
+    """Test that bad uploads are refused and leave no temporary files behind."""
+    assert upload(client, b"hello", "notes.txt").status_code == 415
+    response = upload(client, b"MZ" + b"\x00" * 5000, "invoice.pdf")
+    assert response.status_code == 415
+    assert "not a .pdf" in response.get_json()["error"]
+
+    monkeypatch.setattr(api.app.request_class, "max_file_size", 2048)
+    assert upload(client, b"%PDF-1.4\n" + b"0" * 4096, "big.pdf").status_code == 413
+    assert leftovers(tmp_path) == []
+
+
+def test_same_name_uploads_and_known_hashes(client, tmp_path, temp_db):
+    """Test that same-named files are kept apart and re-uploads are not reprocessed."""
+    pdfs = []
+    for document_type in ("invoice", "w2"):
+        path = tmp_path / f"{document_type}.pdf"
+        write_text_pdf(path, TEMPLATES[document_type](random.Random(3)))
+        pdfs.append(path.read_bytes())
+
+    first = upload(client, pdfs[0], "scan.pdf").get_json()
+    second = upload(client, pdfs[1], "scan.pdf").get_json()
+    assert (first["document_type"], second["document_type"]) == ("invoice", "w2")
+    stored = [temp_db.get_document_by_id(r["document_id"])["file_path"] for r in (first, second)]
+    assert stored[0] != stored[1]
+
+    again = upload(client, pdfs[0], "copy.pdf").get_json()
+    assert again["duplicate"] is True
+    assert again["document_id"] == first["document_id"]
+    assert again["fields"] == first["fields"]
+
+    forced = upload(client, pdfs[0], "copy.pdf", "?reprocess=1").get_json()
+    assert forced["duplicate"] is False
+    assert forced["document_id"] != first["document_id"]
+    assert leftovers(tmp_path) == []
+
+
+def test_known_document_with_failed_ocr_is_queued_again(client, tmp_path, temp_db, monkeypatch):
+    """Test that re-uploading a document whose OCR failed queues one new OCR job."""
+    monkeypatch.setattr(jobs, "get_job_runner", lambda: None)
+    content = b"%PDF-1.4\n" + b"0" * 64
+    stored = tmp_path / "scan.pdf"
+    stored.write_bytes(content)
+    document_id = temp_db.insert_document(str(stored), "unknown", "",
+                                          hashlib.sha256(content).hexdigest(),
+                                          ocr_status="failed")
+
+    first = upload(client, content, "scan.pdf").get_json()
+    assert (first["duplicate"], first["degraded"], first["ocr_status"]) == (True, True, "pending")
+    job = temp_db.get_job(first["ocr_job_id"])
+    assert (job["kind"], job["document_id"], job["status"]) == ("ocr", document_id, "queued")
+    assert temp_db.get_document_by_id(document_id)["ocr_status"] == "pending"
+
+    # The job is still queued, so it is reported instead of queuing another
+    assert upload(client, content, "scan.pdf").get_json()["ocr_job_id"] == first["ocr_job_id"]
+    assert temp_db.job_counts()["queued"] == 1
@@ -0,0 +1,212 @@
+"""
+Tests for the background job queue.
+"""
+import io
+
+import pytest
+
+from app import api, jobs
+from app.exceptions import UnsupportedFileTypeError
+
+
+def fake_result(document_type="invoice"):
+    return {
+        "file_hash": "abc",
+        "text": "INVOICE",
+        "document_type": document_type,
+        "confidence": 0.9,
+        "fields": {"invoice_number": "INV-1"},
+        "cache_hits": {},
+        "telemetry": {"total_ms": 1.0},
+    }
+
+
+@pytest.fixture
+def start_app(temp_db, tmp_path, monkeypatch):
+    """Return create_app with a fresh job runner, which is stopped afterwards."""
+    monkeypatch.setattr(api, "setup_logging", lambda: None)
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path / "uploads")
+    monkeypatch.setattr(jobs, "JOB_WORKERS", 2)
+    monkeypatch.setattr(jobs, "_job_runner", None)
+    yield api.create_app
+    if jobs._job_runner is not None:
+        jobs._job_runner.stop()
+
+
+def test_claim_leases_oldest_job_once(temp_db):
+    """Test that a claimed job is not handed to a second worker."""
+    temp_db.create_job("a", "a.pdf", "a.pdf", max_attempts=3)
+    temp_db.create_job("b", "b.pdf", "b.pdf", max_attempts=3)
+
+    first = temp_db.claim_job("worker-1", lease_seconds=60)
+    second = temp_db.claim_job("worker-2", lease_seconds=60)
+
+    assert (first["id"], first["status"], first["attempts"]) == ("a", "running", 1)
+    assert second["id"] == "b"
+    assert temp_db.claim_job("worker-3", lease_seconds=60) is None
+    assert temp_db.job_counts()["running"] == 2
+
+
+def test_expired_lease_is_retried_then_failed(temp_db):
+    """Test that a job whose worker died is claimed again until out of attempts."""
+    temp_db.create_job("a", "a.pdf", "a.pdf", max_attempts=2)
+
+    assert temp_db.claim_job("dead-1", lease_seconds=-1)["attempts"] == 1
+    retried = temp_db.claim_job("dead-2", lease_seconds=-1)
+    assert (retried["lease_owner"], retried["attempts"]) == ("dead-2", 2)
+    # The late worker's result is refused: it no longer holds the lease
+    assert temp_db.complete_job("a", "dead-1", 1, {}) is False
+
+    assert temp_db.claim_job("worker", lease_seconds=60) is None
+    job = temp_db.get_job("a")
+    assert job["status"] == "failed"
+    assert "after 2 attempts" in job["error"]
+
+
+def test_expired_ocr_lease_fails_document_ocr(temp_db):
+    """Test that an OCR job lost on its last attempt marks its document's OCR failed."""
+    document_id = temp_db.insert_document("scan.pdf", "unknown", "", "abc", ocr_status="pending")
+    temp_db.create_job("ocr", "scan.pdf", "scan.pdf", max_attempts=1,
+                       kind="ocr", document_id=document_id)
+    temp_db.claim_job("dead", lease_seconds=-1)
+
+    assert temp_db.claim_job("worker", lease_seconds=60) is None
+    assert temp_db.get_job("ocr")["status"] == "failed"
+    assert temp_db.get_document_by_id(document_id)["ocr_status"] == "failed"
+
+
+def test_fail_job_requeues_until_attempts_run_out(temp_db):
+    temp_db.create_job("a", "a.pdf", "a.pdf", max_attempts=2)
+    temp_db.claim_job("w", 60)
+    assert temp_db.fail_job("a", "w", "disk full") == "queued"
+    temp_db.claim_job("w", 60)
+    assert temp_db.fail_job("a", "w", "disk full") == "failed"
+
+
+def test_runner_processes_jobs(temp_db, monkeypatch):
+    """Test that workers store the document and complete the job atomically."""
+    monkeypatch.setattr(jobs, "analyze_document",
+                        lambda path: fake_result("w2" if "w2" in path else "invoice"))
+    temp_db.create_job("ok", "w2.pdf", "w2.pdf", max_attempts=3)
+    runner = jobs.JobRunner(workers=2, poll_interval=0.01).start()
+    try:
+        job = jobs.wait_for_job("ok", timeout=5, poll_interval=0.01)
+    finally:
+        runner.stop()
+
+    assert job["status"] == "done"
+    assert job["result"]["document_type"] == "w2"
+    assert temp_db.get_document_by_id(job["document_id"])["document_type"] == "w2"
+    assert temp_db.get_document_fields(job["document_id"]) == {"invoice_number": "INV-1"}
+
+
+def test_runner_does_not_retry_unsupported_files(temp_db, monkeypatch):
+    def reject(path):
+        raise UnsupportedFileTypeError("File type .txt not supported")
+
+    monkeypatch.setattr(jobs, "analyze_document", reject)
+    temp_db.create_job("bad", "notes.txt", "notes.txt", max_attempts=3)
+    runner = jobs.JobRunner(workers=1, poll_interval=0.01).start()
+    try:
+        job = jobs.wait_for_job("bad", timeout=5, poll_interval=0.01)
+    finally:
+        runner.stop()
+
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+
+
+def test_job_api_long_poll(temp_db, tmp_path, monkeypatch):
+    """Test submitting a job and long-polling for its result."""
+    monkeypatch.setitem(api.app.config, "UPLOAD_FOLDER", tmp_path)
+    monkeypatch.setattr(jobs, "analyze_document", lambda path: fake_result())
+    runner = jobs.JobRunner(workers=1, poll_interval=0.01).start()
+    monkeypatch.setattr(jobs, "get_job_runner", lambda: runner)
+    client = api.app.test_client()
+    try:
+        response = client.post("/api/v1/jobs", data={"file": (io.BytesIO(b"%PDF-1.4"), "scan.pdf")},
+                               content_type="multipart/form-data")
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+        assert response.headers["Location"] == f"/api/v1/jobs/{job_id}"
+
+        job = client.get(f"/api/v1/jobs/{job_id}?wait=5").get_json()["job"]
+    finally:
+        runner.stop()
+
+    assert job["status"] == "done"
+    assert job["result"]["document_type"] == "invoice"
+    assert client.get("/api/v1/jobs/missing").status_code == 404
+    assert client.get("/api/v1/jobs").get_json()["jobs"]["done"] == 1
+
+
+def test_ocr_job_updates_document_in_place(temp_db, monkeypatch):
+    """Test that deferred OCR replaces a degraded document's type and fields."""
+    document_id = temp_db.insert_document("scan.pdf", "unknown", "", "abc", ocr_status="pending")
+    monkeypatch.setattr(jobs, "analyze_document", lambda path: fake_result())
+    monkeypatch.setattr(jobs, "get_job_runner", lambda: None)
+    job_id = jobs.submit_ocr_job(document_id, "scan.pdf", "scan.pdf")
+    runner = jobs.JobRunner(workers=1, poll_interval=0.01).start()
+    try:
+        job = jobs.wait_for_job(job_id, timeout=5, poll_interval=0.01)
+    finally:
+        runner.stop()
+
+    assert (job["status"], job["kind"], job["document_id"]) == ("done", "ocr", document_id)
+    document = temp_db.get_document_by_id(document_id)
+    assert (document["document_type"], document["raw_text"]) == ("invoice", "INVOICE")
+    assert document["ocr_status"] == "done"
+    assert temp_db.get_document_fields(document_id) == {"invoice_number": "INV-1"}
+    assert len(temp_db.get_all_documents()) == 1
+
+
+def test_ocr_job_without_text_keeps_native_analysis(temp_db, monkeypatch):
+    """Test that an OCR pass that reads nothing fails the OCR instead of replacing the document."""
+    document_id = temp_db.insert_document("scan.pdf", "invoice", "INVOICE", "abc",
+                                          ocr_status="pending")
+    temp_db.insert_fields_batch([(document_id, "invoice", {"invoice_number": "INV-1"})])
+    monkeypatch.setattr(jobs, "analyze_document",
+                        lambda path: dict(fake_result("unknown"), text="", fields={}))
+    monkeypatch.setattr(jobs, "get_job_runner", lambda: None)
+    job_id = jobs.submit_ocr_job(document_id, "scan.pdf", "scan.pdf")
+    runner = jobs.JobRunner(workers=1, poll_interval=0.01).start()
+    try:
+        job = jobs.wait_for_job(job_id, timeout=5, poll_interval=0.01)
+    finally:
+        runner.stop()
+
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+    document = temp_db.get_document_by_id(document_id)
+    assert (document["document_type"], document["raw_text"]) == ("invoice", "INVOICE")
+    assert document["ocr_status"] == "failed"
+    assert temp_db.get_document_fields(document_id) == {"invoice_number": "INV-1"}
+
+
+def test_startup_resumes_queued_and_abandoned_jobs(temp_db, start_app, monkeypatch):
+    """Test that jobs left by a previous process run after a restart, with no new submission."""
+    monkeypatch.setattr(jobs, "analyze_document", lambda path: fake_result())
+    temp_db.create_job("abandoned", "a.pdf", "a.pdf", max_attempts=3)
+    temp_db.claim_job("crashed-worker", lease_seconds=-1)
+    temp_db.create_job("queued", "b.pdf", "b.pdf", max_attempts=3)
+
+    start_app()
+    abandoned = jobs.wait_for_job("abandoned", timeout=5, poll_interval=0.01)
+    queued = jobs.wait_for_job("queued", timeout=5, poll_interval=0.01)
+
+    assert (abandoned["status"], abandoned["attempts"]) == ("done", 2)
+    assert (queued["status"], queued["attempts"]) == ("done", 1)
+    assert len(temp_db.get_all_documents()) == 2
+
+
+def test_startup_completes_pending_ocr(temp_db, start_app, monkeypatch):
+    """Test that OCR deferred before a restart runs once the app starts again."""
+    monkeypatch.setattr(jobs, "analyze_document", lambda path: fake_result())
+    document_id = temp_db.insert_document("scan.pdf", "unknown", "", "abc", ocr_status="pending")
+    temp_db.create_job("ocr", "scan.pdf", "scan.pdf", max_attempts=3,
+                       kind="ocr", document_id=document_id)
+
+    start_app()
+    job = jobs.wait_for_job("ocr", timeout=5, poll_interval=0.01)
+
+    assert job["status"] == "done"
+    document = temp_db.get_document_by_id(document_id)
+    assert (document["document_type"], document["ocr_status"]) == ("invoice", "done")
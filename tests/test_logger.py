@@ -0,0 +1,81 @@
+"""
+Tests for the queued logging pipeline.
+"""
+import json
+import logging
+import queue
+
+import pytest
+
+from app import logger as app_logger
+from app.logger import JsonFormatter, SamplingFilter, parse_sampling
+from app.metrics import LOG_RECORDS_DROPPED
+
+
+def record(level=logging.INFO, msg="Stored %d fields", args=(3,), **extra):
+    return logging.makeLogRecord(dict(name="app.db", levelno=level,
+                                      levelname=logging.getLevelName(level),
+                                      msg=msg, args=args, **extra))
+
+
+def test_sampling_filter_keeps_a_fraction():
+    sampler = SamplingFilter(0.25)
+    kept = [sampler.filter(record()) for _ in range(100)]
+    assert sum(kept) == 25
+    assert all(sampler.filter(record(logging.WARNING)) for _ in range(10))
+
+
+def test_parse_sampling():
+    rates = parse_sampling("app.db=0.1, app.classifier=0.5,")
+    assert rates == {"app.db": 0.1, "app.classifier": 0.5}
+    assert parse_sampling("") == {}
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JsonFormatter().format(record(document_id=7)))
+    assert entry["message"] == "Stored 3 fields"
+    assert (entry["level"], entry["logger"], entry["document_id"]) == ("INFO", "app.db", 7)
+    assert "args" not in entry
+
+
+def test_full_queue_drops_and_counts_records():
+    records = queue.Queue(maxsize=2)
+    handler = app_logger._AsyncQueueHandler(records)
+    dropped = LOG_RECORDS_DROPPED.value(level="INFO")
+    for _ in range(5):
+        handler.handle(record())
+    assert records.qsize() == 2
+    assert LOG_RECORDS_DROPPED.value(level="INFO") == dropped + 3
+
+
+@pytest.fixture
+def queued_logging(tmp_path, monkeypatch):
+    """Run setup_logging against a temporary log file, structured."""
+    root = logging.getLogger()
+    level = root.level
+    monkeypatch.setattr(app_logger, "LOG_FILE", tmp_path / "logs" / "autodoc.log")
+    monkeypatch.setattr(app_logger, "LOG_STRUCTURED", True)
+    monkeypatch.setattr(app_logger, "LOG_SAMPLING", "test.sampled=0.5")
+    app_logger.setup_logging()
+    yield tmp_path / "logs" / "autodoc.log"
+    app_logger.stop_logging()
+    app_logger.set_sampling("test.sampled", None)
+    root.setLevel(level)
+
+
+def test_records_are_written_by_the_listener(queued_logging):
+    """Test that records go through the queue and page-level debug output stays off."""
+    values = [1]
+    logging.getLogger("test.queue").info("values %s", values, extra={"job_id": "j1"})
+    values.append(2)  # Arguments are merged when the call is made, not when written
+    for n in range(4):
+        logging.getLogger("test.sampled").info("event %d", n)
+    page_logger = logging.getLogger(app_logger.PAGE_LOGGER)
+    assert not page_logger.isEnabledFor(logging.DEBUG)
+    app_logger.stop_logging()
+
+    entries = [json.loads(line) for line in queued_logging.read_text().splitlines()]
+    ours = [entry for entry in entries if entry["logger"].startswith("test.")]
+    assert ours[0]["message"] == "values [1]"
+    assert ours[0]["job_id"] == "j1"
+    assert [entry["message"] for entry in ours[1:]] == ["event 1", "event 3"]
@@ -0,0 +1,56 @@
+"""
+Tests for the metrics registry and performance monitoring.
+"""
+import pytest
+
+from app.metrics import MetricsRegistry, STAGE_SECONDS, STAGE_TOTAL
+from app.performance import PerformanceMonitor
+
+
+def test_histogram_quantiles():
+    """Test that quantiles are interpolated within buckets."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency", "Latency.", labelnames=("stage",), buckets=(1, 2, 4))
+    for value in [0.5] * 50 + [1.5] * 45 + [3] * 5:
+        histogram.observe(value, stage="ocr")
+
+    assert histogram.quantile(0.5, stage="ocr") == pytest.approx(1.0)
+    assert 1 < histogram.quantile(0.95, stage="ocr") <= 2
+    assert 2 < histogram.quantile(0.99, stage="ocr") <= 4
+    assert histogram.quantile(0.5, stage="db_write") is None
+    assert histogram.summary()["ocr"]["count"] == 100
+
+
+def test_prometheus_rendering():
+    """Test the text exposition format."""
+    registry = MetricsRegistry()
+    counter = registry.counter("runs_total", "Runs.", labelnames=("outcome",))
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    counter.inc(outcome="success")
+    counter.inc(2, outcome="success")
+    histogram.observe(0.05)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{outcome="success"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+    with pytest.raises(ValueError):
+        counter.inc(stage="ocr")
+
+
+def test_performance_monitor_records_stage():
+    """Test that PerformanceMonitor feeds the stage histogram and counters."""
+    before = STAGE_TOTAL.value(stage="test_stage", outcome="error")
+    with PerformanceMonitor("work", stage="test_stage") as monitor:
+        pass
+    with pytest.raises(RuntimeError):
+        with PerformanceMonitor("work", stage="test_stage"):
+            raise RuntimeError("boom")
+
+    assert monitor.duration >= 0
+    assert STAGE_SECONDS.summary()["test_stage"]["count"] >= 2
+    assert STAGE_TOTAL.value(stage="test_stage", outcome="error") == before + 1
@@ -0,0 +1,125 @@
+"""
+Tests for the cached document pipeline.
+"""
+import pytest
+from PIL import Image
+from pytesseract import TesseractNotFoundError
+
+from app import ingestion, pipeline
+from app.cache import DiskCache, LRUCache, TieredCache
+
+
+@pytest.fixture
+def stage_caches(tmp_path, monkeypatch):
+    """Give the pipeline fresh caches backed by a temporary disk cache."""
+    disk = DiskCache(tmp_path / "cache")
+
+    def build():
+        return {
+            stage: TieredCache(
+                f"pipeline-{stage}",
+                pipeline.STAGE_VERSIONS[stage],
+                memory=LRUCache(),
+                disk=disk,
+            )
+            for stage in pipeline.STAGES
+        }
+
+    monkeypatch.setattr(pipeline, "PIPELINE_CACHE_ENABLED", True)
+    monkeypatch.setattr(pipeline, "_stage_caches", build())
+    return build
+
+
+@pytest.fixture
+def document(tmp_path):
+    """A file for the pipeline to hash and measure."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return str(path)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Count calls to each pipeline stage."""
+    counts = {"text": 0, "classification": 0, "fields": 0}
+
+    def extract_text(file_path, stats=None, defer_ocr=False):
+        counts["text"] += 1
+        stats.update(ocr_unavailable=False)
+        if defer_ocr:
+            stats.update(page_count=2, ocr_used=False, ocr_deferred=True, ocr_ms=0.0,
+                         peak_rss_kb=1024)
+            return ""
+        stats.update(page_count=2, ocr_used=True, ocr_deferred=False, ocr_ms=5.0, peak_rss_kb=1024)
+        return "INVOICE Invoice Number: INV-1 Total: $10.00"
+
+    def classify(text):
+        counts["classification"] += 1
+        return "invoice"
+
+    def extract(document_type, text):
+        counts["fields"] += 1
+        return {"invoice_number": "INV-1"}
+
+    monkeypatch.setattr(pipeline, "extract_text_from_file", extract_text)
+    monkeypatch.setattr(pipeline, "classify_document", classify)
+    monkeypatch.setattr(pipeline, "extract_fields", extract)
+    return counts
+
+
+def test_repeat_document_served_from_cache(stage_caches, calls, document):
+    """Test that a second run of the same file skips every stage."""
+    first = pipeline.analyze_document(document, file_hash="abc")
+    second = pipeline.analyze_document(document, file_hash="abc")
+
+    assert calls == {"text": 1, "classification": 1, "fields": 1}
+    assert not any(first["cache_hits"].values())
+    assert all(second["cache_hits"].values())
+    assert second["fields"] == first["fields"]
+    assert pipeline.get_cache_stats()["text"]["memory_hits"] == 1
+    # Cached results still describe the document
+    assert second["telemetry"]["page_count"] == 2
+    assert second["telemetry"]["ocr_used"] is True
+    assert first["telemetry"]["ocr_ms"] == 5.0
+    assert second["telemetry"]["ocr_ms"] == 0.0
+
+
+def test_stage_version_bump_recomputes_downstream_only(stage_caches, calls, document, monkeypatch):
+    """Test that bumping the classifier version keeps extracted text cached."""
+    pipeline.analyze_document(document, file_hash="abc")
+
+    versions = dict(pipeline.STAGE_VERSIONS, classification=2)
+    monkeypatch.setattr(pipeline, "STAGE_VERSIONS", versions)
+    monkeypatch.setattr(pipeline, "_stage_caches", stage_caches())
+
+    result = pipeline.analyze_document(document, file_hash="abc")
+
+    assert calls == {"text": 1, "classification": 2, "fields": 2}
+    assert result["cache_hits"] == {"text": True, "classification": False, "fields": False}
+
+
+def test_deferred_ocr_results_are_not_cached(stage_caches, calls, document):
+    """Test that a degraded run is redone in full by the later OCR pass."""
+    degraded = pipeline.analyze_document(document, file_hash="abc", defer_ocr=True)
+    full = pipeline.analyze_document(document, file_hash="abc")
+
+    assert degraded["ocr_pending"] is True
+    assert full["ocr_pending"] is False
+    assert not any(full["cache_hits"].values())
+    assert calls == {"text": 2, "classification": 2, "fields": 2}
+
+
+def test_results_without_tesseract_are_not_cached(stage_caches, tmp_path, monkeypatch):
+    """Test that an image read while tesseract is missing is extracted again next time."""
+    path = tmp_path / "scan.png"
+    Image.new("RGB", (20, 20), "white").save(path)
+
+    def no_tesseract(image, stats, operation):
+        raise TesseractNotFoundError()
+
+    monkeypatch.setattr(ingestion, "_ocr", no_tesseract)
+    first = pipeline.analyze_document(str(path), file_hash="abc")
+    second = pipeline.analyze_document(str(path), file_hash="abc")
+
+    assert first["text"] == ""
+    assert not any(second["cache_hits"].values())
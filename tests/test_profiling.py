@@ -0,0 +1,65 @@
+"""
+Tests for on-demand profiling.
+"""
+import time
+
+import pytest
+
+from app import api
+from app.exceptions import ValidationError
+from app.profiling import ProfileSession, format_report, profile_call
+
+
+def busy_work():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return "done"
+
+
+def test_sampling_profile_collapsed_stacks():
+    """Test that sampled stacks are reported root first."""
+    result, report = profile_call("sample", busy_work)
+    assert result == "done"
+    assert report["samples"] > 0
+    top_stack = report["collapsed"].splitlines()[0]
+    assert "busy_work" in top_stack.rsplit(" ", 1)[0].split(";")[-1]
+
+
+def test_memory_profile_reports_allocation_sites():
+    """Test that tracemalloc reports where memory is held."""
+    def allocate():
+        return [bytearray(1000) for _ in range(1000)]
+
+    result, report = profile_call("memory", allocate)
+    assert len(result) == 1000
+    assert report["traced_peak_bytes"] >= 1000 * 1000
+    assert "test_profiling.py" in report["top"][0]["site"]
+    assert "traced peak" in format_report(report)
+
+
+def test_session_claims_requested_count():
+    """Test that an armed session profiles exactly N requests."""
+    session = ProfileSession()
+    assert session.claim() is None
+    session.arm("cprofile", 2)
+    assert [session.claim(), session.claim(), session.claim()] == ["cprofile", "cprofile", None]
+    with pytest.raises(ValidationError):
+        session.arm("bogus", 1)
+
+
+def test_debug_endpoints_are_guarded(monkeypatch):
+    """Test that debug endpoints need the feature flag and the token."""
+    client = api.app.test_client()
+    assert client.get("/api/v1/debug/profile").status_code == 404
+
+    monkeypatch.setattr(api, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(api, "PROFILING_TOKEN", "secret")
+    assert client.get("/api/v1/debug/profile").status_code == 403
+    response = client.post(
+        "/api/v1/debug/profile",
+        json={"mode": "sample", "requests": 3},
+        headers={"X-Debug-Token": "secret"},
+    )
+    assert response.status_code == 200
+    assert response.json["session"]["remaining"] == 3
@@ -0,0 +1,64 @@
+"""
+Tests for conditional and compressed document read responses.
+"""
+import gzip
+
+from app import api
+
+
+def add_document(temp_db, text="INVOICE " * 500):
+    document_id = temp_db.insert_document("a.pdf", "invoice", text, file_hash="abc")
+    temp_db.insert_fields_batch([(document_id, "invoice", {"invoice_number": "INV-1"})])
+    return document_id
+
+
+def test_etag_and_not_modified(temp_db):
+    """Test that a repeated read with the ETag gets an empty 304."""
+    document_id = add_document(temp_db, text="short")
+    client = api.app.test_client()
+
+    first = client.get(f"/api/v1/documents/{document_id}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "Content-Encoding" not in first.headers
+
+    again = client.get(f"/api/v1/documents/{document_id}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    temp_db.insert_document("b.pdf", "w2", "W2")
+    listing = client.get("/api/v1/documents", headers={"If-None-Match": etag})
+    assert listing.status_code == 200
+
+
+def test_large_body_is_gzipped(temp_db):
+    document_id = add_document(temp_db)
+    client = api.app.test_client()
+
+    response = client.get(f"/api/v1/documents/{document_id}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert b'"invoice_number"' in gzip.decompress(response.data)
+    # Identity and gzip are different representations
+    plain = client.get(f"/api/v1/documents/{document_id}")
+    assert plain.headers["ETag"] != response.headers["ETag"]
+
+
+def test_field_projection(temp_db):
+    """Test that ``fields`` selects the returned columns."""
+    document_id = add_document(temp_db)
+    client = api.app.test_client()
+
+    response = client.get(f"/api/v1/documents/{document_id}?fields=document_type,fields")
+    document = response.get_json()["document"]
+    assert document == {"document_type": "invoice", "fields": {"invoice_number": "INV-1"}}
+
+    listing = client.get("/api/v1/documents?fields=id,file_hash").get_json()["documents"]
+    assert listing == [{"id": document_id, "file_hash": "abc"}]
+
+    assert client.get(f"/api/v1/documents/{document_id}?fields=password").status_code == 400
+    assert client.get("/api/v1/documents?fields=fields").status_code == 400
+    assert client.get("/api/v1/documents/999?fields=document_type").status_code == 404
@@ -0,0 +1,52 @@
+"""
+Tests for full-text document search.
+"""
+import pytest
+from app.exceptions import DatabaseError
+
+
+def test_search_finds_inserted_document(temp_db):
+    """Test that documents are indexed on insert."""
+    doc_id = temp_db.insert_document("a.pdf", "invoice", "Invoice from Acme Corp, total due")
+    temp_db.insert_document("b.pdf", "pay_stub", "Gross pay and deductions")
+
+    results = temp_db.search_documents("acme")
+    assert [r["id"] for r in results] == [doc_id]
+    assert "[Acme]" in results[0]["snippet"]
+
+
+def test_search_type_filter(temp_db):
+    """Test filtering search results by document type."""
+    temp_db.insert_document("a.pdf", "invoice", "payment terms net 30")
+    po_id = temp_db.insert_document("b.pdf", "purchase_order", "payment on delivery")
+
+    results = temp_db.search_documents("payment", document_type="purchase_order")
+    assert [r["id"] for r in results] == [po_id]
+
+
+def test_search_index_follows_updates_and_deletes(temp_db):
+    """Test that triggers keep the index in sync."""
+    doc_id = temp_db.insert_document("a.pdf", "unknown", "original text")
+    conn = temp_db.get_connection()
+    conn.execute("UPDATE documents SET raw_text = 'replacement text' WHERE id = ?", (doc_id,))
+    conn.commit()
+    assert temp_db.search_documents("original") == []
+    assert len(temp_db.search_documents("replacement")) == 1
+
+    conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+    conn.commit()
+    conn.close()
+    assert temp_db.search_documents("replacement") == []
+
+
+def test_rebuild_search_index(temp_db):
+    """Test rebuilding the index."""
+    temp_db.insert_document("a.pdf", "invoice", "invoice text")
+    assert temp_db.rebuild_search_index() == 1
+    assert len(temp_db.search_documents("invoice")) == 1
+
+
+def test_invalid_search_query(temp_db):
+    """Test that malformed queries raise DatabaseError."""
+    with pytest.raises(DatabaseError):
+        temp_db.search_documents('"unbalanced')
@@ -0,0 +1,53 @@
+"""
+Tests for incrementally maintained document statistics.
+"""
+import sqlite3
+from app import db
+
+
+def test_stats_follow_inserts(temp_db):
+    """Test that counters are updated on insert."""
+    temp_db.insert_document("a.pdf", "invoice", "a")
+    temp_db.insert_document("b.pdf", "invoice", "b")
+    temp_db.insert_document("c.pdf", "w2", "c")
+
+    stats = temp_db.get_stats()
+    assert stats["total"] == 3
+    assert stats["by_type"] == {"invoice": 2, "w2": 1}
+    assert sum(stats["by_day"].values()) == 3
+
+
+def test_stats_follow_reclassification_and_delete(temp_db):
+    """Test that counters move on type change and drop on delete."""
+    doc_id = temp_db.insert_document("a.pdf", "unknown", "a")
+    conn = temp_db.get_connection()
+    conn.execute("UPDATE documents SET document_type = 'invoice' WHERE id = ?", (doc_id,))
+    conn.commit()
+    assert temp_db.get_stats()["by_type"] == {"invoice": 1}
+
+    conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+    conn.commit()
+    conn.close()
+    assert temp_db.get_stats() == {"total": 0, "by_type": {}, "by_day": {}}
+
+
+def test_stats_backfilled_for_existing_database(tmp_path, monkeypatch):
+    """Test upgrading a database created before created_at and counters existed."""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE documents (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "file_path TEXT, document_type TEXT, raw_text TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO documents (file_path, document_type, raw_text) VALUES ('a', 'w2', 'x')"
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    db.insert_document("b.pdf", "w2", "y")
+
+    assert db.get_stats()["by_type"] == {"w2": 2}
+    assert all(doc["created_at"] for doc in map(db.get_document_by_id, (1, 2)))
@@ -0,0 +1,61 @@
+"""
+Tests for per-document processing telemetry.
+"""
+
+
+def _telemetry(total_ms, **overrides):
+    telemetry = {
+        "file_bytes": 1000,
+        "page_count": 1,
+        "ocr_used": False,
+        "extraction_ms": total_ms * 0.8,
+        "ocr_ms": 0.0,
+        "classification_ms": 1.0,
+        "field_extraction_ms": 1.0,
+        "total_ms": total_ms,
+        "peak_rss_kb": 50000,
+        "cache_hits": {"text": False, "classification": False, "fields": False},
+    }
+    telemetry.update(overrides)
+    return telemetry
+
+
+def test_slowest_documents_and_summary(temp_db):
+    """Test the slowest-document list and per-type aggregation."""
+    fast = temp_db.insert_document("a.pdf", "invoice", "text")
+    slow = temp_db.insert_document("b.pdf", "invoice", "text")
+    scan = temp_db.insert_document("c.png", "passport", "text")
+    temp_db.insert_telemetry(fast, _telemetry(10, cache_hits={"text": True}))
+    temp_db.insert_telemetry(slow, _telemetry(500, page_count=12))
+    temp_db.insert_telemetry(scan, _telemetry(200, ocr_used=True, ocr_ms=190.0))
+
+    slowest = temp_db.slowest_documents(limit=2)
+    assert [row["id"] for row in slowest] == [slow, scan]
+    assert slowest[0]["page_count"] == 12
+
+    summary = {row["grp"]: row for row in temp_db.telemetry_summary("type")}
+    assert summary["invoice"]["documents"] == 2
+    assert summary["invoice"]["max_ms"] == 500
+    assert summary["invoice"]["cache_hit_rate"] == 0.5
+    assert summary["passport"]["ocr_rate"] == 1.0
+    assert list(summary) == ["invoice", "passport"]
+
+
+def test_regressions_compare_periods(temp_db):
+    """Test that a slowdown against the previous period is reported."""
+    old = temp_db.insert_document("old.pdf", "invoice", "text")
+    new = temp_db.insert_document("new.pdf", "invoice", "text")
+    conn = temp_db.get_connection()
+    conn.execute(
+        "UPDATE documents SET created_at = datetime('now', '-10 days') WHERE id = ?", (old,)
+    )
+    conn.commit()
+    conn.close()
+    temp_db.insert_telemetry(old, _telemetry(100))
+    temp_db.insert_telemetry(new, _telemetry(300))
+
+    regressions = temp_db.telemetry_regressions(days=7)
+    assert len(regressions) == 1
+    assert regressions[0]["document_type"] == "invoice"
+    assert regressions[0]["ratio"] == 3.0
+    assert temp_db.telemetry_regressions(days=7, threshold=5) == []
@@ -0,0 +1,68 @@
+"""
+Tests for request tracing.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.performance import (
+    PerformanceMonitor,
+    TRACE_STORE,
+    in_current_context,
+    span,
+    start_trace,
+    to_chrome_trace,
+)
+
+
+def test_nested_spans_share_trace():
+    """Test that spans nest under the active span and the trace is stored."""
+    with start_trace("upload", sampled=True) as trace:
+        with PerformanceMonitor("extract", stage="extraction"):
+            with span("pdfplumber.extract_text", page=1):
+                pass
+
+    names = {s.name: s for s in trace.spans}
+    assert set(names) == {"upload", "extraction", "pdfplumber.extract_text"}
+    assert names["extraction"].parent_id == trace.root.span_id
+    assert names["pdfplumber.extract_text"].parent_id == names["extraction"].span_id
+    assert names["pdfplumber.extract_text"].attributes == {"page": 1}
+    assert TRACE_STORE.get(trace.trace_id) is trace
+
+
+def test_unsampled_trace_records_nothing():
+    """Test that spans are no-ops outside a sampled trace."""
+    with start_trace("upload", sampled=False) as trace:
+        with span("work") as recorded:
+            assert recorded is None
+    assert trace.spans == []
+    assert TRACE_STORE.get(trace.trace_id) is None
+
+
+def test_context_propagates_to_pool_workers():
+    """Test that wrapped pool tasks join the submitting trace."""
+    def work():
+        with span("worker"):
+            return threading.get_ident()
+
+    with start_trace("batch", sampled=True) as trace:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            worker_thread = pool.submit(in_current_context(work)).result()
+            pool.submit(work).result()
+
+    workers = [s for s in trace.spans if s.name == "worker"]
+    assert len(workers) == 1
+    assert workers[0].thread_id == worker_thread
+    assert workers[0].parent_id == trace.root.span_id
+
+
+def test_chrome_trace_format():
+    """Test the exported trace-event JSON."""
+    with start_trace("upload", sampled=True) as trace:
+        with span("work"):
+            pass
+
+    events = to_chrome_trace([trace])["traceEvents"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["upload", "work"]
+    assert all(event["dur"] >= 0 and event["args"]["trace_id"] == trace.trace_id
+               for event in complete)
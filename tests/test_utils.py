@@ -37,3 +37,19 @@ def test_format_timestamp():
     formatted = format_timestamp(dt)
     assert "2024-01-15" in formatted
     assert "10:30:00" in formatted
+
+
+def test_parse_amount():
+    """Test amount normalization."""
+    from app.utils import parse_amount
+    assert parse_amount("$1,234.50") == 1234.5
+    assert parse_amount("-5") == -5.0
+    assert parse_amount("INV-001") is None
+
+
+def test_parse_date():
+    """Test date normalization."""
+    from app.utils import parse_date
+    assert parse_date("01/15/2024") == "2024-01-15"
+    assert parse_date("2024/01/15") == "2024-01-15"
+    assert parse_date("not a date") is None
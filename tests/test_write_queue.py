@@ -0,0 +1,61 @@
+"""
+Tests for the group-commit write queue.
+"""
+import threading
+import pytest
+from app.exceptions import WriteQueueFullError
+from app.write_queue import WriteQueue
+
+
+def test_queued_writes_are_durable(temp_db):
+    """Test that futures resolve to IDs of committed documents and fields."""
+    write_queue = WriteQueue(batch_size=8).start()
+    futures = [
+        write_queue.submit(f"{i}.pdf", "invoice", f"text {i}", {"invoice_number": str(i)})
+        for i in range(20)
+    ]
+    ids = [future.result(timeout=5) for future in futures]
+    write_queue.stop()
+
+    assert len(set(ids)) == 20
+    assert temp_db.get_document_by_id(ids[3])["raw_text"] == "text 3"
+    assert temp_db.get_document_fields(ids[3]) == {"invoice_number": "3"}
+    assert write_queue.writes == 20
+
+
+def test_concurrent_writers(temp_db):
+    """Test many threads waiting on their durable IDs."""
+    write_queue = WriteQueue().start()
+    results = []
+
+    def upload(i):
+        results.append(write_queue.insert_document(f"{i}.pdf", "w2", "text", timeout=5))
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_queue.stop()
+
+    assert sorted(results) == list(range(1, 17))
+    assert write_queue.batches < 16
+
+
+def test_backpressure_when_full(temp_db):
+    """Test that a full queue rejects writes instead of growing."""
+    write_queue = WriteQueue(max_size=1, put_timeout=0.01)
+    write_queue.submit("a.pdf", "invoice", "text")
+    with pytest.raises(WriteQueueFullError):
+        write_queue.submit("b.pdf", "invoice", "text")
+
+
+def test_failed_write_isolated(temp_db):
+    """Test that one failing write does not fail the rest of its batch."""
+    write_queue = WriteQueue(max_size=10)
+    bad = write_queue.submit("a.pdf", "invoice", object())
+    good = write_queue.submit("b.pdf", "invoice", "text")
+    write_queue.start()
+    assert temp_db.get_document_by_id(good.result(timeout=5))["file_path"] == "b.pdf"
+    assert bad.exception(timeout=5) is not None
+    write_queue.stop()